@@ -8,7 +8,8 @@ from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from utils.logger import get_logger
 
-from api.routers import health, chat, documents, services, logs
+from api.middleware import MetricsMiddleware, UploadSizeLimitMiddleware
+from api.routers import health, chat, documents, services, logs, admin, metrics
 
 logger = get_logger(__name__)
 
@@ -25,6 +26,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Size-check PDF upload bodies (upload and replace routes) before the form is parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    routes=[("POST", r"/api/v1/documents/upload"), ("PUT", r"/api/v1/documents/.+")],
+)
+app.add_middleware(MetricsMiddleware)
 
 # ============================================================================
 # Startup and Shutdown Events
@@ -38,18 +45,29 @@ async def startup_event():
     logger.info("=" * 70)
     
     try:
-        # Initialize core services
-        from core.vector_store import vector_store_manager
-        from core.initialization import ServiceInitializer
-        
-        logger.info("\n[1/2] Checking core services...")
-        results, critical_passed = ServiceInitializer.run_all_checks(exit_on_failure=False)
-        
-        logger.info("\n[2/2] Initializing vector store...")
-        if vector_store_manager.is_available():
-            logger.info("✓ Chroma vector store is ready")
-        else:
-            logger.warning("⚠ Chroma vector store may not be fully initialized")
+        # Startup checks, Chroma, the RAG engine and model loading run in
+        # parallel in the background; /health/ready waits for them
+        from core.warmup import startup_warmup
+        startup_warmup.start()
+
+        from config.settings import WATCH_CONFIG
+        if WATCH_CONFIG.get("enabled"):
+            from services.folder_watcher import folder_watcher
+            logger.info("Starting watch-folder ingestion...")
+            folder_watcher.start()
+
+        from config.settings import RETENTION_CONFIG
+        if RETENTION_CONFIG.get("enabled"):
+            from services.chat_retention import chat_retention
+            chat_retention.start()
+
+        from core.write_buffer import write_buffer
+        if write_buffer.enabled:
+            write_buffer.start()
+
+        # Background dependency probes back /health/ready
+        from services.health_prober import health_prober
+        health_prober.start()
         
         logger.info("=" * 70)
         logger.info("✓ FastAPI startup complete")
@@ -66,11 +84,34 @@ async def shutdown_event():
     logger.info("=" * 70)
     
     try:
-        # Persist Chroma to disk
+        from config.settings import WATCH_CONFIG
+        if WATCH_CONFIG.get("enabled"):
+            from services.folder_watcher import folder_watcher
+            folder_watcher.stop()
+
+        from config.settings import RETENTION_CONFIG
+        if RETENTION_CONFIG.get("enabled"):
+            from services.chat_retention import chat_retention
+            chat_retention.stop()
+
+        # Write out queued log/chat writes
+        from core.write_buffer import write_buffer
+        write_buffer.stop()
+
+        from services.health_prober import health_prober
+        health_prober.stop()
+
+        # Close the async MongoDB pool used by the routers
+        from db.mongo_client import close_async_mongo_client
+        await close_async_mongo_client()
+
+        # Persist Chroma to disk (skipped if it was never opened)
         from core.vector_store import vector_store_manager
-        logger.info("Persisting Chroma vector store...")
-        vector_store_manager.persist()
-        logger.info("✓ Chroma persisted to disk")
+        from utils.lazy import is_initialized
+        if is_initialized(vector_store_manager):
+            logger.info("Persisting Chroma vector store...")
+            vector_store_manager.persist()
+            logger.info("✓ Chroma persisted to disk")
         
     except Exception as e:
         logger.warning(f"Error during shutdown: {e}")
@@ -81,6 +122,8 @@ app.include_router(chat.router, prefix=API_PREFIX)
 app.include_router(documents.router, prefix=API_PREFIX)
 app.include_router(services.router, prefix=API_PREFIX)
 app.include_router(logs.router, prefix=API_PREFIX)
+app.include_router(admin.router, prefix=API_PREFIX)
+app.include_router(metrics.router)
 
 
 @app.get("/", include_in_schema=False)
@@ -0,0 +1,129 @@
+"""ASGI middleware: per-route request metrics, request body size limit."""
+import json
+import re
+import time
+
+from config.settings import UPLOAD_CONFIG
+from utils.metrics import metrics
+
+
+class MetricsMiddleware:
+    """
+    Records http_requests_total{method,route,status}, http_request_duration_ms
+    {method,route} and http_requests_in_flight. The route label is the route's
+    path template (e.g. /api/v1/chat/{chat_id}), so label values stay bounded.
+    Plain ASGI rather than BaseHTTPMiddleware to keep the per-request cost low.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        metrics.add_gauge("http_requests_in_flight", 1)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.add_gauge("http_requests_in_flight", -1)
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            metrics.inc("http_requests_total", method=method, route=route, status=status["code"])
+            metrics.observe("http_request_duration_ms", (time.perf_counter() - start) * 1000,
+                            method=method, route=route)
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Rejects upload bodies larger than UPLOAD_CONFIG["max_size_bytes"] (plus
+    "form_overhead_bytes" for multipart framing) with 413 before the form is
+    parsed. Only requests matching `routes`, a list of (method, path regex)
+    pairs, are checked.
+
+    A Content-Length over the limit is rejected at once. A chunked body is
+    counted as it streams: once it passes the limit the app is handed a
+    disconnect instead of the rest of the body, whatever it answers is
+    discarded, and the 413 is sent from here.
+    """
+
+    def __init__(self, app, routes, max_body_bytes: int = None):
+        self.app = app
+        self.routes = [(method.upper(), re.compile(path)) for method, path in routes]
+        self.max_body_bytes = max_body_bytes or (
+            UPLOAD_CONFIG.get("max_size_bytes", 50 * 1024 * 1024) + UPLOAD_CONFIG.get("form_overhead_bytes", 64 * 1024)
+        )
+        self.max_size_mb = UPLOAD_CONFIG.get("max_size_bytes", 50 * 1024 * 1024) // (1024 * 1024)
+
+    def _limited(self, scope) -> bool:
+        method = scope.get("method", "")
+        path = scope.get("path", "")
+        return any(method == m and pattern.fullmatch(path) for m, pattern in self.routes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._limited(scope):
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_body_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        too_large = False
+        started = False
+
+        async def receive_wrapper():
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    too_large = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def send_wrapper(message):
+            nonlocal started
+            if too_large and not started:
+                return
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        except Exception:
+            if not too_large or started:
+                raise
+        if too_large and not started:
+            await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"PDF file too large (max {self.max_size_mb} MB)"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()),
+                        (b"connection", b"close")],
+        })
+        await send({"type": "http.response.body", "body": body})
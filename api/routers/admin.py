@@ -0,0 +1,30 @@
+"""Admin endpoints: runtime metrics."""
+from fastapi import APIRouter
+
+from config.settings import DATABASE_CONFIG
+from core.catalog_cache import services_catalog
+from core.write_buffer import write_buffer
+from db.monitoring import mongo_metrics
+from services.chat_cache import chat_session_cache
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.get("/metrics")
+def admin_metrics():
+    """MongoDB command latency, pool checkout waits, slow queries, cache and write-buffer stats."""
+    return {
+        "mongo": {
+            "pool": {
+                "max_pool_size": DATABASE_CONFIG.get("max_pool_size"),
+                "min_pool_size": DATABASE_CONFIG.get("min_pool_size"),
+                "max_idle_time_ms": DATABASE_CONFIG.get("max_idle_time_ms"),
+                "wait_queue_timeout_ms": DATABASE_CONFIG.get("wait_queue_timeout_ms"),
+                "compressors": DATABASE_CONFIG.get("compressors") or None,
+            },
+            **mongo_metrics(),
+        },
+        "chat_cache": chat_session_cache.stats(),
+        "services_catalog": services_catalog.stats(),
+        "write_buffer": write_buffer.stats(),
+    }
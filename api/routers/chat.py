@@ -1,6 +1,7 @@
-"""Chat endpoints: create, query, get history, delete."""
+"""Chat endpoints: create, list, query, get history, delete."""
 from datetime import datetime, timezone
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import StreamingResponse
 
 from api.schemas import (
@@ -8,6 +9,8 @@ from api.schemas import (
     ChatQueryRequest,
     ChatQueryResponse,
     ChatHistoryResponse,
+    ChatListResponse,
+    ChatSummary,
     ChatDeleteResponse,
     ChatMessage,
 )
@@ -35,6 +38,30 @@ def create_chat():
     )
 
 
+@router.get("", response_model=ChatListResponse)
+async def list_chats(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    """List chat summaries, most recently updated first."""
+    try:
+        page = await chat_service.alist_chat_summaries(limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return ChatListResponse(
+        chats=[
+            ChatSummary(
+                chat_id=c["chat_id"],
+                title=c.get("title"),
+                updated_at=c.get("updated_at"),
+                message_count=c.get("message_count") or 0,
+            )
+            for c in page["chats"]
+        ],
+        next_cursor=page["next_cursor"],
+    )
+
+
 @router.post("/query", response_model=ChatQueryResponse)
 def chat_query(body: ChatQueryRequest):
     """Send user query and get RAG-based response (non-streaming)."""
@@ -61,11 +88,16 @@ def chat_query(body: ChatQueryRequest):
 
 
 @router.get("/{chat_id}", response_model=ChatHistoryResponse)
-def get_chat_history(chat_id: str):
-    """Fetch full chat history by ID."""
-    chat = chat_service.get_chat_by_id(chat_id)
+async def get_chat_history(
+    chat_id: str,
+    after_seq: Optional[int] = Query(None, ge=0, description="Return messages after this seq (next_cursor of the previous page)"),
+    limit: int = Query(100, ge=1, le=500),
+):
+    """Fetch chat history by ID, one page of messages at a time."""
+    chat = await chat_service.aget_chat_by_id(chat_id)
     if not chat:
         raise HTTPException(status_code=404, detail="Chat not found")
+    page = await chat_service.aget_chat_messages_page(chat_id, after_seq=after_seq or 0, limit=limit)
     messages = [
         ChatMessage(
             role=m.get("role", ""),
@@ -73,7 +105,7 @@ def get_chat_history(chat_id: str):
             timestamp=m.get("timestamp"),
             seq=m.get("seq"),
         )
-        for m in chat.get("messages", [])
+        for m in page["messages"]
     ]
     return ChatHistoryResponse(
         chat_id=chat_id,
@@ -81,13 +113,15 @@ def get_chat_history(chat_id: str):
         title=chat.get("title"),
         created_at=chat.get("created_at"),
         updated_at=chat.get("updated_at"),
+        message_count=chat.get("message_count"),
+        next_cursor=page["next_cursor"],
     )
 
 
 @router.delete("/{chat_id}", response_model=ChatDeleteResponse)
-def delete_chat(chat_id: str):
+async def delete_chat(chat_id: str):
     """Delete a chat session and its history."""
-    if not chat_service.delete_chat(chat_id):
+    if not await chat_service.adelete_chat(chat_id):
         raise HTTPException(status_code=404, detail="Chat not found")
     return ChatDeleteResponse(
         chat_id=chat_id,
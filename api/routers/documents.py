@@ -1,22 +1,29 @@
-"""Document endpoints: upload, list, delete."""
+"""Document endpoints: upload, list, replace, metadata update, delete."""
 from datetime import datetime, timezone
 import os
 import uuid
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
 from api.schemas import (
     DocumentListResponse,
     DocumentItem,
     DocumentUploadResponse,
     DocumentDeleteResponse,
+    DocumentReplaceResponse,
+    DocumentMetadataUpdateRequest,
+    DocumentMetadataUpdateResponse,
 )
-from api.utils import serialize_docs
+from api.utils import serialize_docs, spool_upload_to_disk, make_etag, conditional_get
 from core.vector_operations import vector_db_operations
-from core.db_manager import (
+from core.async_db_manager import (
     add_document,
     delete_document,
     get_all_documents,
+    get_collection_version,
     find_document,
+    update_document_content,
+    update_documents_metadata,
     upsert_service,
     log_action,
 )
@@ -34,18 +41,11 @@ async def upload_document(
     """Upload document with department & service metadata."""
     if not file.filename or not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="PDF file required")
-    contents = await file.read()
-    max_size_bytes = 50 * 1024 * 1024  # 50 MB
-    if len(contents) > max_size_bytes:
-        raise HTTPException(status_code=413, detail="PDF file too large (max 50 MB)")
-    # vector_db_operations.add_pdf_to_vectorstore expects a file-like object with .getvalue()
-    class FileLike:
-        def getvalue(self):
-            return contents
+    spool_path = await spool_upload_to_disk(file, suffix=".pdf")
     # Ensure filename is unique: if a document with the same filename exists, append a short suffix
     final_filename = file.filename
     try:
-        if find_document(file.filename):
+        if await find_document(file.filename):
             base, ext = os.path.splitext(file.filename)
             suffix = uuid.uuid4().hex[:8]
             final_filename = f"{base}_{suffix}{ext}"
@@ -53,30 +53,50 @@ async def upload_document(
         # If any DB check fails, fall back to original filename
         final_filename = file.filename
 
-    result = vector_db_operations.add_pdf_to_vectorstore(
-        FileLike(), final_filename, department, service, doc_type
-    )
+    try:
+        # PDF parsing and embedding are blocking: keep them off the event loop
+        result = await run_in_threadpool(
+            vector_db_operations.add_pdf_path_to_vectorstore,
+            spool_path, final_filename, department, service, doc_type
+        )
+    finally:
+        if os.path.exists(spool_path):
+            os.unlink(spool_path)
     if not result.get("success"):
         raise HTTPException(
             status_code=400,
             detail=result.get("message", "Upload failed"),
         )
-    add_document(final_filename, department, service, doc_type)
+    await add_document(
+        final_filename,
+        department,
+        service,
+        doc_type,
+        file_hash=result.get("file_hash"),
+        chunk_ids=result.get("chroma_ids"),
+        duplicate_of=result.get("duplicate_of"),
+        dedup_stats=result.get("dedup_stats"),
+    )
     if department and service:
-        upsert_service(department, service, "Active")
-    log_action(department or "Unassigned", service or "Unassigned", final_filename, doc_type or "Unknown", "upload")
+        await upsert_service(department, service, "Active")
+    await log_action(department or "Unassigned", service or "Unassigned", final_filename, doc_type or "Unknown", "upload")
     return DocumentUploadResponse(
         filename=final_filename,
         status="indexed",
         chunks=result.get("chunks_added", 0),
+        duplicate_of=result.get("duplicate_of"),
+        dedup_stats=result.get("dedup_stats"),
         created_at=datetime.now(timezone.utc).isoformat(),
     )
 
 
 @router.get("", response_model=DocumentListResponse)
-def list_documents():
-    """List documents for dashboard and filtering."""
-    docs = get_all_documents()
+async def list_documents(request: Request, response: Response):
+    """List documents for dashboard and filtering (304 when If-None-Match is current)."""
+    not_modified = conditional_get(request, response, make_etag("documents", await get_collection_version("documents")))
+    if not_modified:
+        return not_modified
+    docs = await get_all_documents()
     serialized = serialize_docs(docs)
     items = [
         DocumentItem(
@@ -91,19 +111,97 @@ def list_documents():
     return DocumentListResponse(documents=items)
 
 
+@router.patch("/metadata", response_model=DocumentMetadataUpdateResponse)
+async def update_documents_metadata_endpoint(request: DocumentMetadataUpdateRequest):
+    """Bulk-update metadata by filename, department/service or status. Nothing is re-embedded."""
+    match = request.match.model_dump(exclude_none=True)
+    updates = request.set.model_dump(exclude_none=True)
+    if not match:
+        raise HTTPException(status_code=400, detail="At least one match field is required")
+    if not updates:
+        raise HTTPException(status_code=400, detail="At least one field to set is required")
+    result = await run_in_threadpool(vector_db_operations.update_metadata, match, updates)
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=400,
+            detail=result.get("message", "Metadata update failed"),
+        )
+    filenames = result.get("filenames", [])
+    await update_documents_metadata(
+        filenames,
+        department=updates.get("department"),
+        service=updates.get("service"),
+        document_type=updates.get("document_type"),
+    )
+    for filename in filenames:
+        await log_action(
+            updates.get("department") or match.get("department") or "Unassigned",
+            updates.get("service") or match.get("service") or "Unassigned",
+            filename,
+            updates.get("document_type") or "Unknown",
+            "update_metadata",
+        )
+    return DocumentMetadataUpdateResponse(
+        status="updated",
+        chunks_updated=result.get("chunks_updated", 0),
+        chunks_shared=result.get("chunks_shared", 0),
+        documents=filenames,
+        updated_at=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+@router.put("/{filename:path}", response_model=DocumentReplaceResponse)
+async def replace_document(filename: str, file: UploadFile = File(...)):
+    """Replace a document with a new PDF version, re-embedding only changed chunks."""
+    if not file.filename or not file.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="PDF file required")
+    doc = await find_document(filename)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    spool_path = await spool_upload_to_disk(file, suffix=".pdf")
+    try:
+        result = await run_in_threadpool(vector_db_operations.replace_pdf_path_in_vectorstore, spool_path, filename)
+    finally:
+        if os.path.exists(spool_path):
+            os.unlink(spool_path)
+    if not result.get("success"):
+        raise HTTPException(
+            status_code=400,
+            detail=result.get("message", "Update failed"),
+        )
+    await update_document_content(
+        filename, result.get("file_hash"), result.get("chroma_ids", []), result.get("dedup_stats")
+    )
+    await log_action(
+        doc.get("department") or "Unassigned",
+        doc.get("service") or "Unassigned",
+        filename,
+        doc.get("document_type") or "Unknown",
+        "update",
+    )
+    return DocumentReplaceResponse(
+        filename=filename,
+        status="updated",
+        chunks_added=result.get("chunks_added", 0) + result.get("chunks_linked", 0),
+        chunks_removed=result.get("chunks_removed", 0),
+        chunks_unchanged=result.get("chunks_unchanged", 0),
+        updated_at=datetime.now(timezone.utc).isoformat(),
+    )
+
+
 @router.delete("/{filename:path}", response_model=DocumentDeleteResponse)
-def delete_document_endpoint(filename: str):
+async def delete_document_endpoint(filename: str):
     """Delete document from system and vector DB."""
-    doc = find_document(filename)
-    result = vector_db_operations.delete_document_by_filename(filename)
+    doc = await find_document(filename)
+    result = await run_in_threadpool(vector_db_operations.delete_document_by_filename, filename)
     if not result.get("success"):
         raise HTTPException(
             status_code=404,
             detail=result.get("message", "Document not found or delete failed"),
         )
-    delete_document(filename)
+    await delete_document(filename)
     if doc:
-        log_action(
+        await log_action(
             doc.get("department") or "Unassigned",
             doc.get("service") or "Unassigned",
             filename,
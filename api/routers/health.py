@@ -1,11 +1,33 @@
-"""Health check endpoint."""
-from fastapi import APIRouter
-from api.schemas import HealthResponse
+"""Health, liveness and readiness endpoints."""
+from fastapi import APIRouter, Response
+from api.schemas import HealthResponse, ReadinessResponse
+from services.health_prober import health_prober
 
 router = APIRouter(tags=["Health"])
 
 
 @router.get("/", response_model=HealthResponse)
 def health_check():
-    """Health check for server and monitoring."""
+    """Health check for server and monitoring (status from the last dependency probe)."""
+    status = health_prober.status()["status"]
+    return HealthResponse(status=status)
+
+
+@router.get("/health/live", response_model=HealthResponse)
+def liveness():
+    """Liveness: the process is up and serving requests. Never touches a dependency."""
     return HealthResponse()
+
+
+@router.get("/health/ready", response_model=ReadinessResponse)
+def readiness(response: Response):
+    """
+    Readiness: the startup warm-up has finished, and Ollama (with the chat and
+    embedding models), MongoDB and Chroma all passed their last background
+    probe, and that probe is recent.
+    Answers from the prober's cache; returns 503 when not ready.
+    """
+    status = health_prober.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
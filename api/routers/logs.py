@@ -1,28 +1,56 @@
-"""Logs endpoint: view upload/delete activity."""
-from fastapi import APIRouter, Query
+"""Logs endpoints: view and export upload/delete activity."""
+import json
+from datetime import datetime
+from typing import Optional
+
+from bson.errors import InvalidId
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
 from api.schemas import LogListResponse, LogEntry
-from api.utils import serialize_docs
-from core.db_manager import get_all_logs
+from api.utils import serialize_doc, serialize_docs, make_etag, conditional_get, query_key
+from core.async_db_manager import query_logs, iter_logs, get_collection_version
 
 router = APIRouter(prefix="/logs", tags=["Logs"])
 
 
+def _filters(department, service, action, document_name, start, end) -> dict:
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return {
+        "department": department,
+        "service": service,
+        "action": action,
+        "document_name": document_name,
+        "start": start,
+        "end": end,
+    }
+
+
 @router.get("", response_model=LogListResponse)
-def view_logs(
+async def view_logs(
+    request: Request,
+    response: Response,
     department: str | None = Query(None, description="Filter by department"),
     service: str | None = Query(None, description="Filter by service"),
     action: str | None = Query(None, description="Filter by action: upload, delete"),
+    document_name: str | None = Query(None, description="Filter by document filename"),
+    start: Optional[datetime] = Query(None, description="Only entries at or after this time (ISO 8601)"),
+    end: Optional[datetime] = Query(None, description="Only entries before this time (ISO 8601)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
 ):
-    """View upload/delete activity logs."""
-    raw = get_all_logs()
-    if department:
-        raw = [r for r in raw if r.get("department") == department]
-    if service:
-        raw = [r for r in raw if r.get("service") == service]
-    if action:
-        raw = [r for r in raw if r.get("action") == action]
-    serialized = serialize_docs(raw)
+    """View upload/delete activity logs, newest first, one page at a time (304 when unchanged)."""
+    filters = _filters(department, service, action, document_name, start, end)
+    etag = make_etag("logs", await get_collection_version("logs"), query_key(**filters, limit=limit, cursor=cursor))
+    not_modified = conditional_get(request, response, etag)
+    if not_modified:
+        return not_modified
+    try:
+        page = await query_logs(limit=limit, cursor=cursor, **filters)
+    except (ValueError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    serialized = serialize_docs(page["logs"])
     entries = [
         LogEntry(
             timestamp=e.get("timestamp"),
@@ -34,4 +62,27 @@ def view_logs(
         )
         for e in serialized
     ]
-    return LogListResponse(logs=entries)
+    return LogListResponse(logs=entries, next_cursor=page["next_cursor"])
+
+
+@router.get("/export")
+async def export_logs(
+    department: str | None = Query(None),
+    service: str | None = Query(None),
+    action: str | None = Query(None),
+    document_name: str | None = Query(None),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+):
+    """Stream matching logs as NDJSON (one JSON object per line), newest first."""
+    filters = _filters(department, service, action, document_name, start, end)
+
+    async def generate():
+        async for log in iter_logs(**filters):
+            yield json.dumps(serialize_doc(log), ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="logs.ndjson"'},
+    )
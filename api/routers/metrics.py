@@ -0,0 +1,41 @@
+"""Prometheus metrics endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from config.settings import WATCH_CONFIG
+from core.catalog_cache import services_catalog
+from core.write_buffer import write_buffer
+from services.chat_cache import chat_session_cache
+from utils.metrics import metrics, MetricsRegistry
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_runtime(registry: MetricsRegistry):
+    """Queue depths and cache counters, read from their owners at scrape time."""
+    for name, stats in (("chat_sessions", chat_session_cache.stats()),
+                        ("services_catalog", services_catalog.stats())):
+        registry.set_counter("cache_hits_total", stats["hits"], cache=name)
+        registry.set_counter("cache_misses_total", stats["misses"], cache=name)
+        registry.set_gauge("cache_hit_ratio", stats["hit_rate"], cache=name)
+
+    buffer = write_buffer.stats()
+    registry.set_gauge("queue_depth", buffer["pending"], queue="write_behind")
+    registry.set_counter("write_behind_flushed_total", buffer["flushed"])
+    registry.set_counter("write_behind_failed_flushes_total", buffer["failed_flushes"])
+    registry.set_counter("write_behind_dead_lettered_total", buffer["dead_lettered"])
+
+    if WATCH_CONFIG.get("enabled"):
+        from services.folder_watcher import folder_watcher
+        registry.set_gauge("queue_depth", folder_watcher.pending_count(), queue="watch_folder")
+
+
+metrics.register_collector(_collect_runtime)
+
+
+@router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """All metrics of this process in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
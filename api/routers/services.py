@@ -1,18 +1,35 @@
-"""Service endpoints: list, add."""
+"""Service endpoints: list, stats, add."""
 from datetime import datetime, timezone
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Query, Request, Response
 
-from api.schemas import ServiceListResponse, ServiceItem, ServiceCreateRequest, ServiceCreateResponse
-from api.utils import serialize_docs
-from core.db_manager import get_all_services, add_service, upsert_service
+from api.schemas import (
+    ServiceListResponse,
+    ServiceItem,
+    ServiceStatsResponse,
+    ServiceStatsItem,
+    ServiceCreateRequest,
+    ServiceCreateResponse,
+)
+from api.utils import serialize_docs, make_etag, conditional_get
+from core.async_db_manager import (
+    get_service_document_counts,
+    get_collection_versions,
+    add_service,
+    upsert_service,
+)
+from core.catalog_cache import services_catalog
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
 
 @router.get("", response_model=ServiceListResponse)
-def list_services():
-    """Get all departments and their services."""
-    raw = get_all_services()
+async def list_services(request: Request, response: Response):
+    """Get all departments and their services (304 when If-None-Match is current)."""
+    version, raw = await services_catalog.acatalog()
+    not_modified = conditional_get(request, response, make_etag("services", version))
+    if not_modified:
+        return not_modified
     serialized = serialize_docs(raw)
     items = [
         ServiceItem(
@@ -26,11 +43,33 @@ def list_services():
     return ServiceListResponse(services=items)
 
 
+@router.get("/stats", response_model=ServiceStatsResponse)
+async def service_stats(request: Request, response: Response, department: Optional[str] = Query(None)):
+    """Document count and status of every (department, service)."""
+    versions = await get_collection_versions("documents", "services")
+    etag = make_etag("stats", versions["documents"], versions["services"], department or "")
+    not_modified = conditional_get(request, response, etag)
+    if not_modified:
+        return not_modified
+    rows = serialize_docs(await get_service_document_counts(department))
+    items = [
+        ServiceStatsItem(
+            department=r.get("department"),
+            service=r.get("service"),
+            status=r.get("status"),
+            last_updated=r.get("last_updated"),
+            document_count=r.get("document_count", 0),
+        )
+        for r in rows
+    ]
+    return ServiceStatsResponse(services=items, total_documents=sum(i.document_count for i in items))
+
+
 @router.post("", response_model=ServiceCreateResponse)
-def add_service_endpoint(body: ServiceCreateRequest):
+async def add_service_endpoint(body: ServiceCreateRequest):
     """Add a new department or service."""
-    add_service(body.department, body.service)
-    upsert_service(body.department, body.service, body.status)
+    await add_service(body.department, body.service)
+    await upsert_service(body.department, body.service, body.status)
     now = datetime.now(timezone.utc).isoformat()
     return ServiceCreateResponse(
         department=body.department,
@@ -1,6 +1,6 @@
 """Pydantic schemas for BSK FastAPI."""
 from datetime import datetime
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 
 
@@ -11,6 +11,22 @@ class HealthResponse(BaseModel):
     status: str = "healthy"
 
 
+class DependencyCheck(BaseModel):
+    ok: bool
+    latency_ms: float = 0.0
+    error: Optional[str] = None
+
+    model_config = {"extra": "allow"}
+
+
+class ReadinessResponse(BaseModel):
+    ready: bool
+    status: str
+    checked_at: Optional[str] = None
+    checks: Dict[str, DependencyCheck] = {}
+    warmup: Optional[Dict[str, Any]] = None
+
+
 # ----- Chat -----
 class ChatCreateResponse(BaseModel):
     chat_id: str
@@ -50,6 +66,20 @@ class ChatHistoryResponse(BaseModel):
     title: Optional[str] = None
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
+    message_count: Optional[int] = None
+    next_cursor: Optional[int] = None
+
+
+class ChatSummary(BaseModel):
+    chat_id: str
+    title: Optional[str] = None
+    updated_at: Optional[str] = None
+    message_count: int = 0
+
+
+class ChatListResponse(BaseModel):
+    chats: List[ChatSummary]
+    next_cursor: Optional[str] = None
 
 
 class ChatDeleteResponse(BaseModel):
@@ -82,6 +112,45 @@ class DocumentUploadResponse(BaseModel):
     status: str = "indexed"
     chunks: int
     created_at: str
+    duplicate_of: Optional[str] = None
+    dedup_stats: Optional[dict] = None
+
+
+class DocumentReplaceResponse(BaseModel):
+    filename: str
+    status: str = "updated"
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_unchanged: int = 0
+    updated_at: str
+
+
+class DocumentMetadataFilter(BaseModel):
+    filename: Optional[str] = None
+    department: Optional[str] = None
+    service: Optional[str] = None
+    status: Optional[str] = None
+
+
+class DocumentMetadataFields(BaseModel):
+    department: Optional[str] = None
+    service: Optional[str] = None
+    document_type: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+
+
+class DocumentMetadataUpdateRequest(BaseModel):
+    match: DocumentMetadataFilter
+    set: DocumentMetadataFields
+
+
+class DocumentMetadataUpdateResponse(BaseModel):
+    status: str = "updated"
+    chunks_updated: int = 0
+    chunks_shared: int = 0
+    documents: List[str] = []
+    updated_at: str
 
 
 class DocumentDeleteResponse(BaseModel):
@@ -102,6 +171,19 @@ class ServiceListResponse(BaseModel):
     services: List[ServiceItem]
 
 
+class ServiceStatsItem(BaseModel):
+    department: Optional[str] = None
+    service: Optional[str] = None
+    status: Optional[str] = None
+    last_updated: Optional[str] = None
+    document_count: int = 0
+
+
+class ServiceStatsResponse(BaseModel):
+    services: List[ServiceStatsItem]
+    total_documents: int = 0
+
+
 class ServiceCreateRequest(BaseModel):
     department: str = Field(..., min_length=1)
     service: str = Field(..., min_length=1)
@@ -128,3 +210,4 @@ class LogEntry(BaseModel):
 
 class LogListResponse(BaseModel):
     logs: List[LogEntry]
+    next_cursor: Optional[str] = None
@@ -1,6 +1,14 @@
-"""API helpers: serialize MongoDB docs for JSON."""
+"""API helpers: serialize MongoDB docs for JSON, conditional GETs, spool uploads to disk."""
+import hashlib
+import json
+import os
+import tempfile
 from datetime import datetime
-from typing import Any, List, Dict
+from typing import Any, List, Dict, Optional
+
+from fastapi import HTTPException, Request, Response, UploadFile
+
+from config.settings import UPLOAD_CONFIG, HTTP_CACHE_CONFIG
 
 
 def serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
@@ -17,3 +25,84 @@ def serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
 def serialize_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Serialize a list of MongoDB-like docs."""
     return [serialize_doc(d) for d in docs]
+
+
+def make_etag(*parts) -> str:
+    """Strong ETag from version parts, e.g. make_etag("services", 12) -> '"services-12"'."""
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def query_key(**params) -> str:
+    """
+    Short stable digest of a request's query parameters (None values left
+    out), so an ETag'd list differs per filter, page size and cursor.
+    """
+    normalized = {
+        key: value.isoformat() if hasattr(value, "isoformat") else value
+        for key, value in params.items() if value is not None
+    }
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match names this ETag (the client copy is current)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def conditional_get(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Put ETag and Cache-Control on the response. Returns a 304 response to send
+    instead when the client's If-None-Match is current, else None.
+    """
+    max_age = HTTP_CACHE_CONFIG.get("max_age_seconds", 0)
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={max_age}, must-revalidate"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def spool_upload_to_disk(file: UploadFile, suffix: str = "") -> str:
+    """
+    Put an upload in a file of its own on disk and return its path; the
+    caller must delete it.
+
+    Oversized request bodies are already rejected before parsing
+    (api.middleware.UploadSizeLimitMiddleware); the parsed size is checked
+    again here. Starlette has already spooled the file part (in memory up to
+    1 MB, then in an anonymous temporary file), so this is one chunked copy
+    of it into UPLOAD_CONFIG["spool_directory"].
+    """
+    max_size = UPLOAD_CONFIG.get("max_size_bytes", 50 * 1024 * 1024)
+    chunk_size = UPLOAD_CONFIG.get("chunk_size_bytes", 1024 * 1024)
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"PDF file too large (max {max_size // (1024 * 1024)} MB)",
+    )
+
+    declared_size = getattr(file, "size", None)
+    if declared_size is not None and declared_size > max_size:
+        raise too_large
+
+    spool_dir = UPLOAD_CONFIG.get("spool_directory") or tempfile.gettempdir()
+    spool = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=spool_dir)
+    written = 0
+    try:
+        with spool:
+            await file.seek(0)
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_size:
+                    raise too_large
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name
@@ -12,7 +12,7 @@ from core.initialization import initialize_app
 setup_logging()
 logger = get_logger(__name__)
 
-# Initialize app on startup
+# Start the background warm-up (once per process; the page renders without waiting for it)
 if "app_initialized" not in st.session_state:
     logger.info("Initializing BSK Assistant Application...")
     initialize_results = initialize_app()
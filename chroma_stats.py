@@ -1,7 +1,7 @@
-"""
-Print ChromaDB stats for current persisted entries.
-Shows total chunks, unique files, and chunks per file.
-"""
+"""
+Print ChromaDB stats for current persisted entries.
+Shows total chunks, unique files, and chunks per file.
+"""
 from core.vector_store import vector_store_manager
 from collections import Counter
 
@@ -12,28 +12,32 @@ def main():
         return
 
     collection = vector_store_manager.collection
-    results = collection.get(include=["metadatas"]) or {}
-    ids = results.get("ids", []) or []
+    results = collection.get(include=["metadatas"]) or {}
+    ids = results.get("ids", []) or []
     metadatas = results.get("metadatas", []) or []
 
-    total_chunks = len(ids)
-    print(f"Persist dir: {vector_store_manager.persist_directory}")
-    print(f"Collection: {vector_store_manager.collection_name}")
-    print(f"Total chunks: {total_chunks}")
+    total_chunks = len(ids)
+    print(f"Persist dir: {vector_store_manager.persist_directory}")
+    print(f"Collection: {vector_store_manager.collection_name}")
+    print(f"Total chunks: {total_chunks}")
 
     if not metadatas:
         print("No metadata found.")
         return
 
     counts = Counter()
+    near_dups = Counter()
     for meta in metadatas:
         filename = (meta or {}).get("filename", "<missing filename>")
         counts[filename] += 1
+        if (meta or {}).get("near_dup_of"):
+            near_dups[filename] += 1
 
-    print(f"Total unique files: {len(counts)}")
-    print("\nChunks per file:")
+    print(f"Total unique files: {len(counts)}")
+    print(f"Near-duplicate chunks: {sum(near_dups.values())} ({sum(near_dups.values()) / total_chunks:.1%})")
+    print("\nChunks per file (near duplicates):")
     for filename, count in sorted(counts.items(), key=lambda x: x[0]):
-        print(f"- {filename}: {count}")
+        print(f"- {filename}: {count} ({near_dups[filename]}, {near_dups[filename] / count:.0%})")
 
 
 if __name__ == "__main__":
@@ -48,7 +48,10 @@ VECTOR_STORE_CONFIG = {
     "collection_name": "bsk_documents",
     "search_type": "similarity",
     "k": 6,
-    "fetch_k": 6,
+    # Candidates fetched before near-duplicate collapse trims them to k
+    "fetch_k": 12,
+    # Chunks per call for metadata-only bulk updates
+    "metadata_batch_size": 1000,
     "lambda_mult": 0.8
 }
 
@@ -57,7 +60,19 @@ VECTOR_STORE_CONFIG = {
 # ============================================================================
 DATABASE_CONFIG = {
     "mongo_uri": os.getenv("MONGODB_URI", "mongodb://localhost:27017"),
-    "mongo_db_name": os.getenv("MONGO_DB_NAME", "bsk_assistant")
+    "mongo_db_name": os.getenv("MONGO_DB_NAME", "bsk_assistant"),
+    # Connection pool (one pool per client; the API's sync and async clients share these settings)
+    "max_pool_size": int(os.getenv("MONGO_MAX_POOL_SIZE", "100")),
+    "min_pool_size": int(os.getenv("MONGO_MIN_POOL_SIZE", "0")),
+    "max_idle_time_ms": int(os.getenv("MONGO_MAX_IDLE_MS", "300000")),
+    # How long a request waits for a free connection before failing
+    "wait_queue_timeout_ms": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000")),
+    "server_selection_timeout_ms": 5000,
+    # Wire compression, e.g. "zstd,snappy,zlib" (zstd/snappy need their Python packages)
+    "compressors": os.getenv("MONGO_COMPRESSORS", ""),
+    # Command/pool monitoring listeners and the slow-query log threshold
+    "monitoring_enabled": os.getenv("MONGO_MONITORING_ENABLED", "true").lower() == "true",
+    "slow_query_ms": int(os.getenv("MONGO_SLOW_QUERY_MS", "100")),
 }
 # ============================================================================
 # MEMORY CONFIGURATION - Fixed Parameters
@@ -67,6 +82,160 @@ MEMORY_CONFIG = {
     "return_messages": True,
 }
 
+# Active chat sessions kept in memory (title, message_count, history tail)
+CHAT_CACHE_CONFIG = {
+    "max_sessions": int(os.getenv("CHAT_CACHE_SIZE", "1024")),
+    "idle_ttl_seconds": int(os.getenv("CHAT_CACHE_TTL", "1800")),
+}
+
+# Background dependency probing behind /health/ready
+HEALTH_CONFIG = {
+    "interval_seconds": float(os.getenv("HEALTH_PROBE_INTERVAL", "15")),
+    "timeout_seconds": float(os.getenv("HEALTH_PROBE_TIMEOUT", "3")),
+    # Results older than this many intervals count as failed (prober stuck)
+    "stale_after_intervals": 3,
+}
+
+# Startup warm-up: startup checks and heavy singletons (Chroma, RAG engine) built in parallel
+WARMUP_CONFIG = {
+    "enabled": os.getenv("WARMUP_ENABLED", "true").lower() == "true",
+    # Also load the chat and embedding models into Ollama memory before the first query
+    "preload_models": os.getenv("WARMUP_PRELOAD_MODELS", "true").lower() == "true",
+    "model_load_timeout_seconds": float(os.getenv("WARMUP_MODEL_LOAD_TIMEOUT", "120")),
+    "max_workers": 4,
+}
+
+# Services catalog cache (invalidated by a version document in collection_versions;
+# other processes see a change after at most version_check_seconds)
+CATALOG_CACHE_CONFIG = {
+    "enabled": os.getenv("SERVICES_CACHE_ENABLED", "true").lower() == "true",
+    "version_check_seconds": float(os.getenv("SERVICES_CACHE_CHECK_SECONDS", "2")),
+}
+
+# Cache-Control max-age of the ETag'd list endpoints (0 = revalidate on every request)
+HTTP_CACHE_CONFIG = {
+    "max_age_seconds": int(os.getenv("API_CACHE_MAX_AGE", "0")),
+    # Log writes bump the logs ETag version at most once per this many seconds (one
+    # collection_versions write per burst), so /logs may answer 304 for that long
+    "logs_version_delay_seconds": float(os.getenv("LOGS_VERSION_DELAY_SECONDS", "1")),
+}
+
+# Write-behind buffer for audit logs and chat writes (off = synchronous writes)
+WRITE_BEHIND_CONFIG = {
+    "enabled": os.getenv("WRITE_BEHIND_ENABLED", "false").lower() == "true",
+    "flush_interval_ms": int(os.getenv("WRITE_BEHIND_FLUSH_MS", "200")),
+    # Writers wait (then flush themselves) when this many writes are queued
+    "max_pending": int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000")),
+    "enqueue_timeout_seconds": 2.0,
+    # A write that keeps failing while MongoDB is reachable is retried this many times,
+    # then appended to dead_letter_path (JSON lines) and dropped
+    "max_attempts": int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "3")),
+    "dead_letter_path": os.getenv("WRITE_BEHIND_DEAD_LETTER_PATH", "logs/write_behind_dead_letters.jsonl"),
+}
+
+# ============================================================================
+# CHUNKING CONFIGURATION - Text splitting before embedding
+# ============================================================================
+CHUNKING_CONFIG = {
+    # "char" (character counts) or "token" (local tokenizer counts)
+    "mode": os.getenv("CHUNK_MODE", "char"),
+    # Character mode
+    "chunk_size": int(os.getenv("CHUNK_SIZE", 1000)),
+    "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", 350)),
+    # Token mode counts with the embedding model's tokenizer: a local tokenizer.json,
+    # else the Hugging Face tokenizer of EMBEDDING_MODEL (downloaded once, then cached).
+    # Only if neither loads is tiktoken used, and then budgets are approximate (cl100k
+    # is not the embedding tokenizer), so keep them well under max_embed_tokens.
+    "tokenizer_path": os.getenv("EMBED_TOKENIZER_PATH") or None,
+    "tokenizer_name": os.getenv("EMBED_TOKENIZER_NAME", "mixedbread-ai/mxbai-embed-large-v1") or None,
+    "tiktoken_encoding": "cl100k_base",
+    # mxbai-embed-large truncates input beyond this
+    "max_embed_tokens": 512,
+    # Per-language chunk budgets in tokens, applied per script segment of a page
+    # (a run of lines in one script); Indic scripts tokenize denser
+    "token_budgets": {
+        "English": 384,
+        "Bengali": 256,
+        "Hindi": 256,
+    },
+    "token_overlap": int(os.getenv("CHUNK_TOKEN_OVERLAP", 48)),
+}
+
+# ============================================================================
+# COLLECTION MIGRATION - Shadow re-embedding with a new model or chunking
+# ============================================================================
+MIGRATION_CONFIG = {
+    # Chunks embedded per second while building a shadow collection
+    "embed_rate_per_sec": float(os.getenv("MIGRATION_EMBED_RATE", 8)),
+    "batch_size": 16,
+    # Mean top-k document overlap required before switching (unless forced)
+    "min_overlap": 0.6,
+    # Days the collection replaced by a switch is kept for rollback before gc may drop it
+    "previous_retention_days": float(os.getenv("MIGRATION_PREVIOUS_RETENTION_DAYS", 7)),
+}
+
+# ============================================================================
+# NEAR-DUPLICATE DETECTION - MinHash / LSH over chunk text
+# ============================================================================
+NEAR_DUP_CONFIG = {
+    # Ingest handling of near-duplicate chunks: "off", "flag" (store and mark) or "skip" (link to existing)
+    "ingest_mode": os.getenv("NEAR_DUP_INGEST_MODE", "flag"),
+    # Collapse near-identical hits at query time
+    "collapse_on_query": True,
+    "num_perm": 64,
+    "bands": 16,
+    "shingle_size": 4,
+    "threshold": 0.8,
+}
+
+# ============================================================================
+# UPLOAD CONFIGURATION - Streaming to disk
+# ============================================================================
+UPLOAD_CONFIG = {
+    # Hard limit for a single PDF upload
+    "max_size_bytes": 50 * 1024 * 1024,
+    # Size of each read from the incoming request stream
+    "chunk_size_bytes": 1024 * 1024,
+    # Where spooled uploads are written (None = system temp dir)
+    "spool_directory": os.getenv("UPLOAD_SPOOL_DIRECTORY") or None,
+    # Allowance for multipart boundaries and form fields on top of max_size_bytes
+    # when request bodies are size-checked before parsing
+    "form_overhead_bytes": 64 * 1024,
+}
+
+# ============================================================================
+# WATCH FOLDER - Automatic ingestion of PDFs dropped into a directory
+# ============================================================================
+WATCH_CONFIG = {
+    # Start the watcher inside the FastAPI process (otherwise run scripts/watch_documents.py)
+    "enabled": os.getenv("WATCH_FOLDER_ENABLED", "false").lower() == "true",
+    # Layout: <directory>/<Department>/<Service>/[<Document Type>/]<file>.pdf
+    "directory": os.getenv("WATCH_DIRECTORY", "./documents"),
+    # A file is ingested once it has not changed for this many seconds
+    "debounce_seconds": 5,
+    "batch_size": 8,
+    "workers": 2,
+    # Ingest files that appeared or changed while the watcher was stopped
+    "scan_on_start": True,
+}
+
+# ============================================================================
+# CHAT RETENTION - Expiry of empty chats and archival of inactive ones
+# ============================================================================
+RETENTION_CONFIG = {
+    # Run the maintenance task inside the FastAPI process (otherwise run scripts/chat_maintenance.py)
+    "enabled": os.getenv("CHAT_MAINTENANCE_ENABLED", "false").lower() == "true",
+    # Chats that never received a message are removed by a TTL index after this long
+    "empty_chat_ttl_hours": int(os.getenv("EMPTY_CHAT_TTL_HOURS", "24")),
+    # Chats not updated for this many days move out of chat_history
+    "archive_after_days": int(os.getenv("CHAT_ARCHIVE_AFTER_DAYS", "90")),
+    # "mongo" (compressed chat_archive collection) or "jsonl" (gzipped files in archive_dir)
+    "archive_target": os.getenv("CHAT_ARCHIVE_TARGET", "mongo"),
+    "archive_dir": os.getenv("CHAT_ARCHIVE_DIR", "./archive/chats"),
+    "batch_size": 500,
+    "interval_hours": float(os.getenv("CHAT_MAINTENANCE_INTERVAL_HOURS", "6")),
+}
+
 # ============================================================================
 # FILE PATHS - Fixed
 # ============================================================================
@@ -0,0 +1,539 @@
+"""
+Async MongoDB data layer for the API.
+
+Mirrors the chat, document, service and log functions of core.db_manager on
+pymongo's AsyncMongoClient, so async route handlers await MongoDB instead of
+blocking the event loop or a threadpool thread. Everything but the I/O is
+shared with core.db_manager: filters, keyset cursors and pipelines, the
+record and update builders (_document_record, _append_update, ...), and the
+version bump; indexes are still created by core.db_manager.initialize_collections.
+"""
+import asyncio
+from datetime import datetime, timezone
+
+from gridfs import AsyncGridFSBucket
+from gridfs.errors import NoFile
+from pymongo import ReturnDocument
+
+from db.mongo_client import get_async_db
+from core.db_manager import (
+    ACTIVE_MIGRATION_FILTER,
+    CHAT_SUMMARY_PROJECTION,
+    _append_update,
+    _chat_summaries_filter,
+    _chat_summaries_page,
+    _document_content_update,
+    _document_metadata_fields,
+    _document_record,
+    _embedded_chat_filter,
+    _isoformat_dates,
+    _log_record,
+    _logs_changed,
+    _logs_filter,
+    _logs_page,
+    _logs_page_filter,
+    _merge_embedded_messages,
+    _message_record,
+    _moved_chat_update,
+    _moved_message_upserts,
+    _new_chat_record,
+    _new_service_update,
+    _seq_chat_filter,
+    _serialize_message,
+    _service_counts_pipeline,
+    _service_pairs,
+    _service_status_filter,
+    _service_status_update,
+    _service_upsert_update,
+    _texts_to_release,
+    _version_bump_update,
+)
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _collection(name: str):
+    return get_async_db()[name]
+
+
+# ======================================================
+# DOCUMENTS COLLECTION
+# ======================================================
+
+async def add_document(filename: str, department: str, service: str, document_type: str = "",
+                       file_hash: str = None, chunk_ids: list = None, duplicate_of: str = None,
+                       dedup_stats: dict = None):
+    """Add a document record (see core.db_manager.add_document)."""
+    record = _document_record(filename, department, service, document_type,
+                              file_hash, chunk_ids, duplicate_of, dedup_stats)
+    try:
+        await _collection("documents").insert_one(record)
+    except Exception:
+        # Ingestion stored the text before this record; don't leave it orphaned
+        await release_document_text(file_hash)
+        raise
+    await _documents_changed([filename])
+
+
+async def delete_document(filename: str):
+    """Delete a document record and mark services left without documents Inactive."""
+    documents = _collection("documents")
+    docs = await documents.find(
+        {"filename": filename}, {"department": 1, "service": 1, "file_hash": 1}
+    ).to_list(None)
+    affected = _service_pairs(docs)
+    file_hashes = {d.get("file_hash") for d in docs if d.get("file_hash")}
+
+    if (await documents.delete_many({"filename": filename})).deleted_count:
+        await _documents_changed([filename])
+    for file_hash in file_hashes:
+        await release_document_text(file_hash)
+
+    await _deactivate_empty_services(affected)
+
+
+async def _deactivate_empty_services(pairs):
+    for dept, serv in pairs:
+        try:
+            if await get_document_count_for_service(dept, serv) == 0:
+                await update_service_status(dept, serv, "Inactive")
+        except Exception:
+            continue
+
+
+async def find_document(filename: str):
+    """Find a document by filename."""
+    return await _collection("documents").find_one({"filename": filename})
+
+
+async def get_all_documents():
+    """Get all documents (chunk ownership lists are left out)."""
+    return await _collection("documents").find({}, {"_id": 0, "chunk_ids": 0}).to_list(None)
+
+
+async def get_documents_by_department_service(department: str, service: str):
+    """Get all documents for a specific department and service."""
+    return await _collection("documents").find(
+        {"department": department, "service": service},
+        {"_id": 0, "chunk_ids": 0}
+    ).to_list(None)
+
+
+async def update_document_content(filename: str, file_hash: str, chunk_ids: list, dedup_stats: dict = None):
+    """Record a new content version (file hash and owned chunk IDs) for a document."""
+    try:
+        previous = await _collection("documents").find_one_and_update(
+            {"filename": filename},
+            _document_content_update(file_hash, chunk_ids, dedup_stats),
+            projection={"file_hash": 1}
+        )
+    except Exception:
+        await release_document_text(file_hash)
+        raise
+    await _documents_changed([filename])
+    for released in _texts_to_release(previous, file_hash):
+        await release_document_text(released)
+
+
+async def update_documents_metadata(filenames: list, department: str = None, service: str = None,
+                                    document_type: str = None) -> int:
+    """Reclassify many documents in one update and keep service statuses in sync."""
+    update_fields = _document_metadata_fields(department, service, document_type)
+    if not filenames or not update_fields:
+        return 0
+
+    documents = _collection("documents")
+    match = {"filename": {"$in": list(filenames)}}
+    previous = set()
+    if department or service:
+        previous = _service_pairs(await documents.find(match, {"department": 1, "service": 1}).to_list(None))
+
+    update_fields["updated_at"] = datetime.now(timezone.utc)
+    result = await documents.update_many(match, {"$set": update_fields})
+    if result.modified_count:
+        await _collection_changed("documents")
+
+    if department and service:
+        await upsert_service(department, service, "Active")
+    await _deactivate_empty_services(previous)
+    return result.modified_count
+
+
+async def release_document_text(file_hash: str):
+    """Delete stored text for a file hash once no document record uses it."""
+    try:
+        if not file_hash or await _collection("documents").count_documents({"file_hash": file_hash}, limit=1):
+            return
+        record = await _collection("document_texts").find_one_and_delete({"file_hash": file_hash})
+        if record and record.get("gridfs_id") is not None:
+            bucket = AsyncGridFSBucket(get_async_db(), bucket_name="document_text_files")
+            try:
+                await bucket.delete(record["gridfs_id"])
+            except NoFile:
+                pass
+    except Exception as e:
+        logger.error(f"Error releasing document text: {e}")
+
+
+# ======================================================
+# COLLECTION MIGRATIONS
+# ======================================================
+
+async def migration_get_active():
+    """Get the migration currently building or awaiting a switch (None if none)."""
+    return await _collection("collection_migrations").find_one(
+        ACTIVE_MIGRATION_FILTER, {"_id": 0}, sort=[("created_at", -1)]
+    )
+
+
+# ======================================================
+# COLLECTION VERSIONS
+# ======================================================
+
+async def get_collection_version(name: str) -> int:
+    """Change version of a cached collection (0 if it was never bumped)."""
+    doc = await _collection("collection_versions").find_one({"_id": name}, {"version": 1})
+    return (doc or {}).get("version", 0)
+
+
+async def get_collection_versions(*names: str) -> dict:
+    """Change versions of several collections in one query ({name: version})."""
+    docs = await _collection("collection_versions").find(
+        {"_id": {"$in": list(names)}}, {"version": 1}
+    ).to_list(None)
+    versions = {d["_id"]: d.get("version", 0) for d in docs}
+    return {name: versions.get(name, 0) for name in names}
+
+
+async def bump_collection_version(name: str) -> int:
+    """Record a change to a cached collection. Returns the new version."""
+    doc = await _collection("collection_versions").find_one_and_update(
+        {"_id": name}, _version_bump_update(), upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+async def _collection_changed(name: str):
+    """Bump a collection's change version (ETags, caches); never fails the write (see core.db_manager)."""
+    try:
+        await bump_collection_version(name)
+    except Exception as e:
+        logger.error(f"Error bumping {name} version: {e}")
+
+
+async def _documents_changed(filenames: list):
+    """Bump the documents version and queue a migration sync (see core.db_manager._documents_changed)."""
+    await _collection_changed("documents")
+    try:
+        from core.collection_migration import collection_migrator
+        await collection_migrator.anotify_changed(filenames)
+    except Exception as e:
+        logger.error(f"Error queueing migration sync for {filenames}: {e}")
+
+
+async def _services_changed():
+    """Bump the services catalog version and drop this process's cached copy."""
+    await _collection_changed("services")
+    from core.catalog_cache import services_catalog
+    services_catalog.invalidate()
+
+
+# ======================================================
+# SERVICES COLLECTION
+# ======================================================
+
+async def add_service(department: str, service: str):
+    """Add a new service (defaults to Inactive)."""
+    result = await _collection("services").update_one(
+        {"department": department, "service": service},
+        _new_service_update(department, service),
+        upsert=True
+    )
+    if result.upserted_id is not None:
+        await _services_changed()
+
+
+async def upsert_service(department: str, service: str, status: str = None):
+    """Upsert a service record (insert if missing, update if exists)."""
+    result = await _collection("services").update_one(
+        {"department": department, "service": service},
+        _service_upsert_update(department, service, status),
+        upsert=True
+    )
+    if result.upserted_id is not None or result.modified_count:
+        await _services_changed()
+
+
+async def get_all_services():
+    """Get all services."""
+    return await _collection("services").find({}, {"_id": 0}).sort("department", 1).to_list(None)
+
+
+async def get_services_by_department(department: str):
+    """Get all services for a department."""
+    return await _collection("services").find(
+        {"department": department}, {"_id": 0}
+    ).sort("service", 1).to_list(None)
+
+
+async def update_service_status(department: str, service: str, status: str):
+    """Update service status."""
+    result = await _collection("services").update_one(
+        _service_status_filter(department, service, status),
+        _service_status_update(status)
+    )
+    if result.modified_count:
+        await _services_changed()
+
+
+async def get_service_document_counts(department: str = None):
+    """Per-(department, service) document counts with service status, in one aggregation."""
+    cursor = await _collection("documents").aggregate(_service_counts_pipeline(department))
+    return await cursor.to_list(None)
+
+
+async def get_document_count_for_service(department: str, service: str):
+    """Count documents for a specific service."""
+    return await _collection("documents").count_documents({"department": department, "service": service})
+
+
+# ======================================================
+# LOGS COLLECTION
+# ======================================================
+
+async def log_action(department: str, service: str, document_name: str, document_type: str, action: str):
+    """Log an action (queued when the write-behind buffer is enabled)."""
+    try:
+        entry = _log_record({
+            "department": department,
+            "service": service,
+            "document_name": document_name,
+            "document_type": document_type,
+            "action": action
+        })
+        from core.write_buffer import write_buffer
+        if write_buffer.enabled:
+            # Enqueueing can wait on back-pressure, so keep it off the event loop
+            if not await asyncio.to_thread(write_buffer.add_log, entry):
+                raise RuntimeError("write-behind queue is full")
+            return
+        await _collection("logs").insert_one(entry)
+        _logs_changed()
+    except Exception as e:
+        logger.error(f"Error logging action: {e}")
+
+
+async def query_logs(limit: int = 100, cursor: str = None, **filters) -> dict:
+    """One page of logs, newest first (see core.db_manager.query_logs)."""
+    logs = await _collection("logs").find(_logs_page_filter(cursor, **filters)) \
+        .sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1).to_list(None)
+    return _logs_page(logs, limit)
+
+
+async def iter_logs(batch_size: int = 1000, **filters):
+    """Stream matching logs (newest first) without loading them all into memory."""
+    cursor = _collection("logs").find(_logs_filter(**filters), {"_id": 0}) \
+        .sort("timestamp", -1).batch_size(batch_size)
+    try:
+        async for log in cursor:
+            yield log
+    finally:
+        await cursor.close()
+
+
+async def get_log_filter_options(department: str = None) -> dict:
+    """Distinct departments, services (optionally of one department) and actions in the logs."""
+    logs = _collection("logs")
+    departments, services, actions = await asyncio.gather(
+        logs.distinct("department"),
+        logs.distinct("service", {"department": department} if department else {}),
+        logs.distinct("action"),
+    )
+    return {
+        "departments": sorted(d for d in departments if d),
+        "services": sorted(s for s in services if s),
+        "actions": sorted(a for a in actions if a),
+    }
+
+
+# ======================================================
+# CHAT HISTORY COLLECTION
+# ======================================================
+
+async def chat_create(chat_id: str, title: str = "New Chat") -> bool:
+    """Create a new chat session (messages live in chat_messages)."""
+    try:
+        await _collection("chat_history").insert_one(_new_chat_record(chat_id, title))
+        return True
+    except Exception as e:
+        logger.error(f"Error creating chat: {e}")
+        return False
+
+
+async def chat_get_by_id(chat_id: str, include_messages: bool = False):
+    """Get a chat by chat_id (ISO dates, no _id), or None."""
+    doc = await _collection("chat_history").find_one({"chat_id": chat_id}, {"_id": 0, "messages": 0})
+    if doc:
+        _isoformat_dates(doc)
+        if include_messages:
+            doc["messages"] = await chat_get_messages(chat_id)
+    return doc
+
+
+async def chat_touch(chat_id: str) -> bool:
+    """Mark an empty chat as in use (last_active_at = now), postponing its expiry."""
+    result = await _collection("chat_history").update_one(
+        {"chat_id": chat_id, "message_count": 0},
+        {"$set": {"last_active_at": datetime.now(timezone.utc)}}
+    )
+    return result.matched_count > 0
+
+
+async def chat_update_title(chat_id: str, title: str) -> bool:
+    """Update chat title and updated_at."""
+    try:
+        await _collection("chat_history").update_one(
+            {"chat_id": chat_id},
+            {"$set": {"title": title, "updated_at": datetime.now(timezone.utc)}}
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Error updating chat title: {e}")
+        return False
+
+
+async def chat_append_message(chat_id: str, role: str, content: str):
+    """
+    Append a message to a chat; the seq is allocated with $inc on message_count.
+
+    Returns:
+        The updated chat record, or None on failure
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        chat = await _chat_reserve_seqs(chat_id, _append_update(now), {"_id": 0, "messages": 0})
+        if not chat:
+            return None
+        await _collection("chat_messages").insert_one(_message_record(chat_id, chat["message_count"], role, content, now))
+        return _isoformat_dates(chat)
+    except Exception as e:
+        logger.error(f"Error appending message: {e}")
+        return None
+
+
+async def _chat_reserve_seqs(chat_id: str, update: dict, projection: dict):
+    """Apply a message_count $inc, moving a legacy chat's embedded messages first (see core.db_manager)."""
+    chats = _collection("chat_history")
+    query = _seq_chat_filter(chat_id)
+    chat = await chats.find_one_and_update(query, update, projection=projection, return_document=ReturnDocument.AFTER)
+    if chat is None and await chat_migrate_embedded_messages(chat_id):
+        # Legacy chat: its embedded messages were just moved, so the new seq follows them
+        chat = await chats.find_one_and_update(query, update, projection=projection, return_document=ReturnDocument.AFTER)
+    return chat
+
+
+async def chat_migrate_embedded_messages(chat_id: str) -> bool:
+    """Move a chat's embedded messages into chat_messages. False if it has none (or does not exist)."""
+    chat = await _collection("chat_history").find_one(_embedded_chat_filter(chat_id), {"chat_id": 1, "messages": 1})
+    if not chat:
+        return False
+    await chat_move_messages(chat)
+    return True
+
+
+async def chat_move_messages(chat: dict) -> int:
+    """Move one chat's embedded messages into chat_messages (see core.db_manager.chat_move_messages)."""
+    messages = _collection("chat_messages")
+    embedded = chat.get("messages") or []
+    rows = await messages.find({"chat_id": chat["chat_id"]}, {"_id": 0}).sort("seq", 1).to_list(None)
+    ordered = _merge_embedded_messages(embedded, rows)
+    if len(ordered) > len(embedded):
+        # Newer rows are renumbered after the embedded messages
+        await messages.delete_many({"chat_id": chat["chat_id"]})
+
+    operations = _moved_message_upserts(chat["chat_id"], ordered)
+    if operations:
+        await messages.bulk_write(operations, ordered=False)
+
+    await _collection("chat_history").update_one(
+        {"_id": chat["_id"], "messages": {"$exists": True}},
+        _moved_chat_update(len(ordered))
+    )
+    return len(ordered)
+
+
+async def chat_get_messages_page(chat_id: str, after_seq: int = 0, limit: int = 50) -> dict:
+    """One page of a chat's messages in seq order, with next_cursor (None on the last page)."""
+    messages = await _collection("chat_messages").find(
+        {"chat_id": chat_id, "seq": {"$gt": after_seq or 0}},
+        {"_id": 0, "chat_id": 0}
+    ).sort("seq", 1).limit(limit + 1).to_list(None)
+    messages = [_serialize_message(m) for m in messages]
+    if not messages:
+        # Not yet migrated: page through the embedded array instead
+        messages = [m for m in await _legacy_messages(chat_id) if (m.get("seq") or 0) > (after_seq or 0)][:limit + 1]
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return {
+        "messages": messages,
+        "next_cursor": messages[-1]["seq"] if has_more else None
+    }
+
+
+async def chat_get_messages(chat_id: str):
+    """Get all messages of a chat in seq order, with serializable timestamps."""
+    messages = await _collection("chat_messages").find(
+        {"chat_id": chat_id}, {"_id": 0, "chat_id": 0}
+    ).sort("seq", 1).to_list(None)
+    return [_serialize_message(m) for m in messages] or await _legacy_messages(chat_id)
+
+
+async def chat_get_recent_messages(chat_id: str, limit: int) -> list:
+    """Get the last `limit` messages of a chat in seq order (role, content, seq only)."""
+    if limit <= 0:
+        return []
+    messages = await _collection("chat_messages").find(
+        {"chat_id": chat_id},
+        {"_id": 0, "seq": 1, "role": 1, "content": 1}
+    ).sort("seq", -1).limit(limit).to_list(None)
+    if messages:
+        messages.reverse()
+        return messages
+
+    chat = await _collection("chat_history").find_one(
+        {"chat_id": chat_id, "messages.0": {"$exists": True}},
+        {"_id": 0, "messages": {"$slice": -limit}}
+    )
+    return [
+        {"seq": m.get("seq"), "role": m.get("role"), "content": m.get("content", "")}
+        for m in (chat or {}).get("messages", [])
+    ]
+
+
+async def _legacy_messages(chat_id: str) -> list:
+    """Messages embedded in chats not yet moved by scripts/migrate_chat_messages.py."""
+    chat = await _collection("chat_history").find_one(
+        {"chat_id": chat_id, "messages.0": {"$exists": True}}, {"_id": 0, "messages": 1}
+    )
+    return [_serialize_message(m) for m in (chat or {}).get("messages", [])]
+
+
+async def chat_delete(chat_id: str) -> bool:
+    """Delete a chat session and its messages."""
+    try:
+        result = await _collection("chat_history").delete_one({"chat_id": chat_id})
+        await _collection("chat_messages").delete_many({"chat_id": chat_id})
+        return result.deleted_count > 0
+    except Exception as e:
+        logger.error(f"Error deleting chat: {e}")
+        return False
+
+
+async def chat_list_summaries(limit: int = 20, cursor: str = None) -> dict:
+    """One page of chat summaries, most recently updated first (see core.db_manager)."""
+    docs = await _collection("chat_history").find(
+        _chat_summaries_filter(cursor),
+        CHAT_SUMMARY_PROJECTION
+    ).sort([("updated_at", -1), ("chat_id", -1)]).limit(limit + 1).to_list(None)
+    return _chat_summaries_page(docs, limit)
@@ -0,0 +1,138 @@
+"""
+In-process cache of the services catalog.
+
+The catalog is read on almost every Streamlit rerun and /services request but
+changes rarely. Every write in core.db_manager / core.async_db_manager bumps
+the "services" document in collection_versions and invalidates this
+process's copy; other processes (API workers, the Streamlit app) notice the
+bump by re-reading that one small document at most every
+version_check_seconds. The version also serves as the /services ETag.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import CATALOG_CACHE_CONFIG
+
+COLLECTION = "services"
+
+
+class ServicesCatalogCache:
+    """Services list cached by collection version."""
+
+    def __init__(self, enabled: bool = None, version_check_seconds: float = None):
+        self.enabled = CATALOG_CACHE_CONFIG.get("enabled", True) if enabled is None else enabled
+        self.version_check_seconds = (
+            CATALOG_CACHE_CONFIG.get("version_check_seconds", 2.0)
+            if version_check_seconds is None else version_check_seconds
+        )
+        self._lock = threading.Lock()
+        self._services: Optional[List[Dict]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._generation = 0  # bumped by invalidate()
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self) -> bool:
+        """Whether the cached list may be served without checking the version. Caller holds the lock."""
+        return (
+            self._services is not None
+            and time.monotonic() - self._checked_at < self.version_check_seconds
+        )
+
+    def _store(self, generation: int, version: int, services: List[Dict]):
+        with self._lock:
+            if generation != self._generation:
+                # Invalidated while loading: the list may predate that write
+                return
+            self._version = version
+            self._services = services
+            self._checked_at = time.monotonic()
+
+    def _serve(self) -> Tuple[int, List[Dict]]:
+        self.hits += 1
+        return self._version, [dict(s) for s in self._services]
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def catalog(self) -> Tuple[int, List[Dict]]:
+        """(version, services); services have the shape of db_manager.get_all_services."""
+        from core.db_manager import get_all_services, get_collection_version
+
+        with self._lock:
+            if self.enabled and self._fresh():
+                return self._serve()
+        # Read the version first: a write racing the reload leaves a newer
+        # version behind, so the next check reloads again
+        version = get_collection_version(COLLECTION)
+        with self._lock:
+            if self.enabled and self._services is not None and version == self._version:
+                self._checked_at = time.monotonic()
+                return self._serve()
+            self.misses += 1
+            generation = self._generation
+        services = get_all_services()
+        if self.enabled:
+            self._store(generation, version, services)
+        return version, [dict(s) for s in services]
+
+    async def acatalog(self) -> Tuple[int, List[Dict]]:
+        """Async catalog() for the API (uses core.async_db_manager)."""
+        from core.async_db_manager import get_all_services, get_collection_version
+
+        with self._lock:
+            if self.enabled and self._fresh():
+                return self._serve()
+        version = await get_collection_version(COLLECTION)
+        with self._lock:
+            if self.enabled and self._services is not None and version == self._version:
+                self._checked_at = time.monotonic()
+                return self._serve()
+            self.misses += 1
+            generation = self._generation
+        services = await get_all_services()
+        if self.enabled:
+            self._store(generation, version, services)
+        return version, [dict(s) for s in services]
+
+    def get_all(self) -> List[Dict]:
+        """All services, sorted by department."""
+        return self.catalog()[1]
+
+    def get_by_department(self, department: str) -> List[Dict]:
+        """Services of one department, sorted by service name."""
+        return sorted(
+            (s for s in self.get_all() if s.get("department") == department),
+            key=lambda s: s.get("service") or ""
+        )
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Drop the cached list (called after a services write in this process)."""
+        with self._lock:
+            self._services = None
+            self._version = None
+            self._checked_at = 0.0
+            self._generation += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self._version,
+                "services": len(self._services) if self._services is not None else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Global instance
+services_catalog = ServicesCatalogCache()
@@ -0,0 +1,226 @@
+"""
+Text splitting for document ingestion.
+
+"char" mode is the original character splitter. "token" mode measures chunks
+with the embedding model's tokenizer so every chunk fits its context window,
+using a per-language token budget. The language is detected per line, so a
+bilingual page is split into script segments, each with its own budget.
+"""
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.docstore.document import Document
+from config.settings import CHUNKING_CONFIG
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Unicode blocks of the Indic scripts served by BSK
+SCRIPT_RANGES = {
+    "Bengali": ("\u0980", "\u09FF"),
+    "Hindi": ("\u0900", "\u097F"),
+}
+
+# Paragraphs, lines, sentences (incl. danda), then words
+TOKEN_SEPARATORS = ["\n\n", "\n", "।", "॥", ". ", "? ", " ", ""]
+
+# Lines with fewer letters than this do not start a new script segment
+MIN_SCRIPT_LETTERS = 12
+
+
+def detect_script(text: str) -> str:
+    """
+    Detect the dominant script of a text.
+    Returns: 'Bengali', 'Hindi' or 'English' (Latin and everything else)
+    """
+    counts = {language: 0 for language in SCRIPT_RANGES}
+    letters = 0
+    for char in text or "":
+        if not char.isalpha():
+            continue
+        letters += 1
+        for language, (low, high) in SCRIPT_RANGES.items():
+            if low <= char <= high:
+                counts[language] += 1
+                break
+
+    if not letters:
+        return "English"
+    language, count = max(counts.items(), key=lambda item: item[1])
+    # Indic chunks are several times denser, so a minority share already dominates the token count
+    return language if count / letters >= 0.3 else "English"
+
+
+def split_by_script(text: str) -> List[Tuple[str, str]]:
+    """
+    Split a text into runs of lines with the same dominant script.
+    Returns [(language, text)] in order. Lines with fewer than
+    MIN_SCRIPT_LETTERS letters (numbers, headings, stray words) stay with the
+    run they are in, so a bilingual page becomes a few segments, not many.
+    """
+    runs: List[List] = []  # [language or None, lines]
+    for line in (text or "").split("\n"):
+        letters = sum(1 for char in line if char.isalpha())
+        language = detect_script(line) if letters >= MIN_SCRIPT_LETTERS else None
+        if runs and (language is None or runs[-1][0] in (None, language)):
+            runs[-1][0] = runs[-1][0] or language
+            runs[-1][1].append(line)
+        else:
+            runs.append([language, [line]])
+
+    segments = []
+    for language, lines in runs:
+        segment = "\n".join(lines).strip()
+        if segment:
+            segments.append((language or detect_script(segment), segment))
+    return segments
+
+
+def clean_pdf_text(text: str) -> str:
+    """Clean and normalize extracted PDF text.
+
+    - Fix hyphenation at line breaks
+    - Normalize newlines and whitespace
+    - Remove non-printable characters
+    """
+    if not text:
+        return ""
+
+    # Normalize CRLF to LF
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+
+    # Remove hyphenation where words are split at line breaks
+    text = re.sub(r"-\n\s*", "", text)
+
+    # Collapse multiple newlines to at most two
+    text = re.sub(r"\n{3,}", "\n\n", text)
+
+    # Collapse multiple spaces/tabs
+    text = re.sub(r"[ \t]{2,}", " ", text)
+
+    # Remove non-printable characters except newline
+    text = ''.join(ch for ch in text if ch.isprintable() or ch == '\n')
+
+    # Strip leading/trailing whitespace
+    return text.strip()
+
+
+
+def merge_page_texts(pages: List[str]) -> str:
+    """
+    Join cleaned page texts into the document text that gets chunked.
+    Ingestion and reindexing both use this, so they produce the same chunks.
+    """
+    return clean_pdf_text("\n".join(page for page in pages if page))
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Optional[Callable[[str], int]]:
+    """
+    Build a token counting function from the embedding model's tokenizer.
+
+    Uses a local tokenizer.json when configured, else the model's Hugging Face
+    tokenizer (CHUNKING_CONFIG["tokenizer_name"]). tiktoken is only the last
+    resort: its counts differ from the embedding model's, so budgets become
+    approximate. Returns None when nothing can be loaded.
+    """
+    tokenizer_path = CHUNKING_CONFIG.get("tokenizer_path")
+    tokenizer_name = CHUNKING_CONFIG.get("tokenizer_name")
+    for source in (tokenizer_path, tokenizer_name):
+        if not source:
+            continue
+        try:
+            from tokenizers import Tokenizer
+            if source == tokenizer_path:
+                tokenizer = Tokenizer.from_file(source)
+            else:
+                tokenizer = Tokenizer.from_pretrained(source)
+            tokenizer.no_truncation()
+            logger.info(f"✓ Chunk tokenizer loaded from {source}")
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        except Exception as e:
+            logger.warning(f"⚠ Could not load tokenizer from {source}: {e}")
+
+    try:
+        import tiktoken
+        encoding_name = CHUNKING_CONFIG.get("tiktoken_encoding", "cl100k_base")
+        encoding = tiktoken.get_encoding(encoding_name)
+        logger.warning(f"⚠ Chunk tokenizer: tiktoken {encoding_name}; token budgets are approximate "
+                       f"(not the embedding model's tokenizer)")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        logger.warning(f"⚠ Could not load tiktoken encoding: {e}")
+
+    return None
+
+
+class TokenBudgetSplitter:
+    """Recursive splitter measured in tokens, with a chunk budget per script segment's language."""
+
+    def __init__(self, count_tokens: Callable[[str], int], budgets: Dict[str, int],
+                 overlap: int, max_tokens: int):
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.budgets = {language: min(budget, max_tokens) for language, budget in budgets.items()}
+        self.overlap = overlap
+        self._splitters = {}
+
+    def _splitter_for(self, language: str) -> RecursiveCharacterTextSplitter:
+        if language not in self._splitters:
+            budget = self.budgets.get(language) or self.budgets.get("English") or self.max_tokens
+            self._splitters[language] = RecursiveCharacterTextSplitter(
+                chunk_size=budget,
+                # Overlap never takes more than a quarter of the budget
+                chunk_overlap=min(self.overlap, budget // 4),
+                length_function=self.count_tokens,
+                separators=TOKEN_SEPARATORS
+            )
+        return self._splitters[language]
+
+    def split_documents(self, documents: List[Document]) -> List[Document]:
+        """
+        Split documents, tagging each chunk with its language and token count.
+        Each script segment (see split_by_script) is split with its own
+        language's budget, so chunks never mix scripts across paragraphs.
+        """
+        chunks = []
+        for document in documents:
+            for language, text in split_by_script(document.page_content):
+                segment = Document(page_content=text, metadata=dict(document.metadata))
+                for chunk in self._splitter_for(language).split_documents([segment]):
+                    tokens = self.count_tokens(chunk.page_content)
+                    if tokens > self.max_tokens:
+                        logger.warning(
+                            f"⚠ Chunk of {tokens} tokens exceeds embedding limit {self.max_tokens} "
+                            f"({document.metadata.get('filename', 'unknown')})"
+                        )
+                    chunk.metadata["chunk_language"] = language
+                    chunk.metadata["token_count"] = tokens
+                    chunks.append(chunk)
+        return chunks
+
+
+def get_text_splitter(mode: Optional[str] = None):
+    """
+    Get the text splitter for a chunking mode (defaults to CHUNKING_CONFIG["mode"]).
+    Token mode falls back to the character splitter when no tokenizer is available.
+    """
+    mode = (mode or CHUNKING_CONFIG.get("mode", "char")).lower()
+    if mode == "token":
+        count_tokens = get_token_counter()
+        if count_tokens:
+            return TokenBudgetSplitter(
+                count_tokens,
+                budgets=CHUNKING_CONFIG.get("token_budgets", {}),
+                overlap=CHUNKING_CONFIG.get("token_overlap", 48),
+                max_tokens=CHUNKING_CONFIG.get("max_embed_tokens", 512)
+            )
+        logger.warning("⚠ No local tokenizer available, falling back to character chunking")
+    elif mode != "char":
+        logger.warning(f"⚠ Unknown chunk mode '{mode}', using character chunking")
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNKING_CONFIG.get("chunk_size", 1000),
+        chunk_overlap=CHUNKING_CONFIG.get("chunk_overlap", 350)
+    )
@@ -0,0 +1,534 @@
+"""
+Zero-downtime re-embedding of the knowledge base.
+
+A migration builds a shadow Chroma collection with a new embedding model
+and/or chunking while the active collection keeps serving queries. Uploads,
+replacements and deletes made during the build are mirrored into the shadow
+collection, retrieval on both is compared on a sample query set, and the
+active collection is then switched atomically (see ChromaVectorStore.switch_collection).
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from langchain.docstore.document import Document
+from config.settings import MIGRATION_CONFIG, VECTOR_STORE_CONFIG
+from core.vector_store import vector_store_manager
+from core.chunking import merge_page_texts, get_text_splitter
+from core.db_manager import (
+    documents_collection,
+    find_document,
+    load_document_text,
+    migration_create,
+    migration_get,
+    migration_get_active,
+    migration_get_switched,
+    migration_update,
+    migration_doc_get,
+    migration_doc_set,
+    migration_doc_delete,
+    migration_docs,
+    migration_docs_delete_all,
+    set_document_chunk_ids,
+)
+from models.embeddings import get_embeddings
+from utils.hashing import (
+    chunk_hash,
+    chunk_id_for_hash,
+    split_owners,
+    join_owners,
+    owner_fields,
+    split_owner_meta,
+    join_owner_meta,
+    with_owners,
+    owner_view,
+)
+from utils.minhash import get_minhasher
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Seconds an active-migration lookup is reused by dual-write checks
+ACTIVE_CACHE_SECONDS = 5.0
+
+
+class RateLimiter:
+    """Token bucket limiting how many chunks per second are sent to the embedder."""
+
+    def __init__(self, rate_per_sec: float):
+        self.rate = max(rate_per_sec, 0.0)
+        self.capacity = max(self.rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count: int = 1):
+        """Block until count tokens are available (no limit when rate is 0)."""
+        if not self.rate:
+            return
+        remaining = count
+        while remaining > 0:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                take = min(remaining, int(self.tokens))
+                self.tokens -= take
+                remaining -= take
+                wait = 0.0 if remaining <= 0 else (min(remaining, self.capacity) - self.tokens) / self.rate
+            if wait > 0:
+                time.sleep(wait)
+
+
+class CollectionMigrator:
+    """Builds, syncs, compares and switches shadow collections."""
+
+    def __init__(self):
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._active = None
+        self._active_checked_at = 0.0
+        self._embeddings = {}
+        self._limiter = RateLimiter(MIGRATION_CONFIG.get("embed_rate_per_sec", 8))
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, embedding_model: str, rechunk: bool = False, target: Optional[str] = None) -> Dict:
+        """Create the shadow collection and register the migration."""
+        active = migration_get_active()
+        if active:
+            raise RuntimeError(f"Migration to '{active['target']}' is already {active['status']}")
+
+        if not target:
+            slug = re.sub(r"[^a-z0-9]+", "_", embedding_model.lower()).strip("_")[:32]
+            base = VECTOR_STORE_CONFIG.get("collection_name", vector_store_manager.collection_name).split("__")[0]
+            target = f"{base}__{slug}_{datetime.now().strftime('%Y%m%d%H%M')}"
+        if target in vector_store_manager.list_collections():
+            raise RuntimeError(f"Collection '{target}' already exists")
+
+        vector_store_manager.open_collection(target, embedding_model, create=True)
+        migration = migration_create(target, vector_store_manager.collection_name, embedding_model, rechunk)
+        self._active = None
+        logger.info(f"✓ Started migration {migration['source']} -> {target} ({embedding_model}, rechunk={rechunk})")
+        return migration
+
+    def build(self, target: str, progress=None) -> Dict:
+        """
+        Sync every document into the shadow collection, resuming where a
+        previous build stopped. Marks the migration 'ready' when done.
+
+        Args:
+            target: Shadow collection name
+            progress: Optional callable(done, total) for progress reporting
+        """
+        migration = self._require(target, ("building", "ready"))
+        records = list(documents_collection.find({}, {"filename": 1, "file_hash": 1, "chunk_ids": 1}))
+        counts = {"synced": 0, "skipped": 0, "removed": 0, "errors": 0}
+        total = len(records)
+
+        for done, record in enumerate(records, start=1):
+            filename = record.get("filename")
+            try:
+                if self._is_synced(migration, record):
+                    counts["skipped"] += 1
+                else:
+                    self.sync_document(migration, filename)
+                    counts["synced"] += 1
+            except Exception as e:
+                counts["errors"] += 1
+                logger.error(f"✗ Migration sync failed for {filename}: {e}")
+            if progress:
+                progress(done, total)
+            if done % 10 == 0 or done == total:
+                migration_update(target, progress={"done": done, "total": total})
+
+        # Documents deleted since they were synced
+        counts["removed"] = self.catch_up(target, removals_only=True)
+
+        if not counts["errors"]:
+            migration_update(target, status="ready", build_counts=counts)
+        logger.info(f"Migration build {target}: {counts}")
+        return counts
+
+    def catch_up(self, target: str, removals_only: bool = False) -> int:
+        """Re-sync documents whose shadow state no longer matches MongoDB. Returns documents synced."""
+        migration = self._require(target, ("building", "ready"))
+        current = {
+            r["filename"]: r
+            for r in documents_collection.find({}, {"filename": 1, "file_hash": 1, "chunk_ids": 1})
+        }
+        synced = set()
+        for state in list(migration_docs(target)):
+            filename = state["filename"]
+            if filename not in current:
+                self.sync_document(migration, filename)
+                synced.add(filename)
+        if not removals_only:
+            for filename, record in current.items():
+                if filename not in synced and not self._is_synced(migration, record):
+                    self.sync_document(migration, filename)
+                    synced.add(filename)
+        return len(synced)
+
+    def compare(self, target: str, queries: List[str], k: Optional[int] = None) -> Dict:
+        """
+        Run sample queries on the active and shadow collections and measure
+        how much the top-k results agree (by document, and by chunk ID).
+        """
+        migration = self._require(target, ("building", "ready"))
+        k = k or VECTOR_STORE_CONFIG.get("k", 6)
+        shadow = vector_store_manager.open_collection(target, migration["embedding_model"])
+        shadow_embeddings = self._get_embeddings(migration["embedding_model"])
+
+        doc_overlaps, id_overlaps, per_query = [], [], []
+        for query in queries:
+            active = vector_store_manager.collection.query(
+                query_embeddings=[vector_store_manager.embeddings.embed_query(query)],
+                n_results=k, include=["metadatas"]
+            )
+            candidate = shadow.query(
+                query_embeddings=[shadow_embeddings.embed_query(query)],
+                n_results=k, include=["metadatas"]
+            )
+            active_ids = set(active["ids"][0])
+            candidate_ids = set(candidate["ids"][0])
+            active_docs = {(m or {}).get("filename") for m in active["metadatas"][0]}
+            candidate_docs = {(m or {}).get("filename") for m in candidate["metadatas"][0]}
+
+            doc_overlap = len(active_docs & candidate_docs) / len(active_docs) if active_docs else 1.0
+            id_overlap = len(active_ids & candidate_ids) / len(active_ids) if active_ids else 1.0
+            doc_overlaps.append(doc_overlap)
+            id_overlaps.append(id_overlap)
+            per_query.append({"query": query, "doc_overlap": round(doc_overlap, 3), "id_overlap": round(id_overlap, 3)})
+
+        report = {
+            "queries": len(queries),
+            "k": k,
+            "mean_doc_overlap": round(sum(doc_overlaps) / len(doc_overlaps), 4) if doc_overlaps else None,
+            "mean_id_overlap": round(sum(id_overlaps) / len(id_overlaps), 4) if id_overlaps else None,
+            "active_chunks": vector_store_manager.collection.count(),
+            "shadow_chunks": shadow.count(),
+            "per_query": per_query,
+        }
+        migration_update(target, comparison=report)
+        return report
+
+    def switch(self, target: str, force: bool = False) -> Dict:
+        """
+        Make the shadow collection active. Requires a finished build and a
+        comparison meeting MIGRATION_CONFIG["min_overlap"] unless forced.
+        """
+        migration = self._require(target, ("ready",) if not force else ("building", "ready"))
+        comparison = migration.get("comparison") or {}
+        min_overlap = MIGRATION_CONFIG.get("min_overlap", 0.6)
+        if not force:
+            if comparison.get("mean_doc_overlap") is None:
+                return {"success": False, "message": "Run a comparison before switching (or force)."}
+            if comparison["mean_doc_overlap"] < min_overlap:
+                return {
+                    "success": False,
+                    "message": f"Mean document overlap {comparison['mean_doc_overlap']:.2f} is below {min_overlap:.2f}."
+                }
+
+        # Last writes since the build finished
+        self.catch_up(target)
+
+        previous = vector_store_manager.collection_name
+        if not vector_store_manager.switch_collection(target, migration["embedding_model"]):
+            return {"success": False, "message": "Failed to switch the active collection."}
+
+        # Re-chunked documents own different chunk IDs in the new collection
+        if migration.get("rechunk"):
+            for state in migration_docs(target):
+                set_document_chunk_ids(state["filename"], state.get("chunk_ids", []))
+
+        migration_update(target, status="switched", previous=previous, switched_at=datetime.now(timezone.utc))
+        migration_docs_delete_all(target)
+        self._active = None
+        logger.info(f"✓ Switched active collection {previous} -> {target}")
+        return {"success": True, "message": f"Active collection is now '{target}'.", "previous": previous}
+
+    def abort(self, target: str) -> bool:
+        """Stop a migration and drop its shadow collection."""
+        self._require(target, ("building", "ready"))
+        migration_update(target, status="aborted")
+        migration_docs_delete_all(target)
+        self._active = None
+        return vector_store_manager.drop_collection(target)
+
+    def garbage_collect(self, dry_run: bool = True, drop_previous: bool = False) -> List[str]:
+        """
+        Drop collections that are neither active nor the target of an
+        unfinished migration. Collections replaced by a switch stay for
+        MIGRATION_CONFIG["previous_retention_days"] as rollback targets
+        (see retained_previous) unless drop_previous confirms dropping them.
+        Returns the collection names (to be) dropped.
+        """
+        keep = {vector_store_manager.collection_name}
+        active = migration_get_active()
+        if active:
+            keep.add(active["target"])
+        if not drop_previous:
+            keep.update(self.retained_previous())
+        stale = [name for name in vector_store_manager.list_collections() if name not in keep]
+        if not dry_run:
+            stale = [name for name in stale if vector_store_manager.drop_collection(name)]
+        return stale
+
+    def retained_previous(self) -> Dict[str, datetime]:
+        """Collections replaced by a switch still within their retention period ({name: kept until})."""
+        retention = timedelta(days=MIGRATION_CONFIG.get("previous_retention_days", 7))
+        now = datetime.now(timezone.utc)
+        retained = {}
+        for migration in migration_get_switched():
+            previous, switched_at = migration.get("previous"), migration.get("switched_at")
+            if not previous or previous in retained:
+                continue
+            if switched_at is None:
+                # Switched before switch times were recorded: keep until confirmed
+                retained[previous] = now + retention
+                continue
+            if switched_at.tzinfo is None:
+                switched_at = switched_at.replace(tzinfo=timezone.utc)
+            if switched_at + retention > now:
+                retained[previous] = switched_at + retention
+        return retained
+
+    # ------------------------------------------------------------------
+    # Dual-write
+    # ------------------------------------------------------------------
+
+    def notify_changed(self, filenames: Iterable[str]):
+        """
+        Mirror changed documents into the shadow collection of a running
+        migration. Runs on a background thread so uploads are not slowed down.
+
+        Called once a document's MongoDB record is written (core.db_manager),
+        and by metadata-only updates, which the sync reads from the chunks.
+        """
+        self._queue_syncs(self._get_active(), filenames)
+
+    async def anotify_changed(self, filenames: Iterable[str]):
+        """notify_changed for async callers: the running-migration lookup uses the async client."""
+        if time.monotonic() - self._active_checked_at > ACTIVE_CACHE_SECONDS:
+            from core.async_db_manager import migration_get_active as amigration_get_active
+            try:
+                self._active = await amigration_get_active()
+            except Exception as e:
+                logger.warning(f"⚠ Could not check for a running migration: {e}")
+                self._active = None
+            self._active_checked_at = time.monotonic()
+        self._queue_syncs(self._active, filenames)
+
+    def _queue_syncs(self, migration: Optional[Dict], filenames: Iterable[str]):
+        if not migration:
+            return
+        for filename in filenames:
+            self._get_executor().submit(self._sync_quietly, migration, filename)
+
+    def _sync_quietly(self, migration: Dict, filename: str):
+        try:
+            # Anything missed is picked up by catch_up() before the switch
+            self.sync_document(migration, filename)
+        except Exception as e:
+            logger.error(f"✗ Dual-write to {migration['target']} failed for {filename}: {e}")
+
+    def _get_active(self) -> Optional[Dict]:
+        now = time.monotonic()
+        if now - self._active_checked_at > ACTIVE_CACHE_SECONDS:
+            try:
+                self._active = migration_get_active()
+            except Exception as e:
+                logger.warning(f"⚠ Could not check for a running migration: {e}")
+                self._active = None
+            self._active_checked_at = now
+        return self._active
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # One worker keeps per-document syncs ordered
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="migration-sync")
+            return self._executor
+
+    # ------------------------------------------------------------------
+    # Per-document sync
+    # ------------------------------------------------------------------
+
+    def sync_document(self, migration: Dict, filename: str) -> Dict:
+        """
+        Bring one document's chunks in the shadow collection in line with
+        its current state (added, replaced, reclassified or deleted).
+        """
+        target = migration["target"]
+        shadow = vector_store_manager.open_collection(target, migration["embedding_model"])
+        state = migration_doc_get(target, filename) or {}
+        previous_ids = state.get("chunk_ids", [])
+        record = find_document(filename)
+
+        if record is None:
+            released = self._release(shadow, filename, previous_ids)
+            migration_doc_delete(target, filename)
+            return {"embedded": 0, "updated": 0, "released": released}
+
+        if migration.get("rechunk"):
+            pages = load_document_text(record.get("file_hash"))
+            if not pages and record.get("text_content"):
+                pages = [record["text_content"]]
+            if pages:
+                ids, metadatas, texts = self._rechunk(record, pages)
+            else:
+                logger.warning(f"⚠ No stored text for {filename}; copying its existing chunks unchanged")
+                ids, metadatas, texts = self._active_chunks(record)
+        else:
+            ids, metadatas, texts = self._active_chunks(record)
+
+        counts = self._write(shadow, migration, filename, ids, metadatas, texts)
+        counts["released"] = self._release(shadow, filename, [cid for cid in previous_ids if cid not in set(ids)])
+        migration_doc_set(target, filename, record.get("file_hash"), ids)
+        return counts
+
+    def _is_synced(self, migration: Dict, record: Dict) -> bool:
+        state = migration_doc_get(migration["target"], record.get("filename"))
+        if not state or state.get("file_hash") != record.get("file_hash"):
+            return False
+        if migration.get("rechunk"):
+            return True
+        return state.get("chunk_ids") == (record.get("chunk_ids") or state.get("chunk_ids"))
+
+    def _active_chunks(self, record: Dict):
+        """A document's chunks in the active collection: (ids, metadatas, texts)."""
+        chunk_ids = record.get("chunk_ids") or []
+        if chunk_ids:
+            current = vector_store_manager.get_chunks(ids=chunk_ids, include=["metadatas", "documents"])
+        else:
+            # Documents ingested before ownership was recorded
+            current = vector_store_manager.get_chunks(
+                where={"filename": record["filename"]}, include=["metadatas", "documents"]
+            )
+        return current["ids"], current["metadatas"], current["documents"]
+
+    def _rechunk(self, record: Dict, pages: List[str]):
+        """Split stored page text with the current chunking settings: (ids, metadatas, texts)."""
+        filename = record["filename"]
+        template = {}
+        active = self._active_chunks(record)
+        if active[1]:
+            template = owner_view(active[1][0], filename)
+
+        merged = Document(page_content=merge_page_texts(pages), metadata={"source": filename, "filename": filename})
+        hasher = get_minhasher()
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        chunks = {}
+        for chunk in get_text_splitter().split_documents([merged]):
+            content_hash = chunk_hash(chunk.page_content)
+            chunk_id = chunk_id_for_hash(content_hash)
+            if chunk_id in chunks:
+                continue
+            metadata = dict(chunk.metadata)
+            metadata.update({
+                "filename": filename,
+                "source": filename,
+                # Chunk metadata is updated before the MongoDB record, so prefer it
+                "department": template.get("department", record.get("department", "")),
+                "service": template.get("service", record.get("service", "")),
+                "document_type": template.get("document_type", record.get("document_type", "")),
+                "description": template.get("description", ""),
+                "status": template.get("status", "Active"),
+                "add_modify": template.get("add_modify", "Add"),
+                "date_time": template.get("date_time", timestamp),
+                "content_hash": content_hash,
+                "file_hash": record.get("file_hash") or "",
+                "owners": join_owners([filename]),
+                "owner_count": 1,
+            })
+            metadata["owner_meta"] = join_owner_meta({filename: owner_fields(metadata)})
+            metadata.update(hasher.metadata(hasher.signature(chunk.page_content)))
+            chunks[chunk_id] = (metadata, chunk.page_content)
+
+        ids = list(chunks.keys())
+        return ids, [chunks[cid][0] for cid in ids], [chunks[cid][1] for cid in ids]
+
+    def _write(self, shadow, migration: Dict, filename: str, ids: List[str], metadatas: List[Dict],
+               texts: List[str]) -> Dict:
+        """Embed missing chunks (rate-limited) and refresh metadata of chunks already in the shadow."""
+        counts = {"embedded": 0, "updated": 0}
+        if not ids:
+            return counts
+        existing = shadow.get(ids=ids, include=["metadatas"])
+        existing_meta = dict(zip(existing.get("ids", []) or [], existing.get("metadatas", []) or []))
+
+        if migration.get("rechunk"):
+            # Chunks shared with other documents keep their other owners and their classification
+            for i, chunk_id in enumerate(ids):
+                if chunk_id in existing_meta:
+                    owners = split_owners(existing_meta[chunk_id] or {})
+                    if filename not in owners:
+                        owners.append(filename)
+                    entries = split_owner_meta(existing_meta[chunk_id])
+                    entries[filename] = owner_fields(metadatas[i])
+                    metadatas[i] = with_owners(existing_meta[chunk_id], owners, entries)
+
+        update_ids = [cid for cid in ids if cid in existing_meta]
+        if update_ids:
+            by_id = dict(zip(ids, metadatas))
+            shadow.update(ids=update_ids, metadatas=[by_id[cid] for cid in update_ids])
+            counts["updated"] = len(update_ids)
+
+        pending = [i for i, cid in enumerate(ids) if cid not in existing_meta]
+        embeddings = self._get_embeddings(migration["embedding_model"])
+        batch_size = MIGRATION_CONFIG.get("batch_size", 16)
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            batch_texts = [texts[i] for i in batch]
+            self._limiter.acquire(len(batch))
+            shadow.upsert(
+                ids=[ids[i] for i in batch],
+                documents=batch_texts,
+                metadatas=[metadatas[i] for i in batch],
+                embeddings=embeddings.embed_documents(batch_texts)
+            )
+            counts["embedded"] += len(batch)
+        return counts
+
+    @staticmethod
+    def _release(shadow, filename: str, chunk_ids: List[str]) -> int:
+        """Drop filename's ownership of shadow chunks; delete chunks nobody owns."""
+        if not chunk_ids:
+            return 0
+        current = shadow.get(ids=chunk_ids, include=["metadatas"])
+        delete_ids, update_ids, update_metas = [], [], []
+        for chunk_id, meta in zip(current.get("ids", []) or [], current.get("metadatas", []) or []):
+            owners = [name for name in split_owners(meta or {}) if name != filename]
+            if not owners:
+                delete_ids.append(chunk_id)
+                continue
+            update_ids.append(chunk_id)
+            update_metas.append(with_owners(meta, owners, split_owner_meta(meta)))
+        if delete_ids:
+            shadow.delete(ids=delete_ids)
+        if update_ids:
+            shadow.update(ids=update_ids, metadatas=update_metas)
+        return len(delete_ids) + len(update_ids)
+
+    def _get_embeddings(self, model: str):
+        if model not in self._embeddings:
+            self._embeddings[model] = get_embeddings(model)
+        return self._embeddings[model]
+
+    @staticmethod
+    def _require(target: str, statuses) -> Dict:
+        migration = migration_get(target)
+        if not migration:
+            raise RuntimeError(f"No migration for collection '{target}'")
+        if migration.get("status") not in statuses:
+            raise RuntimeError(f"Migration '{target}' is {migration.get('status')}, expected one of {list(statuses)}")
+        return migration
+
+
+# Global instance
+collection_migrator = CollectionMigrator()
@@ -3,15 +3,39 @@ MongoDB database manager for BSK 2.0 v2
 Handles documents, services, and logs with auto-initialization.
 """
 
+import atexit
+import re
+import json
+import threading
+import zlib
 from datetime import datetime, timezone
-from db.mongo_client import get_db
+import gridfs
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, ReturnDocument
+from pymongo.errors import OperationFailure
+from db.mongo_client import db, get_db, mongo_collection
+from config.settings import RETENTION_CONFIG, HTTP_CACHE_CONFIG
+from utils.lazy import LazyInstance
 
-db = get_db()
+# Handles connect on first use, so importing this module does not touch MongoDB
+documents_collection = mongo_collection("documents")
+services_collection = mongo_collection("services")
+logs_collection = mongo_collection("logs")
+chat_history_collection = mongo_collection("chat_history")
+chat_messages_collection = mongo_collection("chat_messages")
+chat_archive_collection = mongo_collection("chat_archive")
+document_texts_collection = mongo_collection("document_texts")
+collection_migrations_collection = mongo_collection("collection_migrations")
+collection_migration_docs_collection = mongo_collection("collection_migration_docs")
+bulk_load_items_collection = mongo_collection("bulk_load_items")
+collection_versions_collection = mongo_collection("collection_versions")
+document_text_files = LazyInstance(
+    lambda: gridfs.GridFS(get_db(), collection="document_text_files"), name="mongo:gridfs"
+)
 
-documents_collection = db["documents"]
-services_collection = db["services"]
-logs_collection = db["logs"]
-chat_history_collection = db["chat_history"]
+# Extracted text above this size (compressed) goes to GridFS instead of the record
+TEXT_INLINE_MAX_BYTES = 8 * 1024 * 1024
+TEXT_COMPRESSION_LEVEL = 6
 
 
 # ======================================================
@@ -24,14 +48,24 @@ def initialize_collections():
         # Create indexes
         documents_collection.create_index([("filename", 1)])
         documents_collection.create_index([("department", 1), ("service", 1)])
+        documents_collection.create_index([("file_hash", 1)], sparse=True)
+        document_texts_collection.create_index([("file_hash", 1)], unique=True)
+        collection_migration_docs_collection.create_index([("migration", 1), ("filename", 1)], unique=True)
+        bulk_load_items_collection.create_index([("load_id", 1), ("path", 1)], unique=True)
         
         services_collection.create_index([("department", 1), ("service", 1)], unique=True)
         
         logs_collection.create_index([("timestamp", -1)])
-        logs_collection.create_index([("department", 1), ("service", 1)])
+        logs_collection.create_index([("department", 1), ("service", 1), ("timestamp", -1)])
+        logs_collection.create_index([("action", 1), ("timestamp", -1)])
+        logs_collection.create_index([("document_name", 1), ("timestamp", -1)])
         
         chat_history_collection.create_index([("chat_id", 1)], unique=True)
         chat_history_collection.create_index([("updated_at", -1)])
+        chat_history_collection.create_index([("updated_at", -1), ("chat_id", -1)])
+        chat_messages_collection.create_index([("chat_id", 1), ("seq", 1)], unique=True)
+        chat_archive_collection.create_index([("chat_id", 1)], unique=True)
+        _ensure_empty_chat_ttl_index()
         
         # Seed services collection if empty
         if services_collection.count_documents({}) == 0:
@@ -57,6 +91,27 @@ def initialize_collections():
         logging.getLogger(__name__).error("Error initializing collections: %s", e)
 
 
+def _ensure_empty_chat_ttl_index():
+    """
+    TTL index that lets MongoDB expire chats that never received a message.
+    Expiry counts from last_active_at, which opening the chat refreshes
+    (chat_touch), so a chat that is still open is not removed under its
+    first message.
+    """
+    ttl_seconds = int(RETENTION_CONFIG.get("empty_chat_ttl_hours", 24) * 3600)
+    try:
+        chat_history_collection.create_index(
+            [("last_active_at", 1)],
+            name="empty_chat_ttl",
+            expireAfterSeconds=ttl_seconds,
+            partialFilterExpression={"message_count": 0}
+        )
+    except OperationFailure:
+        # Index exists with another TTL: update it in place
+        db.command("collMod", chat_history_collection.name,
+                   index={"name": "empty_chat_ttl", "expireAfterSeconds": ttl_seconds})
+
+
 # NOTE: Initialization is called explicitly during app startup.
 
 
@@ -64,39 +119,78 @@ def initialize_collections():
 # DOCUMENTS COLLECTION
 # ======================================================
 
-def add_document(filename: str, department: str, service: str, document_type: str = ""):
-    """Add a document record."""
-    documents_collection.insert_one({
+def _document_record(filename: str, department: str, service: str, document_type: str = "",
+                     file_hash: str = None, chunk_ids: list = None, duplicate_of: str = None,
+                     dedup_stats: dict = None) -> dict:
+    """A new document record (add_document and its async mirror)."""
+    record = {
         "filename": filename,
         "department": department,
         "service": service,
         "document_type": document_type,
         "created_at": datetime.now(timezone.utc),
-    })
+    }
+    if file_hash:
+        record["file_hash"] = file_hash
+    if chunk_ids is not None:
+        record["chunk_ids"] = list(chunk_ids)
+    if duplicate_of:
+        record["duplicate_of"] = duplicate_of
+    if dedup_stats:
+        record["dedup_stats"] = dedup_stats
+    return record
+
+
+def add_document(filename: str, department: str, service: str, document_type: str = "",
+                 file_hash: str = None, chunk_ids: list = None, duplicate_of: str = None,
+                 dedup_stats: dict = None):
+    """
+    Add a document record.
+    file_hash/chunk_ids record content ownership; duplicate_of names the
+    document whose chunks an identical upload was linked to; dedup_stats is
+    the per-document exact/near-duplicate report from ingestion.
+    """
+    record = _document_record(filename, department, service, document_type,
+                              file_hash, chunk_ids, duplicate_of, dedup_stats)
+    try:
+        documents_collection.insert_one(record)
+    except Exception:
+        # Ingestion stored the text before this record; don't leave it orphaned
+        release_document_text(file_hash)
+        raise
+    _documents_changed([filename])
 
 
 def delete_document(filename: str):
     """Delete a document record."""
     # Find which department/service pairs are affected by this filename
-    docs = list(documents_collection.find({"filename": filename}, {"department": 1, "service": 1}))
-    affected = set()
-    for d in docs:
-        dept = d.get("department")
-        serv = d.get("service")
-        if dept and serv:
-            affected.add((dept, serv))
+    docs = list(documents_collection.find({"filename": filename}, {"department": 1, "service": 1, "file_hash": 1}))
+    affected = _service_pairs(docs)
+    file_hashes = {d.get("file_hash") for d in docs if d.get("file_hash")}
 
     # Delete the documents
-    documents_collection.delete_many({"filename": filename})
+    if documents_collection.delete_many({"filename": filename}).deleted_count:
+        _documents_changed([filename])
+    for file_hash in file_hashes:
+        release_document_text(file_hash)
 
     # For each affected service, if no documents remain, mark it Inactive
-    for dept, serv in affected:
+    _deactivate_empty_services(affected)
+
+
+def _service_pairs(docs) -> set:
+    """(department, service) pairs of document records that have both."""
+    return {(d["department"], d["service"]) for d in docs if d.get("department") and d.get("service")}
+
+
+def _deactivate_empty_services(pairs):
+    """Mark services left without documents Inactive (after a delete or reclassification)."""
+    for dept, serv in pairs:
         try:
-            count = get_document_count_for_service(dept, serv)
-            if count == 0:
+            if get_document_count_for_service(dept, serv) == 0:
                 update_service_status(dept, serv, "Inactive")
         except Exception:
-            # If anything goes wrong here, continue without failing the delete
+            # If anything goes wrong here, continue without failing the write
             continue
 
 
@@ -105,75 +199,581 @@ def find_document(filename: str):
     return documents_collection.find_one({"filename": filename})
 
 
+def find_document_by_hash(file_hash: str):
+    """Find the oldest stored document with this file content hash (None if not stored)."""
+    if not file_hash:
+        return None
+    return documents_collection.find_one(
+        {"file_hash": file_hash, "chunk_ids.0": {"$exists": True}},
+        sort=[("created_at", 1)]
+    )
+
+
+def add_documents_bulk(records: list) -> int:
+    """
+    Insert many document records in one round trip.
+    Records whose filename already exists are left untouched.
+
+    Returns:
+        Number of records inserted
+    """
+    if not records:
+        return 0
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"filename": record["filename"]},
+            {"$setOnInsert": {**record, "created_at": record.get("created_at", now)}},
+            upsert=True
+        )
+        for record in records
+    ]
+    try:
+        result = documents_collection.bulk_write(operations, ordered=False)
+    except Exception:
+        for file_hash in {record.get("file_hash") for record in records}:
+            release_document_text(file_hash)
+        raise
+    if result.upserted_count:
+        _documents_changed([record["filename"] for record in records])
+    return result.upserted_count
+
+
+def get_document_chunk_ids(chunk_ids: list = None):
+    """
+    Filename and chunk_ids of every document that owns chunks
+    (only documents owning any of chunk_ids, when given).
+    """
+    query = {"chunk_ids": {"$in": list(chunk_ids)}} if chunk_ids is not None else {"chunk_ids.0": {"$exists": True}}
+    return list(documents_collection.find(query, {"_id": 0, "filename": 1, "chunk_ids": 1}))
+
+
+def find_documents_chunk_ids(filename: str = None, department: str = None, service: str = None):
+    """Filename and chunk_ids of the documents matching every given field (None fields are ignored)."""
+    query = {
+        key: value
+        for key, value in (("filename", filename), ("department", department), ("service", service))
+        if value is not None
+    }
+    if not query:
+        return []
+    return list(documents_collection.find(query, {"_id": 0, "filename": 1, "chunk_ids": 1}))
+
+
+def get_all_filenames() -> set:
+    """Set of all stored document filenames."""
+    return {doc["filename"] for doc in documents_collection.find({}, {"_id": 0, "filename": 1}) if doc.get("filename")}
+
+
 def get_all_documents():
-    """Get all documents."""
-    return list(documents_collection.find({}, {"_id": 0}))
+    """Get all documents (chunk ownership lists are left out)."""
+    return list(documents_collection.find({}, {"_id": 0, "chunk_ids": 0}))
 
 
 def get_documents_by_department_service(department: str, service: str):
     """Get all documents for a specific department and service."""
     return list(documents_collection.find(
         {"department": department, "service": service},
-        {"_id": 0}
+        {"_id": 0, "chunk_ids": 0}
     ))
 
 
 def update_document(filename: str, department: str = None, service: str = None, document_type: str = None):
     """Update document metadata."""
-    update_fields = {}
-    if department:
-        update_fields["department"] = department
-    if service:
-        update_fields["service"] = service
-    if document_type:
-        update_fields["document_type"] = document_type
+    update_fields = _document_metadata_fields(department, service, document_type)
     if update_fields:
-        documents_collection.update_one(
+        result = documents_collection.update_one(
             {"filename": filename},
             {"$set": update_fields}
         )
+        if result.modified_count:
+            _collection_changed("documents")
+
+
+def _document_content_update(file_hash: str, chunk_ids: list, dedup_stats: dict = None) -> dict:
+    """Update that records a new content version of a document (update_document_content)."""
+    update_fields = {
+        "file_hash": file_hash,
+        "chunk_ids": list(chunk_ids),
+        "updated_at": datetime.now(timezone.utc)
+    }
+    if dedup_stats:
+        update_fields["dedup_stats"] = dedup_stats
+    return {
+        "$set": update_fields,
+        "$unset": {"duplicate_of": ""}
+    }
+
+
+def _texts_to_release(previous, file_hash: str) -> list:
+    """
+    File hashes whose stored text lost its owner after a content update
+    (previous is the record before the update, None if there was none).
+    """
+    if previous is None:
+        # No record to update: the new version's text has no owner
+        return [file_hash]
+    if previous.get("file_hash") and previous["file_hash"] != file_hash:
+        return [previous["file_hash"]]
+    return []
+
+
+def update_document_content(filename: str, file_hash: str, chunk_ids: list, dedup_stats: dict = None):
+    """Record a new content version (file hash and owned chunk IDs) for a document."""
+    try:
+        previous = documents_collection.find_one_and_update(
+            {"filename": filename},
+            _document_content_update(file_hash, chunk_ids, dedup_stats),
+            projection={"file_hash": 1}
+        )
+    except Exception:
+        release_document_text(file_hash)
+        raise
+    _documents_changed([filename])
+    for released in _texts_to_release(previous, file_hash):
+        release_document_text(released)
+
+
+def update_documents_metadata(filenames: list, department: str = None, service: str = None,
+                              document_type: str = None) -> int:
+    """
+    Reclassify many documents in one update and keep service statuses in sync.
+    Returns the number of document records modified.
+    """
+    update_fields = _document_metadata_fields(department, service, document_type)
+    if not filenames or not update_fields:
+        return 0
+
+    match = {"filename": {"$in": list(filenames)}}
+    previous = set()
+    if department or service:
+        previous = _service_pairs(documents_collection.find(match, {"department": 1, "service": 1}))
+
+    update_fields["updated_at"] = datetime.now(timezone.utc)
+    result = documents_collection.update_many(match, {"$set": update_fields})
+    if result.modified_count:
+        _collection_changed("documents")
+
+    if department and service:
+        upsert_service(department, service, "Active")
+    # Services left without documents become Inactive, as on delete
+    _deactivate_empty_services(previous)
+    return result.modified_count
+
+
+def _document_metadata_fields(department: str = None, service: str = None, document_type: str = None) -> dict:
+    """The classification fields of a metadata update that are set (empty values are left alone)."""
+    fields = {}
+    if department:
+        fields["department"] = department
+    if service:
+        fields["service"] = service
+    if document_type:
+        fields["document_type"] = document_type
+    return fields
+
+
+# ======================================================
+# DOCUMENT TEXT STORE (compressed, page-segmented, by file hash)
+# ======================================================
+
+def save_document_text(file_hash: str, pages: list, filename: str = None) -> bool:
+    """
+    Store the cleaned text of a PDF, one string per page, zlib-compressed.
+    Identical files share one entry; large texts are kept in GridFS.
+
+    The entry is claimed with an upsert first and only the save that inserted
+    it writes the payload, so concurrent saves of one file never put
+    duplicate GridFS files.
+    """
+    if not file_hash:
+        return False
+    claimed = None
+    try:
+        raw = json.dumps(pages, ensure_ascii=False).encode("utf-8")
+        compressed = zlib.compress(raw, TEXT_COMPRESSION_LEVEL)
+        result = document_texts_collection.update_one(
+            {"file_hash": file_hash},
+            {"$setOnInsert": {
+                "file_hash": file_hash,
+                "filename": filename,
+                "page_count": len(pages),
+                "encoding": "zlib+json",
+                "size_bytes": len(raw),
+                "compressed_bytes": len(compressed),
+                "created_at": datetime.now(timezone.utc),
+            }},
+            upsert=True
+        )
+        claimed = result.upserted_id
+        if claimed is None:
+            # Stored (or being stored) by another save
+            return True
+
+        if len(compressed) > TEXT_INLINE_MAX_BYTES:
+            payload = {"gridfs_id": document_text_files.put(compressed, filename=f"{file_hash}.json.z")}
+        else:
+            payload = {"data": compressed}
+        document_texts_collection.update_one({"_id": claimed}, {"$set": payload})
+        return True
+    except Exception as e:
+        import logging
+        logging.error(f"Error saving document text: {e}")
+        if claimed is not None:
+            try:
+                document_texts_collection.delete_one({"_id": claimed})
+            except Exception:
+                pass
+        return False
+
+
+def load_document_text(file_hash: str):
+    """Load the stored page texts for a file hash. Returns list of str or None."""
+    if not file_hash:
+        return None
+    record = document_texts_collection.find_one({"file_hash": file_hash})
+    if not record:
+        return None
+    if record.get("gridfs_id") is not None:
+        compressed = document_text_files.get(record["gridfs_id"]).read()
+    else:
+        compressed = record.get("data")
+    if not compressed:
+        return None
+    return json.loads(zlib.decompress(compressed).decode("utf-8"))
+
+
+def release_document_text(file_hash: str):
+    """Delete stored text for a file hash once no document record uses it."""
+    try:
+        if not file_hash or documents_collection.count_documents({"file_hash": file_hash}, limit=1):
+            return
+        record = document_texts_collection.find_one_and_delete({"file_hash": file_hash})
+        if record and record.get("gridfs_id") is not None:
+            document_text_files.delete(record["gridfs_id"])
+    except Exception as e:
+        import logging
+        logging.error(f"Error releasing document text: {e}")
+
+
+# ======================================================
+# COLLECTION MIGRATIONS (shadow re-embedding state)
+# ======================================================
+
+def migration_create(target: str, source: str, embedding_model: str, rechunk: bool = False) -> dict:
+    """Register a shadow collection build."""
+    now = datetime.now(timezone.utc)
+    record = {
+        "target": target,
+        "source": source,
+        "embedding_model": embedding_model,
+        "rechunk": rechunk,
+        "status": "building",
+        "progress": {"done": 0, "total": 0},
+        "created_at": now,
+        "updated_at": now,
+    }
+    collection_migrations_collection.insert_one(record)
+    record.pop("_id", None)
+    return record
+
+
+def migration_get(target: str):
+    """Get a migration by target collection name."""
+    return collection_migrations_collection.find_one({"target": target}, {"_id": 0})
+
+
+# A migration that is building or awaiting a switch (at most one at a time)
+ACTIVE_MIGRATION_FILTER = {"status": {"$in": ["building", "ready"]}}
+
+
+def migration_get_active():
+    """Get the migration currently building or awaiting a switch (None if none)."""
+    return collection_migrations_collection.find_one(
+        ACTIVE_MIGRATION_FILTER,
+        {"_id": 0},
+        sort=[("created_at", -1)]
+    )
+
+
+def migration_get_switched():
+    """Finished migrations (target, previous collection, switched_at), most recent first."""
+    return list(collection_migrations_collection.find(
+        {"status": "switched"},
+        {"_id": 0, "target": 1, "previous": 1, "switched_at": 1},
+        sort=[("switched_at", -1)]
+    ))
+
+
+def migration_update(target: str, **fields):
+    """Update migration fields (status, progress, comparison, ...)."""
+    fields["updated_at"] = datetime.now(timezone.utc)
+    collection_migrations_collection.update_one({"target": target}, {"$set": fields})
+
+
+def migration_doc_get(target: str, filename: str):
+    """Get the shadow sync state of one document."""
+    return collection_migration_docs_collection.find_one({"migration": target, "filename": filename}, {"_id": 0})
+
+
+def migration_doc_set(target: str, filename: str, file_hash: str, chunk_ids: list):
+    """Record which shadow chunks a document owns."""
+    collection_migration_docs_collection.update_one(
+        {"migration": target, "filename": filename},
+        {"$set": {
+            "file_hash": file_hash,
+            "chunk_ids": list(chunk_ids),
+            "synced_at": datetime.now(timezone.utc)
+        }},
+        upsert=True
+    )
+
+
+def migration_doc_delete(target: str, filename: str):
+    """Forget a document's shadow sync state."""
+    collection_migration_docs_collection.delete_one({"migration": target, "filename": filename})
+
+
+def migration_docs(target: str):
+    """Iterate the shadow sync state of all documents of a migration."""
+    return collection_migration_docs_collection.find({"migration": target}, {"_id": 0})
+
+
+def migration_docs_delete_all(target: str):
+    """Drop all per-document state of a migration."""
+    collection_migration_docs_collection.delete_many({"migration": target})
+
+
+def set_document_chunk_ids(filename: str, chunk_ids: list):
+    """Replace the chunk ownership list of a document (e.g. after re-chunking)."""
+    documents_collection.update_one({"filename": filename}, {"$set": {"chunk_ids": list(chunk_ids)}})
+
+
+# ======================================================
+# BULK LOAD CHECKPOINTS
+# ======================================================
+
+def bulk_load_done_paths(load_id: str) -> set:
+    """Manifest paths a bulk load has already finished (loaded or skipped)."""
+    return {
+        item["path"] for item in bulk_load_items_collection.find(
+            {"load_id": load_id, "status": {"$in": ["loaded", "skipped"]}},
+            {"_id": 0, "path": 1}
+        )
+    }
+
+
+def bulk_load_checkpoint(load_id: str, items: list):
+    """
+    Record the outcome of many manifest entries in one round trip.
+    items: dicts with path, filename, status and optional pages, chunks, message.
+    """
+    if not items:
+        return
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"load_id": load_id, "path": item["path"]},
+            {"$set": {**item, "load_id": load_id, "updated_at": now}},
+            upsert=True
+        )
+        for item in items
+    ]
+    bulk_load_items_collection.bulk_write(operations, ordered=False)
+
+
+def bulk_load_summary(load_id: str) -> dict:
+    """Per-status item counts of a bulk load."""
+    return {
+        row["_id"]: row["count"] for row in bulk_load_items_collection.aggregate([
+            {"$match": {"load_id": load_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ])
+    }
+
+
+def bulk_load_reset(load_id: str):
+    """Forget all checkpoints of a bulk load."""
+    bulk_load_items_collection.delete_many({"load_id": load_id})
+
+
+# ======================================================
+# COLLECTION VERSIONS (cache invalidation across processes)
+# ======================================================
+
+def get_collection_version(name: str) -> int:
+    """Change version of a cached collection (0 if it was never bumped)."""
+    doc = collection_versions_collection.find_one({"_id": name}, {"version": 1})
+    return (doc or {}).get("version", 0)
+
+
+def bump_collection_version(name: str) -> int:
+    """Record a change to a cached collection. Returns the new version."""
+    doc = collection_versions_collection.find_one_and_update(
+        {"_id": name}, _version_bump_update(), upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return doc["version"]
+
+
+def _version_bump_update() -> dict:
+    """Upsert update that increments a collection_versions document."""
+    return {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}}
+
+
+def _collection_changed(name: str):
+    """
+    Bump a collection's change version (ETags, caches); never fails the write.
+    Only call it for writes that change what the cached or ETag'd reads return.
+    """
+    try:
+        bump_collection_version(name)
+    except Exception as e:
+        import logging
+        logging.error(f"Error bumping {name} version: {e}")
+
+
+class _DeferredVersionBumps:
+    """
+    Version bumps for high-volume collections (logs). The first change
+    schedules one bump `delay` seconds later on a timer thread and every
+    change until then rides on it, so a burst of writes costs one
+    collection_versions write instead of one per write.
+    """
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._pending = set()
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def mark(self, name: str):
+        with self._lock:
+            self._pending.add(name)
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            names, self._pending = self._pending, set()
+            self._timer = None
+        for name in names:
+            _collection_changed(name)
+
+
+_deferred_bumps = _DeferredVersionBumps(HTTP_CACHE_CONFIG.get("logs_version_delay_seconds", 1.0))
+atexit.register(_deferred_bumps.flush)
+
+
+def _logs_changed():
+    """Schedule a (coalesced) logs version bump; does no I/O in the caller's thread."""
+    _deferred_bumps.mark("logs")
+
+
+def _documents_changed(filenames: list):
+    """
+    Bump the documents version and mirror the documents into the shadow
+    collection of a running migration, now that their records are written.
+    """
+    _collection_changed("documents")
+    try:
+        from core.collection_migration import collection_migrator
+        collection_migrator.notify_changed(filenames)
+    except Exception as e:
+        import logging
+        logging.error(f"Error queueing migration sync for {filenames}: {e}")
+
+
+def _services_changed():
+    """Bump the services catalog version and drop this process's cached copy."""
+    _collection_changed("services")
+    from core.catalog_cache import services_catalog
+    services_catalog.invalidate()
 
 
 # ======================================================
 # SERVICES COLLECTION
 # ======================================================
 
+def _new_service_update(department: str, service: str) -> dict:
+    """Upsert update that adds a service only if it is missing (add_service)."""
+    return {
+        "$setOnInsert": {
+            "department": department,
+            "service": service,
+            "status": "Inactive",
+            "last_updated": None,
+            "created_at": datetime.now(timezone.utc)
+        }
+    }
+
+
+def _service_upsert_update(department: str, service: str, status: str = None) -> list:
+    """
+    Upsert pipeline behind upsert_service/upsert_services_bulk. last_updated
+    moves only when the service is new or its status changes, so confirming
+    an unchanged service (every upload does) modifies nothing and leaves the
+    services version, and with it the catalog cache, alone.
+    """
+    fields = {"department": {"$literal": department}, "service": {"$literal": service}}
+    if status:
+        fields["status"] = {"$literal": status}
+        changed = {"$ne": ["$status", {"$literal": status}]}
+    else:
+        changed = {"$eq": [{"$type": "$last_updated"}, "missing"]}
+    fields["last_updated"] = {"$cond": [changed, datetime.now(timezone.utc), "$last_updated"]}
+    return [{"$set": fields}]
+
+
+def _service_status_filter(department: str, service: str, status: str) -> dict:
+    """Matches the service only if its status differs (update_service_status is a no-op otherwise)."""
+    return {"department": department, "service": service, "status": {"$ne": status}}
+
+
+def _service_status_update(status: str) -> dict:
+    """Update behind update_service_status."""
+    return {"$set": {"status": status, "last_updated": datetime.now(timezone.utc)}}
+
+
 def add_service(department: str, service: str):
     """Add a new service (defaults to Inactive)."""
-    services_collection.update_one(
+    result = services_collection.update_one(
         {"department": department, "service": service},
-        {
-            "$setOnInsert": {
-                "department": department,
-                "service": service,
-                "status": "Inactive",
-                "last_updated": None,
-                "created_at": datetime.now(timezone.utc)
-            }
-        },
+        _new_service_update(department, service),
         upsert=True
     )
+    if result.upserted_id is not None:
+        _services_changed()
 
 
 def upsert_service(department: str, service: str, status: str = None):
     """Upsert a service record (insert if missing, update if exists)."""
-    update_data = {
-        "department": department,
-        "service": service
-    }
-    
-    if status:
-        update_data["status"] = status
-    
-    update_data["last_updated"] = datetime.now(timezone.utc)
-    
-    services_collection.update_one(
+    result = services_collection.update_one(
         {"department": department, "service": service},
-        {
-            "$set": update_data
-        },
+        _service_upsert_update(department, service, status),
         upsert=True
     )
+    if result.upserted_id is not None or result.modified_count:
+        _services_changed()
+
+
+def upsert_services_bulk(pairs: list, status: str = None):
+    """Upsert many (department, service) records in one round trip."""
+    pairs = list(dict.fromkeys((d, s) for d, s in pairs if d and s))
+    if not pairs:
+        return
+    operations = [
+        UpdateOne(
+            {"department": department, "service": service},
+            _service_upsert_update(department, service, status),
+            upsert=True
+        )
+        for department, service in pairs
+    ]
+    result = services_collection.bulk_write(operations, ordered=False)
+    if result.upserted_count or result.modified_count:
+        _services_changed()
 
 
 def get_all_services():
@@ -191,15 +791,60 @@ def get_services_by_department(department: str):
 
 def update_service_status(department: str, service: str, status: str):
     """Update service status."""
-    services_collection.update_one(
-        {"department": department, "service": service},
-        {
-            "$set": {
-                "status": status,
-                "last_updated": datetime.now(timezone.utc)
-            }
-        }
+    result = services_collection.update_one(
+        _service_status_filter(department, service, status),
+        _service_status_update(status)
     )
+    if result.modified_count:
+        _services_changed()
+
+
+def get_service_document_counts(department: str = None):
+    """
+    Per-(department, service) document counts with service status, in one
+    aggregation: documents are grouped once and unioned with the services
+    catalog, so services without documents appear with a count of 0 and
+    documents filed under an uncatalogued service are not lost.
+
+    Returns:
+        List of dicts with department, service, status, last_updated,
+        document_count, sorted by department and service
+    """
+    return list(documents_collection.aggregate(_service_counts_pipeline(department)))
+
+
+def _service_counts_pipeline(department: str = None) -> list:
+    """Aggregation pipeline (on documents) behind get_service_document_counts."""
+    match = [{"$match": {"department": department}}] if department else []
+    return match + [
+        {"$group": {
+            "_id": {"department": "$department", "service": "$service"},
+            "document_count": {"$sum": 1}
+        }},
+        {"$unionWith": {
+            "coll": services_collection.name,
+            "pipeline": match + [{"$project": {
+                "_id": {"department": "$department", "service": "$service"},
+                "status": 1,
+                "last_updated": 1
+            }}]
+        }},
+        {"$group": {
+            "_id": "$_id",
+            "document_count": {"$sum": {"$ifNull": ["$document_count", 0]}},
+            "status": {"$max": "$status"},
+            "last_updated": {"$max": "$last_updated"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "department": "$_id.department",
+            "service": "$_id.service",
+            "document_count": 1,
+            "status": {"$ifNull": ["$status", "Inactive"]},
+            "last_updated": 1
+        }},
+        {"$sort": {"department": 1, "service": 1}}
+    ]
 
 
 def get_document_count_for_service(department: str, service: str):
@@ -214,30 +859,167 @@ def get_document_count_for_service(department: str, service: str):
 # LOGS COLLECTION
 # ======================================================
 
+def _log_record(entry: dict, now: datetime = None) -> dict:
+    """
+    A logs document from an entry with department, service, document_name,
+    document_type and action (timestamp defaults to now).
+    """
+    return {
+        "timestamp": entry.get("timestamp") or now or datetime.now(timezone.utc),
+        "department": entry.get("department") or "Unassigned",
+        "service": entry.get("service") or "Unassigned",
+        "document_name": entry["document_name"],
+        "document_type": entry.get("document_type") or "Unknown",
+        "action": entry["action"]
+    }
+
+
 def log_action(department: str, service: str, document_name: str, document_type: str, action: str):
     """
     Log an action.
     action: 'upload', 'delete', etc.
+    With WRITE_BEHIND_ENABLED the entry is queued and written in a batch.
     """
     try:
-        logs_collection.insert_one({
-            "timestamp": datetime.now(timezone.utc),
-            "department": department or "Unassigned",
-            "service": service or "Unassigned",
+        entry = _log_record({
+            "department": department,
+            "service": service,
             "document_name": document_name,
-            "document_type": document_type or "Unknown",
+            "document_type": document_type,
             "action": action
         })
+        from core.write_buffer import write_buffer
+        if write_buffer.enabled:
+            if not write_buffer.add_log(entry):
+                raise RuntimeError("write-behind queue is full")
+            return
+        logs_collection.insert_one(entry)
+        _logs_changed()
     except Exception as e:
         import logging
         logging.error(f"Error logging action: {e}")
 
 
+def log_actions_bulk(entries: list, raise_errors: bool = False):
+    """
+    Log many actions in one round trip.
+    entries: dicts with department, service, document_name, document_type, action.
+    Entries that carry an _id are upserted, so retrying a batch never duplicates them.
+    """
+    if not entries:
+        return
+    try:
+        now = datetime.now(timezone.utc)
+        operations = []
+        for entry in entries:
+            record = _log_record(entry, now)
+            if entry.get("_id") is not None:
+                operations.append(UpdateOne({"_id": entry["_id"]}, {"$setOnInsert": record}, upsert=True))
+            else:
+                operations.append(InsertOne(record))
+        logs_collection.bulk_write(operations, ordered=False)
+        _logs_changed()
+    except Exception as e:
+        if raise_errors:
+            raise
+        import logging
+        logging.error(f"Error logging actions: {e}")
+
+
 def get_all_logs():
     """Get all logs."""
     return list(logs_collection.find({}, {"_id": 0}).sort("timestamp", -1))
 
 
+def _logs_filter(department: str = None, service: str = None, action: str = None,
+                 document_name: str = None, start: datetime = None, end: datetime = None,
+                 service_search: str = None) -> dict:
+    """Mongo filter for the log query parameters (None means no filter)."""
+    query = {}
+    if department:
+        query["department"] = department
+    if service:
+        query["service"] = service
+    elif service_search:
+        query["service"] = {"$regex": re.escape(service_search), "$options": "i"}
+    if action:
+        query["action"] = action
+    if document_name:
+        query["document_name"] = document_name
+    if start or end:
+        query["timestamp"] = {}
+        if start:
+            query["timestamp"]["$gte"] = start
+        if end:
+            query["timestamp"]["$lt"] = end
+    return query
+
+
+def query_logs(limit: int = 100, cursor: str = None, **filters) -> dict:
+    """
+    One page of logs, newest first, filtered in MongoDB.
+
+    Args:
+        limit: Maximum entries per page
+        cursor: next_cursor of the previous page ("<timestamp ISO>|<_id>")
+        **filters: department, service, action, document_name, start, end, service_search
+
+    Returns:
+        Dict with 'logs' and 'next_cursor' (None on the last page)
+    """
+    logs = list(logs_collection.find(_logs_page_filter(cursor, **filters))
+                .sort([("timestamp", -1), ("_id", -1)]).limit(limit + 1))
+    return _logs_page(logs, limit)
+
+
+def _logs_page_filter(cursor: str = None, **filters) -> dict:
+    """Log filter plus the keyset condition for the page after `cursor`."""
+    query = _logs_filter(**filters)
+    if cursor:
+        timestamp, _, last_id = cursor.partition("|")
+        timestamp = datetime.fromisoformat(timestamp)
+        last_id = ObjectId(last_id)
+        page_filter = {"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": last_id}},
+        ]}
+        query = {"$and": [query, page_filter]} if query else page_filter
+    return query
+
+
+def _logs_page(logs: list, limit: int) -> dict:
+    """Trim a limit + 1 fetch to one page and build its next_cursor."""
+    has_more = len(logs) > limit
+    logs = logs[:limit]
+    next_cursor = None
+    if has_more and hasattr(logs[-1].get("timestamp"), "isoformat"):
+        next_cursor = f"{logs[-1]['timestamp'].isoformat()}|{logs[-1]['_id']}"
+    for log in logs:
+        log.pop("_id", None)
+    return {"logs": logs, "next_cursor": next_cursor}
+
+
+def iter_logs(batch_size: int = 1000, **filters):
+    """Stream matching logs (newest first) without loading them all into memory."""
+    cursor = logs_collection.find(_logs_filter(**filters), {"_id": 0}).sort("timestamp", -1).batch_size(batch_size)
+    try:
+        for log in cursor:
+            yield log
+    finally:
+        cursor.close()
+
+
+def get_log_filter_options(department: str = None) -> dict:
+    """Distinct departments, services (optionally of one department) and actions in the logs."""
+    return {
+        "departments": sorted(d for d in logs_collection.distinct("department") if d),
+        "services": sorted(s for s in logs_collection.distinct(
+            "service", {"department": department} if department else {}
+        ) if s),
+        "actions": sorted(a for a in logs_collection.distinct("action") if a),
+    }
+
+
 def get_logs_by_filename(filename: str):
     """Get all logs for a specific document."""
     return list(logs_collection.find(
@@ -266,18 +1048,51 @@ def get_logs_by_department_service(department: str, service: str):
 # CHAT HISTORY COLLECTION (MongoDB)
 # ======================================================
 
+def _serialize_message(message: dict) -> dict:
+    """Make a stored message JSON-friendly (ISO timestamp, no _id)."""
+    message.pop("_id", None)
+    message.pop("chat_id", None)
+    if "timestamp" in message and hasattr(message["timestamp"], "isoformat"):
+        message["timestamp"] = message["timestamp"].isoformat()
+    return message
+
+
+def _isoformat_dates(doc: dict, keys=("created_at", "updated_at", "last_active_at")) -> dict:
+    """Make a chat record's dates JSON-friendly (ISO strings), in place."""
+    for key in keys:
+        if hasattr(doc.get(key), "isoformat"):
+            doc[key] = doc[key].isoformat()
+    return doc
+
+
+def _new_chat_record(chat_id: str, title: str) -> dict:
+    """A new, empty chat record (chat_create and its async mirror)."""
+    now = datetime.now(timezone.utc)
+    return {
+        "chat_id": chat_id,
+        "created_at": now,
+        "updated_at": now,
+        "last_active_at": now,
+        "title": title,
+        "message_count": 0
+    }
+
+
+def _message_record(chat_id: str, seq: int, role: str, content: str, timestamp: datetime) -> dict:
+    """A chat_messages row."""
+    return {
+        "chat_id": chat_id,
+        "seq": seq,
+        "role": role,
+        "content": content,
+        "timestamp": timestamp
+    }
+
+
 def chat_create(chat_id: str, title: str = "New Chat") -> bool:
-    """Create a new chat session in MongoDB."""
+    """Create a new chat session in MongoDB (messages live in chat_messages)."""
     try:
-        now = datetime.now(timezone.utc)
-        chat_history_collection.insert_one({
-            "chat_id": chat_id,
-            "created_at": now,
-            "updated_at": now,
-            "title": title,
-            "messages": [],
-            "message_count": 0
-        })
+        chat_history_collection.insert_one(_new_chat_record(chat_id, title))
         return True
     except Exception as e:
         import logging
@@ -285,20 +1100,41 @@ def chat_create(chat_id: str, title: str = "New Chat") -> bool:
         return False
 
 
-def chat_get_by_id(chat_id: str):
-    """Get a chat by chat_id. Returns dict or None. Excludes _id for JSON serialization."""
-    doc = chat_history_collection.find_one({"chat_id": chat_id}, {"_id": 0})
-    if doc and "created_at" in doc:
-        if hasattr(doc["created_at"], "isoformat"):
-            doc["created_at"] = doc["created_at"].isoformat()
-        if hasattr(doc["updated_at"], "isoformat"):
-            doc["updated_at"] = doc["updated_at"].isoformat()
-        for m in doc.get("messages", []):
-            if "timestamp" in m and hasattr(m["timestamp"], "isoformat"):
-                m["timestamp"] = m["timestamp"].isoformat()
+def chat_get_by_id(chat_id: str, include_messages: bool = False):
+    """
+    Get a chat by chat_id. Returns dict or None. Excludes _id for JSON serialization.
+    Messages are only loaded (all of them) when include_messages is True.
+    """
+    doc = chat_history_collection.find_one({"chat_id": chat_id}, {"_id": 0, "messages": 0})
+    if doc:
+        _isoformat_dates(doc)
+        if include_messages:
+            doc["messages"] = chat_get_messages(chat_id)
     return doc
 
 
+def chat_touch(chat_id: str) -> bool:
+    """
+    Mark an empty chat as in use (last_active_at = now), postponing its expiry
+    by the empty-chat TTL. Chats with messages are left alone.
+    """
+    result = chat_history_collection.update_one(
+        {"chat_id": chat_id, "message_count": 0},
+        {"$set": {"last_active_at": datetime.now(timezone.utc)}}
+    )
+    return result.matched_count > 0
+
+
+def chat_get_message_count(chat_id: str):
+    """
+    message_count (the last message's seq) of a chat, or None if the chat does
+    not exist. A projection-only read used to check cached history tails.
+    """
+    doc = chat_history_collection.find_one({"chat_id": chat_id}, {"_id": 0, "message_count": 1})
+    # An existing chat without the field projects to {}, which is falsy
+    return (doc.get("message_count") or 0) if doc is not None else None
+
+
 def chat_update_title(chat_id: str, title: str) -> bool:
     """Update chat title and updated_at."""
     try:
@@ -313,52 +1149,253 @@ def chat_update_title(chat_id: str, title: str) -> bool:
         return False
 
 
-def chat_append_message(chat_id: str, role: str, content: str) -> bool:
-    """Append a message to chat and update message_count and updated_at."""
+def chat_append_message(chat_id: str, role: str, content: str):
+    """
+    Append a message to a chat.
+    The sequence number is allocated atomically with $inc on the chat's
+    message_count, so concurrent writers never share a seq.
+
+    Returns:
+        The updated chat record (no messages; message_count is the new
+        message's seq), or None on failure
+    """
     try:
         now = datetime.now(timezone.utc)
-        message = {
-            "seq": 0,  # will set via $inc or count
-            "role": role,
-            "content": content,
-            "timestamp": now
-        }
-        # Get current count for seq
-        chat = chat_history_collection.find_one({"chat_id": chat_id}, {"message_count": 1, "messages": 1})
+        chat = _chat_reserve_seqs(chat_id, _append_update(now), {"_id": 0, "messages": 0})
         if not chat:
-            return False
-        next_seq = (chat.get("message_count") or 0) + 1
-        message["seq"] = next_seq
-        chat_history_collection.update_one(
-            {"chat_id": chat_id},
-            {
-                "$push": {"messages": message},
-                "$set": {"updated_at": now, "message_count": next_seq}
-            }
-        )
-        return True
+            return None
+        chat_messages_collection.insert_one(_message_record(chat_id, chat["message_count"], role, content, now))
+        return _isoformat_dates(chat)
     except Exception as e:
         import logging
         logging.error(f"Error appending message: {e}")
+        return None
+
+
+def chat_allocate_seqs(chat_id: str, count: int, updated_at: datetime = None):
+    """
+    Reserve `count` consecutive message seqs for a chat with one $inc.
+
+    Returns:
+        The first reserved seq, or None if the chat does not exist
+    """
+    chat = _chat_reserve_seqs(
+        chat_id,
+        {"$inc": {"message_count": count}, "$max": {"updated_at": updated_at or datetime.now(timezone.utc)}},
+        {"_id": 0, "message_count": 1}
+    )
+    if not chat:
+        return None
+    return chat["message_count"] - count + 1
+
+
+def _chat_reserve_seqs(chat_id: str, update: dict, projection: dict):
+    """
+    Apply a message_count $inc to a chat whose messages live in chat_messages.
+    A chat that still has an embedded messages array is migrated first, so
+    new seqs continue after its existing messages and readers (which prefer
+    chat_messages) never see the new messages without the old ones.
+
+    Returns:
+        The updated chat record, or None if the chat does not exist
+    """
+    query = _seq_chat_filter(chat_id)
+    chat = chat_history_collection.find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.AFTER
+    )
+    if chat is None and chat_migrate_embedded_messages(chat_id):
+        chat = chat_history_collection.find_one_and_update(
+            query, update, projection=projection, return_document=ReturnDocument.AFTER
+        )
+    return chat
+
+
+def _seq_chat_filter(chat_id: str) -> dict:
+    """Matches a chat whose messages live in chat_messages (seqs can be reserved on it)."""
+    return {"chat_id": chat_id, "messages": {"$exists": False}}
+
+
+def _append_update(now: datetime) -> dict:
+    """Reserves the next seq of a chat for one appended message."""
+    return {"$inc": {"message_count": 1}, "$set": {"updated_at": now}}
+
+
+def chat_migrate_embedded_messages(chat_id: str) -> bool:
+    """Move a chat's embedded messages into chat_messages. False if it has none (or does not exist)."""
+    chat = chat_history_collection.find_one(_embedded_chat_filter(chat_id), {"chat_id": 1, "messages": 1})
+    if not chat:
         return False
+    chat_move_messages(chat)
+    return True
+
+
+def _embedded_chat_filter(chat_id: str) -> dict:
+    """Matches a legacy chat that still embeds its messages."""
+    return {"chat_id": chat_id, "messages": {"$exists": True}}
+
+
+def _merge_embedded_messages(embedded: list, rows: list) -> list:
+    """
+    A legacy chat's full history: its embedded messages in stored seq order,
+    followed by the chat_messages rows written after the last of them. Rows
+    that are not newer are copies made by an interrupted migration.
+    """
+    ordered = [m for _, m in sorted(enumerate(embedded), key=lambda pair: (pair[1].get("seq") or 0, pair[0]))]
+    last_timestamp = max((m["timestamp"] for m in ordered if m.get("timestamp")), default=None)
+    newer = [
+        m for m in rows
+        if last_timestamp is None or (m.get("timestamp") and m["timestamp"] > last_timestamp)
+    ]
+    return ordered + newer
+
+
+def chat_move_messages(chat: dict) -> int:
+    """
+    Move one chat's embedded messages (chat has _id, chat_id, messages) into
+    chat_messages, set message_count and remove the array.
+
+    Messages are renumbered 1..n in their stored order, which also repairs
+    duplicate seq values written by the old read-then-push append. Rows
+    appended to chat_messages after the last embedded message go after the
+    embedded ones and are renumbered with them. The copy is an idempotent
+    upsert, so an interrupted move can simply be run again.
+
+    Returns:
+        The number of messages the chat has afterwards
+    """
+    embedded = chat.get("messages") or []
+    rows = list(chat_messages_collection.find({"chat_id": chat["chat_id"]}, {"_id": 0}).sort("seq", 1))
+    ordered = _merge_embedded_messages(embedded, rows)
+    if len(ordered) > len(embedded):
+        # Newer rows are renumbered after the embedded messages
+        chat_messages_collection.delete_many({"chat_id": chat["chat_id"]})
+
+    operations = _moved_message_upserts(chat["chat_id"], ordered)
+    if operations:
+        chat_messages_collection.bulk_write(operations, ordered=False)
+
+    chat_history_collection.update_one(
+        {"_id": chat["_id"], "messages": {"$exists": True}},
+        _moved_chat_update(len(ordered))
+    )
+    return len(ordered)
+
+
+def _moved_message_upserts(chat_id: str, ordered: list) -> list:
+    """Idempotent upserts that copy a legacy chat's messages, renumbered 1..n, into chat_messages."""
+    return [
+        UpdateOne(
+            {"chat_id": chat_id, "seq": seq},
+            {"$setOnInsert": _message_record(
+                chat_id, seq, message.get("role", ""), message.get("content", ""), message.get("timestamp")
+            )},
+            upsert=True
+        )
+        for seq, message in enumerate(ordered, start=1)
+    ]
+
+
+def _moved_chat_update(message_count: int) -> dict:
+    """Update that finishes a move: the chat's seq counter, without the embedded array."""
+    return {"$set": {"message_count": message_count}, "$unset": {"messages": ""}}
+
+
+def chat_messages_upsert_bulk(messages: list):
+    """Write messages that already have a seq (idempotent on chat_id + seq)."""
+    if not messages:
+        return
+    chat_messages_collection.bulk_write([
+        UpdateOne({"chat_id": m["chat_id"], "seq": m["seq"]}, {"$setOnInsert": m}, upsert=True)
+        for m in messages
+    ], ordered=False)
+
+
+def chat_update_titles_bulk(titles: dict):
+    """Set the titles of many chats ({chat_id: (title, updated_at)}) in one round trip."""
+    if not titles:
+        return
+    chat_history_collection.bulk_write([
+        UpdateOne({"chat_id": chat_id}, {"$set": {"title": title}, "$max": {"updated_at": updated_at}})
+        for chat_id, (title, updated_at) in titles.items()
+    ], ordered=False)
+
+
+def chat_get_messages_page(chat_id: str, after_seq: int = 0, limit: int = 50) -> dict:
+    """
+    Get one page of a chat's messages in seq order.
+
+    Args:
+        chat_id: Chat to read
+        after_seq: Cursor; only messages with a greater seq are returned
+        limit: Maximum messages per page
+
+    Returns:
+        Dict with 'messages' and 'next_cursor' (None on the last page)
+    """
+    cursor = chat_messages_collection.find(
+        {"chat_id": chat_id, "seq": {"$gt": after_seq or 0}},
+        {"_id": 0, "chat_id": 0}
+    ).sort("seq", 1).limit(limit + 1)
+    messages = [_serialize_message(m) for m in cursor]
+    if not messages:
+        # Not yet migrated: page through the embedded array instead
+        messages = [m for m in _legacy_messages(chat_id) if (m.get("seq") or 0) > (after_seq or 0)][:limit + 1]
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    return {
+        "messages": messages,
+        "next_cursor": messages[-1]["seq"] if has_more else None
+    }
 
 
 def chat_get_messages(chat_id: str):
-    """Get messages list for a chat. Returns list of message dicts with serializable timestamps."""
-    chat = chat_history_collection.find_one({"chat_id": chat_id}, {"_id": 0, "messages": 1})
-    if not chat:
+    """Get all messages of a chat in seq order, with serializable timestamps."""
+    messages = [
+        _serialize_message(m) for m in
+        chat_messages_collection.find({"chat_id": chat_id}, {"_id": 0, "chat_id": 0}).sort("seq", 1)
+    ]
+    return messages or _legacy_messages(chat_id)
+
+
+def chat_get_recent_messages(chat_id: str, limit: int) -> list:
+    """
+    Get the last `limit` messages of a chat in seq order (role, content, seq only).
+    Reads just the tail via the (chat_id, seq) index, so the cost does not grow
+    with the length of the chat.
+    """
+    if limit <= 0:
         return []
-    messages = chat.get("messages", [])
-    for m in messages:
-        if "timestamp" in m and hasattr(m["timestamp"], "isoformat"):
-            m["timestamp"] = m["timestamp"].isoformat()
-    return messages
+    messages = list(chat_messages_collection.find(
+        {"chat_id": chat_id},
+        {"_id": 0, "seq": 1, "role": 1, "content": 1}
+    ).sort("seq", -1).limit(limit))
+    if messages:
+        messages.reverse()
+        return messages
+
+    # Not yet migrated: $slice the tail of the embedded array
+    chat = chat_history_collection.find_one(
+        {"chat_id": chat_id, "messages.0": {"$exists": True}},
+        {"_id": 0, "messages": {"$slice": -limit}}
+    )
+    return [
+        {"seq": m.get("seq"), "role": m.get("role"), "content": m.get("content", "")}
+        for m in (chat or {}).get("messages", [])
+    ]
+
+
+def _legacy_messages(chat_id: str) -> list:
+    """Messages embedded in chats not yet moved by scripts/migrate_chat_messages.py."""
+    chat = chat_history_collection.find_one({"chat_id": chat_id, "messages.0": {"$exists": True}},
+                                            {"_id": 0, "messages": 1})
+    return [_serialize_message(m) for m in (chat or {}).get("messages", [])]
 
 
 def chat_delete(chat_id: str) -> bool:
-    """Delete a chat session."""
+    """Delete a chat session and its messages."""
     try:
         result = chat_history_collection.delete_one({"chat_id": chat_id})
+        chat_messages_collection.delete_many({"chat_id": chat_id})
         return result.deleted_count > 0
     except Exception as e:
         import logging
@@ -367,8 +1404,8 @@ def chat_delete(chat_id: str) -> bool:
 
 
 def chat_get_all(sort_by_updated: bool = True):
-    """Get all chats. Returns list of chat docs (no _id), sorted by updated_at desc."""
-    cursor = chat_history_collection.find({}, {"_id": 0})
+    """Get all chats without messages. Returns list of chat docs (no _id), sorted by updated_at desc."""
+    cursor = chat_history_collection.find({}, {"_id": 0, "messages": 0})
     if sort_by_updated:
         cursor = cursor.sort("updated_at", -1)
     docs = list(cursor)
@@ -378,3 +1415,170 @@ def chat_get_all(sort_by_updated: bool = True):
         if "updated_at" in doc and hasattr(doc["updated_at"], "isoformat"):
             doc["updated_at"] = doc["updated_at"].isoformat()
     return docs
+
+
+def chat_list_summaries(limit: int = 20, cursor: str = None) -> dict:
+    """
+    List chats, most recently updated first, one page at a time.
+    Only chat_id, title, updated_at and message_count are read.
+
+    Args:
+        limit: Maximum chats per page
+        cursor: next_cursor of the previous page ("<updated_at ISO>|<chat_id>")
+
+    Returns:
+        Dict with 'chats' and 'next_cursor' (None on the last page)
+    """
+    docs = list(chat_history_collection.find(
+        _chat_summaries_filter(cursor),
+        CHAT_SUMMARY_PROJECTION
+    ).sort([("updated_at", -1), ("chat_id", -1)]).limit(limit + 1))
+    return _chat_summaries_page(docs, limit)
+
+
+CHAT_SUMMARY_PROJECTION = {"_id": 0, "chat_id": 1, "title": 1, "updated_at": 1, "message_count": 1}
+
+
+def _chat_summaries_filter(cursor: str = None) -> dict:
+    """Keyset condition for the chat summary page after `cursor`."""
+    if not cursor:
+        return {}
+    updated_at, _, chat_id = cursor.partition("|")
+    updated_at = datetime.fromisoformat(updated_at)
+    return {"$or": [
+        {"updated_at": {"$lt": updated_at}},
+        {"updated_at": updated_at, "chat_id": {"$lt": chat_id}},
+    ]}
+
+
+def _chat_summaries_page(docs: list, limit: int) -> dict:
+    """Trim a limit + 1 fetch to one page and build its next_cursor."""
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+    next_cursor = None
+    if has_more and hasattr(docs[-1].get("updated_at"), "isoformat"):
+        next_cursor = f"{docs[-1]['updated_at'].isoformat()}|{docs[-1]['chat_id']}"
+    for doc in docs:
+        if hasattr(doc.get("updated_at"), "isoformat"):
+            doc["updated_at"] = doc["updated_at"].isoformat()
+    return {"chats": docs, "next_cursor": next_cursor}
+
+
+# ======================================================
+# CHAT RETENTION (archive of inactive chats)
+# ======================================================
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def chat_find_inactive(cutoff: datetime, limit: int = 500) -> list:
+    """Chat records (oldest first) not updated since cutoff, including their messages."""
+    chats = list(chat_history_collection.find(
+        {"updated_at": {"$lt": cutoff}}, {"_id": 0}
+    ).sort("updated_at", 1).limit(limit))
+    if not chats:
+        return chats
+
+    by_chat = {}
+    for message in chat_messages_collection.find(
+        {"chat_id": {"$in": [c["chat_id"] for c in chats]}}, {"_id": 0}
+    ).sort([("chat_id", 1), ("seq", 1)]):
+        by_chat.setdefault(message.pop("chat_id"), []).append(message)
+    for chat in chats:
+        rows = by_chat.get(chat["chat_id"], [])
+        if "messages" in chat:
+            # Not yet migrated: the embedded array plus any rows appended since
+            chat["messages"] = _merge_embedded_messages(chat["messages"] or [], rows)
+        else:
+            chat["messages"] = rows
+    return chats
+
+
+def chat_count_inactive(cutoff: datetime) -> int:
+    """Number of chats not updated since cutoff."""
+    return chat_history_collection.count_documents({"updated_at": {"$lt": cutoff}})
+
+
+def chat_archive_insert(chats: list) -> int:
+    """
+    Store chats (with messages) in the compressed chat_archive collection.
+    Messages are kept as zlib-compressed JSON; the record stays queryable by
+    chat_id, title and dates.
+    """
+    if not chats:
+        return 0
+    now = datetime.now(timezone.utc)
+    operations = []
+    for chat in chats:
+        raw = json.dumps(chat.get("messages", []), ensure_ascii=False, default=_json_default).encode("utf-8")
+        operations.append(UpdateOne(
+            {"chat_id": chat["chat_id"]},
+            {"$set": {
+                "chat_id": chat["chat_id"],
+                "title": chat.get("title"),
+                "created_at": chat.get("created_at"),
+                "updated_at": chat.get("updated_at"),
+                "message_count": chat.get("message_count", 0),
+                "archived_at": now,
+                "encoding": "zlib+json",
+                "messages": zlib.compress(raw, TEXT_COMPRESSION_LEVEL),
+            }},
+            upsert=True
+        ))
+    chat_archive_collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def chat_archive_get(chat_id: str):
+    """Load an archived chat with its messages decompressed. Returns dict or None."""
+    doc = chat_archive_collection.find_one({"chat_id": chat_id}, {"_id": 0})
+    if doc and doc.get("messages") is not None:
+        doc["messages"] = json.loads(zlib.decompress(doc["messages"]).decode("utf-8"))
+    return doc
+
+
+def chat_archive_delete(chat_ids: list) -> int:
+    """Remove archived copies of chats (e.g. chats that became active again before deletion)."""
+    if not chat_ids:
+        return 0
+    return chat_archive_collection.delete_many({"chat_id": {"$in": list(chat_ids)}}).deleted_count
+
+
+def chat_delete_many(chat_ids: list, updated_before: datetime = None) -> list:
+    """
+    Delete many chats and their messages.
+
+    With updated_before, only chats still not updated since then are deleted:
+    a chat that received a message after it was read for archiving survives,
+    together with its messages.
+
+    Returns:
+        chat_ids of the chats actually deleted
+    """
+    if not chat_ids:
+        return []
+    query = {"chat_id": {"$in": list(chat_ids)}}
+    if updated_before is not None:
+        query["updated_at"] = {"$lt": updated_before}
+    chat_history_collection.delete_many(query)
+    # chat_ids are never reused, so whatever is left was skipped
+    remaining = set(chat_history_collection.distinct("chat_id", {"chat_id": {"$in": list(chat_ids)}}))
+    deleted = [chat_id for chat_id in chat_ids if chat_id not in remaining]
+    if deleted:
+        chat_messages_collection.delete_many({"chat_id": {"$in": deleted}})
+    return deleted
+
+
+def chat_delete_empty(older_than: datetime = None) -> int:
+    """Delete chats without messages (optionally only those not in use since older_than)."""
+    query = {"message_count": 0}
+    if older_than:
+        query["$or"] = [
+            {"last_active_at": {"$lt": older_than}},
+            # Chats created before last_active_at existed
+            {"last_active_at": {"$exists": False}, "created_at": {"$lt": older_than}},
+        ]
+    return chat_history_collection.delete_many(query).deleted_count
@@ -5,6 +5,7 @@ Ensures all required services are available and databases are initialized
 import os
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Tuple
 import requests
 from dotenv import load_dotenv
@@ -24,40 +25,47 @@ class ServiceInitializer:
     """Handles initialization and health checks for all services."""
     
     @staticmethod
-    def check_ollama_service() -> bool:
-        """Check if Ollama service is running and accessible."""
+    def fetch_ollama_models(timeout: float = 5):
+        """
+        One GET /api/tags call.
+
+        Returns:
+            List of installed model names, or None if Ollama is unreachable
+        """
+        ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
         try:
-            ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
-            response = requests.get(f"{ollama_base_url}/api/tags", timeout=5)
-            
-            if response.status_code == 200:
-                logger.info(f"✓ Ollama service is running at {ollama_base_url}")
-                return True
-            else:
-                logger.error(f"✗ Ollama service returned status code: {response.status_code}")
-                return False
+            response = requests.get(f"{ollama_base_url}/api/tags", timeout=timeout)
         except requests.exceptions.ConnectionError:
             logger.error(
-                f"✗ Cannot connect to Ollama service at {MODEL_CONFIG.get('ollama_base_url', 'http://localhost:11434')}. "
+                f"✗ Cannot connect to Ollama service at {ollama_base_url}. "
                 "Make sure Ollama is running."
             )
-            return False
+            return None
         except Exception as e:
             logger.error(f"✗ Error checking Ollama service: {e}")
+            return None
+        if response.status_code != 200:
+            logger.error(f"✗ Ollama service returned status code: {response.status_code}")
+            return None
+        return [m.get("name", "") for m in response.json().get("models", [])]
+
+    @staticmethod
+    def check_ollama_service(models: list = None) -> bool:
+        """Check if Ollama service is running and accessible (models: result of fetch_ollama_models)."""
+        if models is None:
+            models = ServiceInitializer.fetch_ollama_models()
+        if models is None:
             return False
+        logger.info(f"✓ Ollama service is running at {MODEL_CONFIG.get('ollama_base_url', 'http://localhost:11434')}")
+        return True
     
     @staticmethod
-    def check_chat_model_available() -> bool:
+    def check_chat_model_available(models: list = None) -> bool:
         """Check if the chat model is available in Ollama."""
         try:
-            ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
             chat_model = MODEL_CONFIG.get("chat_model", "llama3.1:latest")
-            
-            response = requests.get(f"{ollama_base_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "") for m in models]
-                
+            model_names = models if models is not None else ServiceInitializer.fetch_ollama_models()
+            if model_names is not None:
                 if any(chat_model in name for name in model_names):
                     logger.info(f"✓ Chat model '{chat_model}' is available")
                     return True
@@ -74,17 +82,12 @@ class ServiceInitializer:
             return False
     
     @staticmethod
-    def check_embedding_model_available() -> bool:
+    def check_embedding_model_available(models: list = None) -> bool:
         """Check if the embedding model is available in Ollama."""
         try:
-            ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
             embedding_model = MODEL_CONFIG.get("embedding_model", "mxbai-embed-large:latest")
-            
-            response = requests.get(f"{ollama_base_url}/api/tags", timeout=5)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "") for m in models]
-                
+            model_names = models if models is not None else ServiceInitializer.fetch_ollama_models()
+            if model_names is not None:
                 if any(embedding_model in name for name in model_names):
                     logger.info(f"✓ Embedding model '{embedding_model}' is available")
                     return True
@@ -154,7 +157,8 @@ class ServiceInitializer:
     @staticmethod
     def run_all_checks(exit_on_failure: bool = False) -> Tuple[Dict[str, bool], bool]:
         """
-        Run all initialization checks.
+        Run all initialization checks. Ollama, MongoDB and Chroma are checked
+        concurrently, so startup waits for the slowest check rather than the sum.
         
         Returns:
             Tuple of (results_dict, all_passed)
@@ -163,13 +167,19 @@ class ServiceInitializer:
         logger.info("Starting BSK Assistant Initialization Checks")
         logger.info("=" * 60)
         
-        results = {
-            "ollama_service": ServiceInitializer.check_ollama_service(),
-            "chat_model": ServiceInitializer.check_chat_model_available(),
-            "embedding_model": ServiceInitializer.check_embedding_model_available(),
-            "mongodb": ServiceInitializer.check_mongodb_connection(),
-            "chroma_vectorstore": ServiceInitializer.check_chroma_vectorstore(),
-        }
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup-check") as pool:
+            # One /api/tags call serves all three Ollama checks
+            models_future = pool.submit(ServiceInitializer.fetch_ollama_models)
+            mongodb_future = pool.submit(ServiceInitializer.check_mongodb_connection)
+            chroma_future = pool.submit(ServiceInitializer.check_chroma_vectorstore)
+            models = models_future.result()
+            results = {
+                "ollama_service": ServiceInitializer.check_ollama_service(models),
+                "chat_model": models is not None and ServiceInitializer.check_chat_model_available(models),
+                "embedding_model": models is not None and ServiceInitializer.check_embedding_model_available(models),
+                "mongodb": mongodb_future.result(),
+                "chroma_vectorstore": chroma_future.result(),
+            }
         
         logger.info("=" * 60)
         logger.info("Initialization Check Summary:")
@@ -190,16 +200,19 @@ class ServiceInitializer:
         return results, all_critical_passed
 
 
-def initialize_app():
-    """Initialize the application on startup."""
+def initialize_app(wait: bool = False) -> Dict:
+    """
+    Initialize the application on startup.
+
+    Starts the warm-up (startup checks plus Chroma, RAG engine and model
+    loading, in parallel) in the background, once per process, so the first
+    page renders without waiting for it. Returns the warm-up status; with
+    wait=True, returns after the warm-up has finished.
+    """
+    from core.warmup import startup_warmup
+
     logger.info("Initializing BSK Assistant Application...")
-    
-    # Run startup checks
-    results, critical_passed = ServiceInitializer.run_all_checks(exit_on_failure=False)
-    
-    if critical_passed:
-        logger.info("✓ All critical services initialized successfully!")
-    else:
-        logger.warning("⚠ Some services are not available. App may have limited functionality.")
-    
-    return results
+    startup_warmup.start()
+    if wait:
+        startup_warmup.wait()
+    return startup_warmup.status()
@@ -6,6 +6,8 @@ from models.llm_models import get_chat_model
 from core.vector_store import vector_store_manager
 from config.settings import SYSTEM_PROMPT, VECTOR_STORE_CONFIG, MODEL_CONFIG
 from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.lazy import LazyInstance
 import time
 from typing import List, Dict, Optional, Any
 
@@ -71,14 +73,15 @@ class RAGEngine:
     
     def _get_context_and_history(self, query: str, chat_id: Optional[str] = None) -> tuple:
         """Retrieve context and history without being part of the streaming chain."""
-        # Load full history directly from MongoDB for the given chat_id
+        # Load the recent history window (last MEMORY_CONFIG turns) from MongoDB
         history = []
         history_str = ""
         try:
             chat_messages = []
             if chat_id:
                 from services.chat_service import chat_service
-                chat_messages = chat_service.get_chat_messages(chat_id) or []
+                with metrics.timer("rag_stage_latency_ms", stage="history"):
+                    chat_messages = chat_service.get_recent_messages(chat_id) or []
 
             if chat_messages:
                 formatted_lines = []
@@ -123,7 +126,8 @@ class RAGEngine:
                 | self.llm_model
                 | StrOutputParser()
             )
-            reformulated = reformulation_chain.invoke(reformulation_input)
+            with metrics.timer("rag_stage_latency_ms", stage="reformulate"):
+                reformulated = reformulation_chain.invoke(reformulation_input)
             standalone_query = reformulated.strip() if reformulated else query
             logger.debug(f"Query reformulated: {standalone_query[:50]}...")
         except Exception as e:
@@ -136,7 +140,8 @@ class RAGEngine:
             if vector_store_manager.is_available():
                 retriever = vector_store_manager.get_retriever()
                 if retriever:
-                    documents = retriever.invoke(standalone_query)
+                    with metrics.timer("rag_stage_latency_ms", stage="retrieve"):
+                        documents = retriever.invoke(standalone_query)
                     context = self._get_enhanced_context(documents, standalone_query, chat_id)
             else:
                 context = "No documents loaded in vector store. Responding based on conversation history and system knowledge."
@@ -254,11 +259,15 @@ class RAGEngine:
             }
             
             # Stream or invoke based on configuration
+            generate_start = time.time()
+            first_chunk_at = None
             if self.streaming_enabled:
                 # Use streaming if enabled
                 logger.debug("Using streaming mode")
                 for chunk in self.chain.stream(chain_input):
                     if chunk:  # Ensure chunk is not empty
+                        if first_chunk_at is None:
+                            first_chunk_at = time.time()
                         full_response += chunk
                         chunk_count += 1
                         yield chunk
@@ -274,8 +283,14 @@ class RAGEngine:
                 chunk_count = 1
                 yield full_response
             
+            generate_time = time.time() - generate_start
             processing_time = time.time() - start_time
             logger.info(f"Query processed successfully in {processing_time:.2f}s with {chunk_count} chunks")
+            metrics.observe("rag_stage_latency_ms", generate_time * 1000, stage="generate")
+            metrics.observe("rag_query_latency_ms", processing_time * 1000)
+            if first_chunk_at is not None:
+                metrics.observe("rag_time_to_first_token_ms", (first_chunk_at - start_time) * 1000)
+            metrics.inc("rag_queries_total", status="ok")
 
             # ================== TOKEN USAGE & COST (ESTIMATED) ==================
             # We don't get exact server-side usage from the LangChain streaming chain,
@@ -292,6 +307,11 @@ class RAGEngine:
                 
                 total_tokens = prompt_tokens + completion_tokens
                 logger.info(f"Estimated tokens – prompt: {prompt_tokens}, completion: {completion_tokens}, total: {total_tokens}")
+                # tokens/sec = rate(llm_completion_tokens_total) / rate(llm_generation_seconds_total)
+                metrics.inc("llm_completion_tokens_total", completion_tokens)
+                metrics.inc("llm_generation_seconds_total", generate_time)
+                if generate_time > 0:
+                    metrics.set_gauge("llm_last_tokens_per_second", completion_tokens / generate_time)
             except Exception as token_err:
                 logger.warning(f"Failed to estimate token usage: {token_err}")
                 
@@ -304,6 +324,7 @@ class RAGEngine:
             processing_time = time.time() - start_time
             error_msg = f"Error processing query after {processing_time:.2f}s: {str(e)}"
             logger.error(error_msg)
+            metrics.inc("rag_queries_total", status="error")
             
             # Try to provide a helpful error message
             if "rate limit" in str(e).lower():
@@ -316,5 +337,5 @@ class RAGEngine:
                 yield "An error occurred while processing your query. Please try again."
     
 
-# Global enhanced RAG engine instance
-rag_engine = RAGEngine()
+# Global enhanced RAG engine instance (built on first use or during the startup warm-up)
+rag_engine = LazyInstance(RAGEngine, name="rag_engine")
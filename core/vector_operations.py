@@ -2,68 +2,162 @@
 Vector database operations for managing documents in Chroma (embedded local)
 """
 import os
+import shutil
 import tempfile
+import threading
+import time
+from functools import wraps
 from typing import List, Dict
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
 from core.vector_store import vector_store_manager
+from core.collection_migration import collection_migrator
+from core.chunking import clean_pdf_text, merge_page_texts, get_text_splitter
+from core.db_manager import (
+    find_document,
+    find_document_by_hash,
+    find_documents_chunk_ids,
+    save_document_text,
+    release_document_text,
+    get_document_chunk_ids,
+)
+from config.settings import UPLOAD_CONFIG, NEAR_DUP_CONFIG, VECTOR_STORE_CONFIG
+from utils.hashing import (
+    file_sha256,
+    chunk_hash,
+    chunk_id_for_hash,
+    split_owners,
+    join_owners,
+    owner_fields,
+    split_owner_meta,
+    join_owner_meta,
+    with_owners,
+    matching_owners,
+    owner_view,
+    OWNER_FIELDS,
+)
+from utils.minhash import LSHIndex, get_minhasher, signature_from_metadata, band_keys_from_metadata
 from utils.logger import get_logger
-import re
+from utils.metrics import metrics
+from utils.lazy import LazyInstance
 
 logger = get_logger(__name__)
 
+
+def _record_ingest(op: str):
+    """Count documents/pages/chunks and time an ingestion call from its result dict."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            status = "ok" if result.get("success") else "failed"
+            metrics.observe("ingest_document_latency_ms", (time.perf_counter() - start) * 1000, op=op)
+            metrics.inc("ingest_documents_total", op=op, status=status)
+            if status == "ok":
+                metrics.inc("ingest_pages_total", result.get("pages") or 0, op=op)
+                metrics.inc("ingest_chunks_total", result.get("chunks_added") or 0, op=op)
+            return result
+        return wrapper
+    return decorator
+
 class VectorDBOperations:
     """Operations for managing documents in Chroma vector store."""
     
     def __init__(self):
-        # Initialize the text splitter
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=int(os.getenv("CHUNK_SIZE", 1000)),
-            chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 350))
-        )
+        # Initialize the text splitter (character or token mode, see CHUNKING_CONFIG)
+        self.text_splitter = get_text_splitter()
+        # Chunk owners are read-modify-written in Chroma metadata; serialize those
+        # updates so concurrent ingests/deletes in this process don't lose owners
+        self._owners_lock = threading.RLock()
 
     def clean_pdf_text(self, text: str) -> str:
-        """Clean and normalize extracted PDF text.
+        """Clean and normalize extracted PDF text (see core.chunking.clean_pdf_text)."""
+        return clean_pdf_text(text)
 
-        - Fix hyphenation at line breaks
-        - Normalize newlines and whitespace
-        - Remove non-printable characters
+    def add_pdf_to_vectorstore(self, uploaded_file, filename: str, department: str = "", service: str = "", document_type: str = "") -> Dict:
         """
-        if not text:
-            return ""
+        Add an uploaded PDF (Streamlit file object) to Chroma.
 
-        # Normalize CRLF to LF
-        text = text.replace('\r\n', '\n').replace('\r', '\n')
+        The upload is copied to a temporary file in fixed-size blocks and then
+        ingested through add_pdf_path_to_vectorstore().
 
-        # Remove hyphenation where words are split at line breaks
-        text = re.sub(r"-\n\s*", "", text)
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            filename: Name of the file
+            department: Department name for this document
+            service: Service name for this document
+            document_type: Type of document (FAQ, Policy, etc.)
 
-        # Collapse multiple newlines to at most two
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        Returns:
+            Dict with operation status and details
+        """
+        temp_file_path = None
+        try:
+            temp_file_path = self._spool_uploaded_file(uploaded_file)
+            return self.add_pdf_path_to_vectorstore(temp_file_path, filename, department, service, document_type)
 
-        # Collapse multiple spaces/tabs
-        text = re.sub(r"[ \t]{2,}", " ", text)
+        except Exception as e:
+            logger.error(f"Error adding {filename} to Chroma: {e}")
+            return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_added": 0}
+        finally:
+            # Clean up temporary file
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
 
-        # Remove non-printable characters except newline
-        text = ''.join(ch for ch in text if ch.isprintable() or ch == '\n')
+    def replace_pdf_in_vectorstore(self, uploaded_file, filename: str) -> Dict:
+        """
+        Replace a stored document with an uploaded new version (Streamlit file object).
 
-        # Strip leading/trailing whitespace
-        return text.strip()
+        See replace_pdf_path_in_vectorstore() for the diffing behaviour.
+        """
+        temp_file_path = None
+        try:
+            temp_file_path = self._spool_uploaded_file(uploaded_file)
+            return self.replace_pdf_path_in_vectorstore(temp_file_path, filename)
 
-    def add_pdf_to_vectorstore(self, uploaded_file, filename: str, department: str = "", service: str = "", document_type: str = "") -> Dict:
+        except Exception as e:
+            logger.error(f"Error replacing document '{filename}' in Chroma: {e}")
+            return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_added": 0}
+        finally:
+            if temp_file_path and os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+
+    def _spool_uploaded_file(self, uploaded_file) -> str:
+        """Copy an in-memory upload to a temporary PDF file in blocks; returns its path."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+            if hasattr(uploaded_file, "read"):
+                shutil.copyfileobj(uploaded_file, temp_file, UPLOAD_CONFIG.get("chunk_size_bytes", 1024 * 1024))
+            else:
+                temp_file.write(uploaded_file.getvalue())
+            return temp_file.name
+
+    @_record_ingest("add")
+    def add_pdf_path_to_vectorstore(self, file_path: str, filename: str, department: str = "", service: str = "", document_type: str = "") -> Dict:
         """
-        Add a PDF file to Chroma and sync to MongoDB.
-        
+        Add a PDF that is already on disk to Chroma.
+
+        The file is read directly by the PDF loader, so no in-memory copy of
+        the raw bytes is made. The caller owns the file and must delete it.
+
+        Ingestion is content-addressed: a file whose SHA-256 matches a stored
+        document is linked to that document's chunks without parsing or
+        embedding, and chunks whose text already exists in the collection are
+        stored once with the new filename added to their "owners". Each owner
+        keeps its own classification of a shared chunk ("owner_meta").
+
         Args:
-            uploaded_file: Streamlit uploaded file object
+            file_path: Path of the PDF on local disk
             filename: Name of the file
             department: Department name for this document
             service: Service name for this document
             document_type: Type of document (FAQ, Policy, etc.)
-            
+
         Returns:
             Dict with operation status and details
         """
+        text_saved = False
         try:
             # Check if vector store is available
             if not vector_store_manager.is_available():
@@ -81,83 +175,553 @@ class VectorDBOperations:
                     "message": f"Document '{filename}' already exists. Please delete it first or use a different name.",
                     "chunks_added": 0
                 }
-            
-            # Save uploaded file to temporary location
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(uploaded_file.getvalue())
-                temp_file_path = temp_file.name
-            
-            try:
-                # Load PDF using PyMuPDFLoader
-                from langchain_community.document_loaders import PyMuPDFLoader
-                loader = PyMuPDFLoader(temp_file_path)
-                docs = loader.load()
-                
-                if not docs:
-                    return {"success": False, "message": "Failed to load document. It may be empty.", "chunks_added": 0}
-                
-                # Merge all pages into a single text string
-                full_text = "\n".join([doc.page_content for doc in docs])
-                
-                # Clean the extracted text
-                cleaned_text = self.clean_pdf_text(full_text)
-                if not cleaned_text.strip():
-                    return {"success": False, "message": "Cleaned document text is empty.", "chunks_added": 0}
 
-                # Create a single document for splitting
-                merged_doc = Document(page_content=cleaned_text, metadata={"source": filename, "filename": filename})
-                
-                # Split into chunks
-                chunks = self.text_splitter.split_documents([merged_doc])
-                if not chunks:
-                    return {"success": False, "message": "Failed to create chunks from the document.", "chunks_added": 0}
-                
-                # Create IDs for each chunk using filename and index
-                chunk_ids = [f"{filename}_{i+1}" for i in range(len(chunks))]
-                
-                from datetime import datetime
-                upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Enrich chunks with metadata
-                for chunk in chunks:
-                    chunk.metadata["filename"] = filename
-                    chunk.metadata["source"] = filename
-                    chunk.metadata["department"] = department
-                    chunk.metadata["service"] = service
-                    chunk.metadata["document_type"] = document_type
-                    chunk.metadata["status"] = "Active"
-                    chunk.metadata["add_modify"] = "Add"
-                    chunk.metadata["date_time"] = upload_timestamp
-                
-                # Add chunks to Chroma
-                success = vector_store_manager.add_documents(chunks, ids=chunk_ids)
-                
-                if not success:
+            file_hash = file_sha256(file_path)
+
+            # Identical file already stored: link to its chunks, skip parse/embed
+            original = find_document_by_hash(file_hash)
+            if original and original.get("filename") != filename:
+                original_ids = original.get("chunk_ids") or []
+                fields = {"department": department, "service": service,
+                          "document_type": document_type, "status": "Active"}
+                linked_ids = self._add_owner(original_ids, filename, fields)
+                if linked_ids and len(linked_ids) == len(original_ids):
+                    vector_store_manager.persist()
+                    logger.info(f"✓ {filename} is identical to {original['filename']}; linked {len(linked_ids)} chunks")
                     return {
-                        "success": False,
-                        "message": "Failed to add documents to Chroma.",
-                        "chunks_added": 0
+                        "success": True,
+                        "message": f"'{filename}' is identical to '{original['filename']}'; linked to its {len(linked_ids)} existing chunks.",
+                        "chunks_added": 0,
+                        "chunks_linked": len(linked_ids),
+                        "chroma_ids": linked_ids,
+                        "file_hash": file_hash,
+                        "duplicate_of": original["filename"]
                     }
-                
-                # Persist Chroma collection
-                vector_store_manager.persist()
-                
-                logger.info(f"✓ Successfully added {len(chunks)} chunks for {filename} to Chroma")
-                
+            
+            chunks, error, pages = self._load_pdf_chunks(file_path, filename)
+            if error:
+                return {"success": False, "message": error, "chunks_added": 0}
+
+            result = self._index_chunks(filename, chunks, file_hash, department, service, document_type)
+            result["pages"] = len(pages)
+            # Only after the Chroma write succeeded
+            text_saved = self._save_text(file_hash, pages, filename)
+            return result
+                    
+        except Exception as e:
+            logger.error(f"Error adding {filename} to Chroma: {e}")
+            if text_saved:
+                release_document_text(file_hash)
+            return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_added": 0}
+
+    def add_text_pages_to_vectorstore(self, filename: str, pages: List[str], file_hash: str,
+                                      department: str = "", service: str = "", document_type: str = "") -> Dict:
+        """
+        Index a document from its stored page texts (no PDF needed).
+
+        Used to rebuild the collection; chunking is identical to PDF ingestion,
+        so chunk IDs match the document's recorded chunk_ids.
+        """
+        try:
+            if not vector_store_manager.is_available():
+                return {"success": False, "message": "Vector store is not available.", "chunks_added": 0}
+
+            chunks, error = self._split_pages(pages, filename)
+            if error:
+                return {"success": False, "message": error, "chunks_added": 0}
+
+            return self._index_chunks(filename, chunks, file_hash, department, service, document_type)
+
+        except Exception as e:
+            logger.error(f"Error indexing stored text of {filename}: {e}")
+            return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_added": 0}
+
+    def _index_chunks(self, filename: str, chunks: List[Document], file_hash: str,
+                      department: str, service: str, document_type: str) -> Dict:
+        """Enrich split chunks with metadata and store them content-addressed."""
+        from datetime import datetime
+        upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Enrich chunks with metadata and key them by content hash
+        unique_chunks = {}
+        for chunk in chunks:
+            content_hash = chunk_hash(chunk.page_content)
+            chunk_id = chunk_id_for_hash(content_hash)
+            if chunk_id in unique_chunks:
+                continue
+            chunk.metadata["filename"] = filename
+            chunk.metadata["source"] = filename
+            chunk.metadata["department"] = department
+            chunk.metadata["service"] = service
+            chunk.metadata["document_type"] = document_type
+            chunk.metadata["status"] = "Active"
+            chunk.metadata["add_modify"] = "Add"
+            chunk.metadata["date_time"] = upload_timestamp
+            chunk.metadata["content_hash"] = content_hash
+            chunk.metadata["file_hash"] = file_hash
+            chunk.metadata["owners"] = join_owners([filename])
+            chunk.metadata["owner_count"] = 1
+            chunk.metadata["owner_meta"] = join_owner_meta({filename: owner_fields(chunk.metadata)})
+            unique_chunks[chunk_id] = chunk
+        chunk_ids = list(unique_chunks.keys())
+
+        # Link chunks stored elsewhere, handle near duplicates, embed the rest
+        stored = self._store_chunks(filename, unique_chunks)
+        chunk_ids = list(dict.fromkeys(stored["remap"].get(cid, cid) for cid in chunk_ids))
+        new_ids = stored["embedded"]
+        linked_ids = stored["linked"]
+        dedup_stats = self._dedup_stats(len(chunks), len(unique_chunks), stored)
+        
+        # Persist Chroma collection
+        vector_store_manager.persist()
+        
+        logger.info(
+            f"✓ Successfully added {filename} to Chroma: {len(new_ids)} new chunks, "
+            f"{len(linked_ids)} shared, {dedup_stats['repeated_in_file']} repeated within file, "
+            f"{dedup_stats['near_duplicates']} near duplicates ({dedup_stats['near_duplicate_rate']:.1%})"
+        )
+        
+        return {
+            "success": True,
+            "message": f"Successfully added '{filename}' to vector store ({len(new_ids)} new chunks, {len(linked_ids)} shared).",
+            "chunks_added": len(new_ids),
+            "chunks_linked": len(linked_ids),
+            "chroma_ids": chunk_ids,  # Return IDs for Mongo sync
+            "file_hash": file_hash,
+            "dedup_stats": dedup_stats
+        }
+
+    def _store_chunks(self, filename: str, candidates: Dict[str, Document]) -> Dict:
+        """
+        Store content-addressed chunks for filename.
+
+        Chunks whose ID already exists only gain filename as an owner. The
+        rest go through MinHash near-duplicate detection (NEAR_DUP_CONFIG
+        "ingest_mode"): "flag" marks them with near_dup_of/near_dup_score,
+        "skip" links filename to the similar stored chunk instead of storing
+        a new one. Whatever remains is embedded and upserted.
+
+        Embedding runs outside the owners lock; before the upsert the pending
+        IDs are checked again under the lock, so a chunk another ingest stored
+        in the meantime gains filename as an owner instead of being overwritten.
+
+        Returns:
+            Dict with 'linked' and 'embedded' ID lists, 'near_duplicates'
+            count and 'remap' (skipped chunk ID -> representative chunk ID)
+        """
+        candidate_ids = list(candidates.keys())
+        fields = owner_fields(candidates[candidate_ids[0]].metadata) if candidate_ids else {}
+        with self._owners_lock:
+            existing = vector_store_manager.get_chunks(ids=candidate_ids)
+            linked = self._add_owner(existing["ids"], filename, fields, existing["metadatas"])
+        linked_set = set(linked)
+        pending = {cid: candidates[cid] for cid in candidate_ids if cid not in linked_set}
+
+        remap = {}
+        near = self._find_near_duplicates(filename, pending)
+        if NEAR_DUP_CONFIG.get("ingest_mode") == "skip":
+            stored_reps = []
+            for chunk_id, (rep_id, _) in near.items():
+                remap[chunk_id] = rep_id
+                pending.pop(chunk_id, None)
+                if rep_id not in candidates and rep_id not in stored_reps:
+                    stored_reps.append(rep_id)
+            linked.extend(cid for cid in self._add_owner(stored_reps, filename, fields) if cid not in linked_set)
+        else:
+            for chunk_id, (rep_id, score) in near.items():
+                pending[chunk_id].metadata["near_dup_of"] = rep_id
+                pending[chunk_id].metadata["near_dup_score"] = round(score, 3)
+
+        embedded = list(pending.keys())
+        if not embedded:
+            return {"linked": linked, "embedded": [], "near_duplicates": len(near), "remap": remap}
+
+        embeddings = dict(zip(embedded, vector_store_manager.embed_documents(
+            [pending[cid].page_content for cid in embedded]
+        )))
+        with self._owners_lock:
+            raced = vector_store_manager.get_chunks(ids=embedded)
+            if raced["ids"]:
+                linked.extend(self._add_owner(raced["ids"], filename, fields, raced["metadatas"]))
+                raced_set = set(raced["ids"])
+                embedded = [cid for cid in embedded if cid not in raced_set]
+            if embedded and not vector_store_manager.add_documents(
+                [pending[cid] for cid in embedded], ids=embedded, embeddings=[embeddings[cid] for cid in embedded]
+            ):
+                raise RuntimeError("Failed to add documents to Chroma.")
+        return {"linked": linked, "embedded": embedded, "near_duplicates": len(near), "remap": remap}
+
+    def _find_near_duplicates(self, filename: str, pending: Dict[str, Document]) -> Dict:
+        """
+        Find near-duplicates of pending chunks among stored chunks owned by
+        other documents and among earlier pending chunks.
+
+        Signatures and LSH band keys are written into each pending chunk's
+        metadata so later ingests and queries can reuse them.
+
+        Returns:
+            Dict mapping chunk ID -> (representative chunk ID, estimated similarity)
+        """
+        if NEAR_DUP_CONFIG.get("ingest_mode", "off") == "off" or not pending:
+            return {}
+
+        hasher = get_minhasher()
+        signatures = {}
+        for chunk_id, chunk in pending.items():
+            signature = hasher.signature(chunk.page_content)
+            keys = hasher.band_keys(signature)
+            signatures[chunk_id] = (signature, keys)
+            chunk.metadata.update(hasher.metadata(signature))
+
+        # One filtered read fetches every stored chunk sharing any LSH band
+        index = LSHIndex(hasher)
+        where = hasher.band_filter(keys for _, keys in signatures.values())
+        stored = vector_store_manager.get_chunks(where=where) if where else {"ids": [], "metadatas": []}
+        for chunk_id, meta in zip(stored["ids"], stored["metadatas"]):
+            if filename in split_owners(meta):
+                continue
+            signature = signature_from_metadata(meta)
+            keys = band_keys_from_metadata(meta, hasher.bands)
+            if signature is not None and keys:
+                index.add(chunk_id, signature, keys)
+
+        near = {}
+        skip = NEAR_DUP_CONFIG.get("ingest_mode") == "skip"
+        for chunk_id, (signature, keys) in signatures.items():
+            rep_id, score = index.best_match(signature, keys)
+            if rep_id is not None:
+                near[chunk_id] = (rep_id, score)
+                if skip:
+                    continue
+            index.add(chunk_id, signature, keys)
+        return near
+
+    @staticmethod
+    def _dedup_stats(total_chunks: int, unique_chunks: int, stored: Dict) -> Dict:
+        """Per-document deduplication report for logs and the Mongo record."""
+        near = stored.get("near_duplicates", 0)
+        return {
+            "chunks_total": total_chunks,
+            "repeated_in_file": max(total_chunks - unique_chunks, 0),
+            "shared_exact": len(stored.get("linked", [])),
+            "near_duplicates": near,
+            "near_duplicate_rate": round(near / unique_chunks, 4) if unique_chunks else 0.0,
+            "embedded": len(stored.get("embedded", [])),
+        }
+
+    def _load_pdf_chunks(self, file_path: str, filename: str):
+        """
+        Parse, clean and split a PDF on disk.
+
+        Returns:
+            Tuple of (chunks, error_message, page_texts); chunks is empty when error_message is set
+        """
+        pages, error = self._load_pdf_pages(file_path)
+        if error:
+            return [], error, []
+        chunks, error = self._split_pages(pages, filename)
+        return chunks, error, pages
+
+    @staticmethod
+    def _save_text(file_hash: str, pages: List[str], filename: str) -> bool:
+        """
+        Save the cleaned page texts to the document text store once the chunks
+        are in Chroma. The document record is written by the caller; if that
+        fails, the db layer releases the text again.
+        """
+        if save_document_text(file_hash, pages, filename):
+            return True
+        logger.warning(f"⚠ Could not store extracted text for {filename}; reindexing it will need the PDF")
+        return False
+
+    def _load_pdf_pages(self, file_path: str):
+        """
+        Extract and clean the text of each page of a PDF.
+
+        Returns:
+            Tuple of (page_texts, error_message)
+        """
+        # Load PDF using PyMuPDFLoader
+        from langchain_community.document_loaders import PyMuPDFLoader
+        loader = PyMuPDFLoader(file_path)
+        docs = loader.load()
+        
+        if not docs:
+            return [], "Failed to load document. It may be empty."
+        return [self.clean_pdf_text(doc.page_content) for doc in docs], None
+
+    def _split_pages(self, pages: List[str], filename: str):
+        """
+        Merge cleaned page texts and split them into chunks.
+
+        Returns:
+            Tuple of (chunks, error_message)
+        """
+        cleaned_text = merge_page_texts(pages)
+        if not cleaned_text.strip():
+            return [], "Cleaned document text is empty."
+
+        # Create a single document for splitting
+        merged_doc = Document(page_content=cleaned_text, metadata={"source": filename, "filename": filename})
+        
+        # Split into chunks
+        chunks = self.text_splitter.split_documents([merged_doc])
+        if not chunks:
+            return [], "Failed to create chunks from the document."
+        return chunks, None
+
+    def _add_owner(self, chunk_ids: List[str], filename: str, fields: Dict, metadatas: List[Dict] = None) -> List[str]:
+        """
+        Add filename, with its classification fields, to the owners of existing
+        chunks (metadata only, no re-embedding). The chunks keep their primary's
+        top-level classification.
+        Callers passing metadatas must have read them while holding the owners lock.
+
+        Returns:
+            IDs of the chunks that exist in Chroma and are now owned by filename
+        """
+        with self._owners_lock:
+            if metadatas is None:
+                existing = vector_store_manager.get_chunks(ids=list(chunk_ids))
+                chunk_ids, metadatas = existing["ids"], existing["metadatas"]
+            if not chunk_ids:
+                return []
+
+            update_ids, update_metas = [], []
+            for chunk_id, meta in zip(chunk_ids, metadatas):
+                owners = split_owners(meta)
+                if filename in owners:
+                    continue
+                entries = split_owner_meta(meta)
+                entries[filename] = dict(fields)
+                update_ids.append(chunk_id)
+                update_metas.append(with_owners(meta, owners + [filename], entries))
+
+            if not vector_store_manager.update_metadatas(update_ids, update_metas):
+                return []
+        return list(chunk_ids)
+
+    def _release_owner(self, filename: str, chunk_ids: List[str] = None) -> Dict:
+        """
+        Remove filename from the owners of all its chunks.
+
+        Returns:
+            Dict with 'deleted' and 'released' chunk counts
+        """
+        ids, _, _ = self._get_owned_chunks(filename, chunk_ids)
+        return self._release_chunks(filename, ids)
+
+    def _get_owned_chunks(self, filename: str, chunk_ids: List[str] = None, include_documents: bool = False):
+        """
+        Collect the chunks owned by filename: those where it is the primary
+        'filename' plus any recorded chunk_ids (shared chunks).
+
+        Returns:
+            Tuple of (ids, metadatas, documents); documents is empty unless requested
+        """
+        include = ["metadatas", "documents"] if include_documents else ["metadatas"]
+        primary = vector_store_manager.get_chunks(where={"filename": filename}, include=include)
+        ids = list(primary["ids"])
+        metadatas = list(primary["metadatas"])
+        documents = list(primary.get("documents", []))
+
+        seen = set(ids)
+        extra_ids = [cid for cid in (chunk_ids or []) if cid not in seen]
+        if extra_ids:
+            extra = vector_store_manager.get_chunks(ids=extra_ids, include=include)
+            ids.extend(extra["ids"])
+            metadatas.extend(extra["metadatas"])
+            documents.extend(extra.get("documents", []))
+        return ids, metadatas, documents
+
+    def _release_chunks(self, filename: str, ids: List[str]) -> Dict:
+        """
+        Remove filename from the owners of the given chunks.
+
+        Chunks left without owners are deleted; shared chunks keep their
+        embedding and, if filename was their primary, are re-pointed at the
+        next remaining owner and take its classification from "owner_meta".
+        Current owners are read under the owners lock, not taken from the caller.
+
+        Returns:
+            Dict with 'deleted' and 'released' chunk counts
+        """
+        with self._owners_lock:
+            current = vector_store_manager.get_chunks(ids=list(ids))
+            delete_ids, update_ids, update_metas = [], [], []
+            looked_up = {}
+            for chunk_id, meta in zip(current["ids"], current["metadatas"]):
+                owners = split_owners(meta)
+                remaining = [o for o in owners if o != filename]
+                if not remaining:
+                    delete_ids.append(chunk_id)
+                    continue
+                if remaining == owners:
+                    continue
+                update_ids.append(chunk_id)
+                update_metas.append(with_owners(meta, remaining, self._owner_meta(meta, remaining, looked_up)))
+
+            if not vector_store_manager.update_metadatas(update_ids, update_metas):
+                raise RuntimeError("Failed to update shared chunk ownership")
+            if not vector_store_manager.delete_ids(delete_ids):
+                raise RuntimeError("Failed to delete chunks")
+        return {"deleted": len(delete_ids), "released": len(update_ids)}
+
+    def _owner_meta(self, meta: Dict, owners: List[str], looked_up: Dict) -> Dict:
+        """
+        Per-owner classification of a chunk for owners. Owners the chunk has no
+        entry for (it was shared before entries were kept) are looked up once
+        per call through looked_up (see _owner_fields).
+        """
+        entries = split_owner_meta(meta)
+        for owner in owners:
+            if owner not in entries:
+                if owner not in looked_up:
+                    looked_up[owner] = self._owner_fields(owner)
+                entries[owner] = dict(looked_up[owner])
+        return entries
+
+    @staticmethod
+    def _owner_fields(filename: str) -> Dict:
+        """
+        Classification of filename when a shared chunk has no entry for it:
+        taken from one of its own chunks (status and description only live in
+        Chroma), otherwise from its MongoDB record.
+        """
+        fields = {}
+        record = find_document(filename) or {}
+        for key in ("department", "service", "document_type"):
+            if key in record:
+                fields[key] = record[key]
+        own = vector_store_manager.get_chunks(where={"filename": filename}, limit=1)
+        if own["metadatas"]:
+            meta = own["metadatas"][0] or {}
+            for key in ("department", "service", "document_type", "description", "status"):
+                if key in meta:
+                    fields[key] = meta[key]
+        return fields
+
+    @_record_ingest("replace")
+    def replace_pdf_path_in_vectorstore(self, file_path: str, filename: str) -> Dict:
+        """
+        Replace a stored document with a new version, touching only changed chunks.
+
+        The new version is chunked and diffed against the stored chunks by
+        content hash: unchanged chunks are left as they are, new chunks are
+        embedded and upserted, and vanished chunks are released (deleted once
+        no other document owns them). New chunks are written before anything
+        is removed, so the document stays searchable throughout the swap.
+
+        Args:
+            file_path: Path of the new PDF version on local disk
+            filename: Name of the stored document to replace
+
+        Returns:
+            Dict with operation status, diff counts and the new chunk IDs
+        """
+        text_saved = False
+        try:
+            if not vector_store_manager.is_available():
+                return {"success": False, "message": "Vector store is not available.", "chunks_added": 0}
+
+            record = find_document(filename) or {}
+            old_ids, old_metas, old_docs = self._get_owned_chunks(
+                filename, record.get("chunk_ids"), include_documents=True
+            )
+            if not old_ids:
+                return {"success": False, "message": f"No document found with filename: '{filename}'", "chunks_added": 0}
+
+            file_hash = file_sha256(file_path)
+            if record.get("file_hash") == file_hash:
                 return {
                     "success": True,
-                    "message": f"Successfully added '{filename}' to vector store ({len(chunks)} chunks).",
-                    "chunks_added": len(chunks),
-                    "chroma_ids": chunk_ids  # Return IDs for Mongo sync
+                    "message": f"'{filename}' is unchanged.",
+                    "chunks_added": 0,
+                    "chunks_removed": 0,
+                    "chunks_unchanged": len(old_ids),
+                    "chroma_ids": old_ids,
+                    "file_hash": file_hash
                 }
-                
-            finally:
-                # Clean up temporary file
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                    
+
+            # Stored chunks by content hash (legacy chunks are hashed from their text)
+            old_by_hash = {}
+            for chunk_id, meta, text in zip(old_ids, old_metas, old_docs):
+                content_hash = (meta or {}).get("content_hash") or chunk_hash(text)
+                old_by_hash.setdefault(content_hash, chunk_id)
+
+            chunks, error, pages = self._load_pdf_chunks(file_path, filename)
+            if error:
+                return {"success": False, "message": error, "chunks_added": 0}
+
+            from datetime import datetime
+            upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            template = owner_view(next((m for m in old_metas if (m or {}).get("filename") == filename), old_metas[0]), filename)
+
+            new_chunk_ids = []
+            kept_ids = set()
+            candidates = {}
+            for chunk in chunks:
+                content_hash = chunk_hash(chunk.page_content)
+                if content_hash in old_by_hash:
+                    chunk_id = old_by_hash[content_hash]
+                    kept_ids.add(chunk_id)
+                else:
+                    chunk_id = chunk_id_for_hash(content_hash)
+                    if chunk_id not in candidates:
+                        chunk.metadata.update({
+                            "filename": filename,
+                            "source": filename,
+                            "department": record.get("department", template.get("department", "")),
+                            "service": record.get("service", template.get("service", "")),
+                            "document_type": record.get("document_type", template.get("document_type", "")),
+                            "description": template.get("description", ""),
+                            "status": template.get("status", "Active"),
+                            "add_modify": "Modify",
+                            "date_time": upload_timestamp,
+                            "content_hash": content_hash,
+                            "file_hash": file_hash,
+                            "owners": join_owners([filename]),
+                            "owner_count": 1
+                        })
+                        chunk.metadata["owner_meta"] = join_owner_meta({filename: owner_fields(chunk.metadata)})
+                        candidates[chunk_id] = chunk
+                if chunk_id not in new_chunk_ids:
+                    new_chunk_ids.append(chunk_id)
+
+            # 1. Add new content first so the document never drops out of search
+            stored = self._store_chunks(filename, candidates)
+            new_chunk_ids = list(dict.fromkeys(stored["remap"].get(cid, cid) for cid in new_chunk_ids))
+            embed_ids = stored["embedded"]
+            linked = stored["linked"]
+
+            # 2. Then release chunks that vanished from the new version
+            vanished = [cid for cid in old_ids if cid not in kept_ids]
+            counts = self._release_chunks(filename, vanished)
+
+            vector_store_manager.persist()
+            text_saved = self._save_text(file_hash, pages, filename)
+
+            logger.info(
+                f"✓ Replaced {filename}: {len(embed_ids)} embedded, {len(linked)} linked, "
+                f"{len(kept_ids)} unchanged, {len(vanished)} removed ({counts['deleted']} deleted)"
+            )
+            return {
+                "success": True,
+                "message": f"Updated '{filename}' ({len(embed_ids) + len(linked)} new chunks, {len(vanished)} removed, {len(kept_ids)} unchanged).",
+                "chunks_added": len(embed_ids),
+                "chunks_linked": len(linked),
+                "chunks_removed": len(vanished),
+                "chunks_unchanged": len(kept_ids),
+                "chroma_ids": new_chunk_ids,
+                "file_hash": file_hash,
+                "pages": len(pages),
+                "dedup_stats": self._dedup_stats(len(chunks), len(new_chunk_ids), stored)
+            }
+
         except Exception as e:
-            logger.error(f"Error adding {filename} to Chroma: {e}")
+            logger.error(f"Error replacing document '{filename}' in Chroma: {e}")
+            if text_saved:
+                release_document_text(file_hash)
             return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_added": 0}
 
     def list_documents(self) -> List[str]:
@@ -178,9 +742,123 @@ class VectorDBOperations:
             logger.error(f"Error listing documents: {e}")
             return []
 
+    def update_metadata(self, match: Dict, updates: Dict) -> Dict:
+        """
+        Bulk-update chunk metadata (department, service, type, description, status)
+        without re-embedding.
+
+        Classification is kept per owner, so a chunk shared between documents
+        is matched through any owner's own classification, and only the
+        matched owners' classification changes (their chunks sharing with
+        other documents are reported as chunks_shared). The top-level fields
+        follow the chunk's primary document. Unless status is filtered (it
+        only lives in Chroma), documents are also matched by their MongoDB
+        record and its chunk_ids.
+
+        Args:
+            match: Filter with any of filename, department, service, status
+            updates: Metadata fields to set
+
+        Returns:
+            Dict with operation status, chunks updated/shared and the matched
+            filenames
+        """
+        failed = {"success": False, "chunks_updated": 0, "chunks_shared": 0, "filenames": []}
+        try:
+            if not vector_store_manager.is_available():
+                return {**failed, "message": "Vector store is not available."}
+
+            criteria = {key: match.get(key) for key in ("filename", "department", "service", "status")}
+            where = vector_store_manager.build_where(**criteria)
+            if where is None:
+                return {**failed, "message": "At least one filter field is required."}
+
+            fields = {key: value for key, value in updates.items() if value is not None}
+            if not fields:
+                return {**failed, "message": "No metadata fields to update."}
+            from datetime import datetime
+            fields["add_modify"] = "Modify"
+            fields.setdefault("date_time", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+
+            batch_size = VECTOR_STORE_CONFIG.get("metadata_batch_size", 1000)
+            with self._owners_lock:
+                targets = self._metadata_targets(criteria, where)
+                looked_up = {}
+                update_ids, update_metas, filenames, shared = [], [], set(), 0
+                for chunk_id, (meta, matched) in targets.items():
+                    owners = split_owners(meta)
+                    entries = self._owner_meta(meta, owners, looked_up)
+                    for owner in matched:
+                        entries[owner].update({key: fields[key] for key in OWNER_FIELDS if key in fields})
+                    merged = with_owners(meta, owners, entries)
+                    if merged["filename"] in matched:
+                        merged.update(fields)
+                    update_ids.append(chunk_id)
+                    update_metas.append(merged)
+                    filenames.update(matched)
+                    shared += len(matched) < len(owners)
+                for start in range(0, len(update_ids), batch_size):
+                    if not vector_store_manager.update_metadatas(update_ids[start:start + batch_size],
+                                                                 update_metas[start:start + batch_size]):
+                        return {**failed, "message": "Failed to update chunk metadata."}
+            filenames = sorted(filenames)
+            collection_migrator.notify_changed(filenames)
+
+            message = f"Updated {len(update_ids)} chunks across {len(filenames)} documents."
+            if shared:
+                message += f" {shared} of them are shared with other documents, which keep their own metadata."
+            return {
+                "success": True,
+                "message": message,
+                "chunks_updated": len(update_ids),
+                "chunks_shared": shared,
+                "filenames": filenames
+            }
+
+        except Exception as e:
+            logger.error(f"Error updating metadata for {match}: {e}")
+            return {**failed, "message": f"An error occurred: {str(e)}"}
+
+    def _metadata_targets(self, criteria: Dict, where: Dict) -> Dict:
+        """
+        Resolve the chunks an update_metadata call applies to and, for each,
+        the owners whose classification it changes. Chunks match through
+        their primary's top-level fields or, when shared, through any owner's
+        own classification; documents matched by their MongoDB record match
+        all of their recorded chunks.
+
+        Returns:
+            Dict of chunk ID -> (metadata, matched owners)
+        """
+        conditions = {key: value for key, value in criteria.items() if value is not None}
+        candidates = vector_store_manager.get_chunks(where={"$or": [where, {"owner_count": {"$gt": 1}}]})
+        targets = {}
+        for chunk_id, meta in zip(candidates["ids"], candidates["metadatas"]):
+            matched = matching_owners(meta, conditions)
+            if matched:
+                targets[chunk_id] = (meta, set(matched))
+
+        if criteria.get("status") is None:
+            recorded = {}
+            for doc in find_documents_chunk_ids(criteria["filename"], criteria["department"], criteria["service"]):
+                for chunk_id in doc.get("chunk_ids") or []:
+                    recorded.setdefault(chunk_id, set()).add(doc["filename"])
+            missing = [cid for cid in recorded if cid not in targets]
+            if missing:
+                extra = vector_store_manager.get_chunks(ids=missing)
+                for chunk_id, meta in zip(extra["ids"], extra["metadatas"]):
+                    targets[chunk_id] = (meta, set())
+            for chunk_id, names in recorded.items():
+                if chunk_id in targets:
+                    meta, matched = targets[chunk_id]
+                    matched.update(name for name in names if name in split_owners(meta))
+        return {chunk_id: target for chunk_id, target in targets.items() if target[1]}
+
     def delete_document_by_filename(self, filename: str) -> Dict:
         """
-        Delete all chunks of a document from Chroma by filename.
+        Delete a document from Chroma by filename.
+
+        Chunks shared with other documents are kept and only lose this owner.
         
         Args:
             filename: Name of the file to delete
@@ -191,19 +869,26 @@ class VectorDBOperations:
         try:
             if not vector_store_manager.is_available():
                 return {"success": False, "message": "Vector store is not available.", "chunks_deleted": 0}
+
+            # Chunk ownership recorded at ingest (covers shared chunks)
+            chunk_ids = []
+            try:
+                record = find_document(filename)
+                chunk_ids = (record or {}).get("chunk_ids") or []
+            except Exception as e:
+                logger.warning(f"Could not read chunk ownership for {filename}: {e}")
+
+            counts = self._release_owner(filename, chunk_ids)
             
-            # Delete from Chroma using filter
-            success = vector_store_manager.delete_by_filter({"filename": filename})
-            
-            if success:
+            if counts["deleted"] or counts["released"]:
                 # Persist changes
                 vector_store_manager.persist()
                 
-                logger.info(f"✓ Deleted all chunks for filename: {filename}")
+                logger.info(f"✓ Deleted {filename}: {counts['deleted']} chunks removed, {counts['released']} shared chunks released")
                 return {
                     "success": True, 
                     "message": f"Successfully deleted '{filename}' from vector store.",
-                    "chunks_deleted": -1  # Unknown exact count, but successful
+                    "chunks_deleted": counts["deleted"]
                 }
             else:
                 return {
@@ -216,6 +901,43 @@ class VectorDBOperations:
             logger.error(f"Error deleting document '{filename}' from Chroma: {e}")
             return {"success": False, "message": f"An error occurred: {str(e)}", "chunks_deleted": 0}
     
+    def reconcile_owners(self, chunk_ids: List[str] = None) -> int:
+        """
+        Rewrite chunk owners from the MongoDB chunk_ids lists (all chunks, or
+        only chunk_ids when given), adding missing per-owner classification.
+        Owner updates are serialized within a process, but ingests running in
+        separate processes (API, Streamlit, scripts) can still race on shared
+        chunks; this pass makes the final ownership match the document records.
+
+        Returns:
+            Number of chunks whose metadata was corrected
+        """
+        if chunk_ids is not None and not chunk_ids:
+            return 0
+        owners = {}
+        for doc in get_document_chunk_ids(chunk_ids):
+            for chunk_id in doc["chunk_ids"]:
+                owners.setdefault(chunk_id, []).append(doc["filename"])
+
+        fixed = 0
+        chunk_ids = list(owners) if chunk_ids is None else [cid for cid in dict.fromkeys(chunk_ids) if cid in owners]
+        batch_size = 1000
+        looked_up = {}
+        for start in range(0, len(chunk_ids), batch_size):
+            fixed_ids, fixed_metas = [], []
+            with self._owners_lock:
+                current = vector_store_manager.get_chunks(ids=chunk_ids[start:start + batch_size])
+                for chunk_id, meta in zip(current["ids"], current["metadatas"]):
+                    expected = sorted(set(owners[chunk_id]))
+                    # Also fills in per-owner classification missing from older shared chunks
+                    if sorted(split_owners(meta)) == expected and set(split_owner_meta(meta)) >= set(expected):
+                        continue
+                    fixed_ids.append(chunk_id)
+                    fixed_metas.append(with_owners(meta, expected, self._owner_meta(meta, expected, looked_up)))
+                if fixed_ids and vector_store_manager.update_metadatas(fixed_ids, fixed_metas):
+                    fixed += len(fixed_ids)
+        return fixed
+
     def get_document_stats(self) -> Dict:
         """
         Get vector store statistics (Chroma).
@@ -241,5 +963,5 @@ class VectorDBOperations:
             }
 
 
-# Global instance for legacy imports
-vector_db_operations = VectorDBOperations()
+# Global instance for legacy imports (the text splitter may load a tokenizer, so build on first use)
+vector_db_operations = LazyInstance(VectorDBOperations, name="vector_operations")
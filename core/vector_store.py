@@ -2,14 +2,26 @@
 Vector store management using embedded Chroma (local, no external service)
 """
 import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
 from typing import List, Dict, Optional
-import chromadb
 from models.embeddings import get_embeddings
-from config.settings import VECTOR_STORE_CONFIG, MODEL_CONFIG, EMBEDDING_MODEL
+from config.settings import VECTOR_STORE_CONFIG, MODEL_CONFIG, EMBEDDING_MODEL, NEAR_DUP_CONFIG
 from utils.logger import get_logger
+from utils.metrics import metrics
+from utils.hashing import split_owners, matching_owners, owner_view
+from utils.lazy import LazyInstance
+from utils.minhash import collapse_near_duplicates, get_minhasher
 
 logger = get_logger(__name__)
 
+# File in the persist directory naming the collection queries are served from
+ACTIVE_POINTER_FILE = "active_collection.json"
+# Minimum seconds between checks of the pointer file for a switch by another process
+POINTER_CHECK_INTERVAL = 1.0
+
 
 class OllamaEmbeddingFunction:
     """Chroma embedding function wrapper for Ollama embeddings."""
@@ -21,7 +33,10 @@ class OllamaEmbeddingFunction:
     def __call__(self, input):
         # Chroma expects parameter name "input"
         texts = input if isinstance(input, list) else [input]
-        return self.embeddings.embed_documents(texts)
+        metrics.inc("embedding_calls_total", kind="documents")
+        metrics.inc("embedding_texts_total", len(texts), kind="documents")
+        with metrics.timer("embedding_latency_ms", kind="documents"):
+            return self.embeddings.embed_documents(texts)
 
     def name(self):
         # Chroma expects embedding_function.name() callable
@@ -32,18 +47,40 @@ class ChromaVectorStore:
     """Manages embedded Chroma vector store operations (local, persistent)."""
     
     def __init__(self):
-        self.embeddings = get_embeddings()
-        embedding_model = MODEL_CONFIG.get("embedding_model", EMBEDDING_MODEL)
-        self.embedding_function = OllamaEmbeddingFunction(self.embeddings, model_name=embedding_model)
         self.client = None
         self.collection = None
         self.persist_directory = VECTOR_STORE_CONFIG.get("persist_directory", "./db/chroma")
-        self.collection_name = VECTOR_STORE_CONFIG.get("collection_name", "bsk_documents")
+        self.pointer_path = os.path.join(self.persist_directory, ACTIVE_POINTER_FILE)
+        self._switch_lock = threading.Lock()
+        self._pointer_mtime = None
+        self._pointer_checked_at = 0.0
+
+        # A completed migration may have moved queries to another collection/model
+        pointer = self.read_active_pointer()
+        self.collection_name = pointer.get("collection_name") or VECTOR_STORE_CONFIG.get("collection_name", "bsk_documents")
+        self.embedding_model = pointer.get("embedding_model") or MODEL_CONFIG.get("embedding_model", EMBEDDING_MODEL)
+        VECTOR_STORE_CONFIG["collection_name"] = self.collection_name
+
+        self.embeddings = get_embeddings(self.embedding_model)
+        self.embedding_function = OllamaEmbeddingFunction(self.embeddings, model_name=self.embedding_model)
         self._initialize_chroma()
+
+    @property
+    def collection(self):
+        """Active Chroma collection (follows switches made by other processes)."""
+        self._refresh_active_collection()
+        return self._collection
+
+    @collection.setter
+    def collection(self, value):
+        self._collection = value
     
     def _initialize_chroma(self):
         """Initialize Chroma client with local persistence."""
         try:
+            # Imported here: chromadb is slow to import and only needed once the store is used
+            import chromadb
+
             # Ensure persist directory exists
             os.makedirs(self.persist_directory, exist_ok=True)
             logger.info(f"Chroma persist directory ensured: {self.persist_directory}")
@@ -57,6 +94,7 @@ class ChromaVectorStore:
                 metadata={"hnsw:space": "cosine"},
                 embedding_function=self.embedding_function
             )
+            self._pointer_mtime = self._get_pointer_mtime()
             
             logger.info(f"✓ Chroma vector store initialized successfully with collection: {self.collection_name}")
             logger.info(f"  Persist directory: {self.persist_directory}")
@@ -64,14 +102,137 @@ class ChromaVectorStore:
         except Exception as e:
             logger.error(f"Failed to initialize Chroma vector store: {e}")
             raise
+
+    # ------------------------------------------------------------------
+    # Active collection pointer (zero-downtime collection switches)
+    # ------------------------------------------------------------------
+
+    def read_active_pointer(self) -> Dict:
+        """Read the active collection pointer file ({} when absent or unreadable)."""
+        try:
+            with open(self.pointer_path, "r", encoding="utf-8") as f:
+                return json.load(f) or {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"⚠ Could not read active collection pointer: {e}")
+            return {}
+
+    def _get_pointer_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.pointer_path).st_mtime
+        except OSError:
+            return None
+
+    def _refresh_active_collection(self):
+        """Reopen the collection when the pointer file was changed (e.g. by another process)."""
+        now = time.monotonic()
+        if self.client is None or now - self._pointer_checked_at < POINTER_CHECK_INTERVAL:
+            return
+        self._pointer_checked_at = now
+        mtime = self._get_pointer_mtime()
+        if mtime == self._pointer_mtime:
+            return
+        pointer = self.read_active_pointer()
+        if pointer.get("collection_name"):
+            self._activate(pointer["collection_name"], pointer.get("embedding_model") or self.embedding_model)
+        self._pointer_mtime = mtime
+
+    def _activate(self, collection_name: str, embedding_model: str):
+        """Point this process at a collection and its embedding model."""
+        with self._switch_lock:
+            if collection_name == self.collection_name and embedding_model == self.embedding_model:
+                return
+            embeddings = get_embeddings(embedding_model) if embedding_model != self.embedding_model else self.embeddings
+            embedding_function = OllamaEmbeddingFunction(embeddings, model_name=embedding_model)
+            collection = self.client.get_collection(name=collection_name, embedding_function=embedding_function)
+            # Swap all references together so queries never mix models
+            self.embeddings = embeddings
+            self.embedding_function = embedding_function
+            self.embedding_model = embedding_model
+            self.collection_name = collection_name
+            self._collection = collection
+            VECTOR_STORE_CONFIG["collection_name"] = collection_name
+            logger.info(f"✓ Serving queries from collection {collection_name} ({embedding_model})")
+
+    def switch_collection(self, collection_name: str, embedding_model: str) -> bool:
+        """
+        Atomically make collection_name the active collection.
+        The pointer file is replaced in one rename, so every process sees
+        either the old or the new collection, never a partial state.
+        """
+        try:
+            if collection_name not in self.list_collections():
+                logger.error(f"Cannot switch to missing collection: {collection_name}")
+                return False
+            pointer = {
+                "collection_name": collection_name,
+                "embedding_model": embedding_model,
+                "previous_collection": self.collection_name,
+                "previous_embedding_model": self.embedding_model,
+                "switched_at": datetime.now(timezone.utc).isoformat()
+            }
+            tmp_path = f"{self.pointer_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(pointer, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.pointer_path)
+            self._activate(collection_name, embedding_model)
+            self._pointer_mtime = self._get_pointer_mtime()
+            return True
+        except Exception as e:
+            logger.error(f"Error switching active collection: {e}")
+            return False
+
+    def open_collection(self, collection_name: str, embedding_model: str, create: bool = False):
+        """Open (optionally create) a collection other than the active one, e.g. a migration target."""
+        embedding_function = OllamaEmbeddingFunction(get_embeddings(embedding_model), model_name=embedding_model)
+        if create:
+            return self.client.get_or_create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine", "embedding_model": embedding_model},
+                embedding_function=embedding_function
+            )
+        return self.client.get_collection(name=collection_name, embedding_function=embedding_function)
+
+    def list_collections(self) -> List[str]:
+        """Names of all collections in the persist directory."""
+        try:
+            return sorted(
+                c if isinstance(c, str) else c.name
+                for c in self.client.list_collections()
+            )
+        except Exception as e:
+            logger.error(f"Error listing Chroma collections: {e}")
+            return []
+
+    def drop_collection(self, collection_name: str) -> bool:
+        """Delete a collection. The active collection is never dropped."""
+        if collection_name == self.collection_name:
+            logger.error(f"Refusing to drop the active collection: {collection_name}")
+            return False
+        try:
+            self.client.delete_collection(name=collection_name)
+            logger.info(f"✓ Dropped Chroma collection {collection_name}")
+            return True
+        except Exception as e:
+            logger.error(f"Error dropping collection {collection_name}: {e}")
+            return False
     
-    def add_documents(self, documents: List[Dict], ids: List[str]) -> bool:
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the active collection's embedding function."""
+        return self.embedding_function(list(texts))
+
+    def add_documents(self, documents: List[Dict], ids: List[str],
+                      embeddings: Optional[List[List[float]]] = None) -> bool:
         """
         Add documents to Chroma.
         
         Args:
             documents: List of document objects with page_content and metadata
             ids: List of unique IDs for each document
+            embeddings: Precomputed embeddings (see embed_documents); computed by Chroma when omitted
             
         Returns:
             True if successful, False otherwise
@@ -90,11 +251,19 @@ class ChromaVectorStore:
                 metadatas.append(doc.metadata if hasattr(doc, 'metadata') else doc.get('metadata', {}))
             
             # Add to collection
-            self.collection.upsert(
-                ids=ids,
-                documents=texts,
-                metadatas=metadatas
-            )
+            if embeddings is not None:
+                self.collection.upsert(
+                    ids=ids,
+                    documents=texts,
+                    metadatas=metadatas,
+                    embeddings=embeddings
+                )
+            else:
+                self.collection.upsert(
+                    ids=ids,
+                    documents=texts,
+                    metadatas=metadatas
+                )
             
             logger.info(f"✓ Added {len(documents)} documents to Chroma collection")
             return True
@@ -106,6 +275,10 @@ class ChromaVectorStore:
     def query(self, query_text: str, k: int = 4, where: Optional[Dict] = None) -> List[Dict]:
         """
         Query documents from Chroma.
+
+        A filter from build_where also matches chunks shared between documents
+        through any owner's own classification; such results carry that
+        owner's view of the metadata (its filename, department, service...).
         
         Args:
             query_text: Query text
@@ -119,12 +292,20 @@ class ChromaVectorStore:
             if not self.collection:
                 logger.error("Chroma collection not available")
                 return []
+
+            conditions = self.where_conditions(where)
+            n_results = k
+            if conditions:
+                # Shared chunks are filtered per owner below, so over-fetch them
+                where = {"$or": [where, {"owner_count": {"$gt": 1}}]}
+                n_results = max(2 * k, VECTOR_STORE_CONFIG.get("fetch_k", k))
             
-            results = self.collection.query(
-                query_texts=[query_text],
-                n_results=k,
-                where=where
-            )
+            with metrics.timer("chroma_query_latency_ms", op="query"):
+                results = self.collection.query(
+                    query_texts=[query_text],
+                    n_results=n_results,
+                    where=where
+                )
             
             # Format results
             documents = []
@@ -136,14 +317,207 @@ class ChromaVectorStore:
                         'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
                         'distance': results['distances'][0][i] if results['distances'] else 0
                     }
+                    if conditions:
+                        owners = matching_owners(doc['metadata'], conditions)
+                        if not owners:
+                            continue
+                        if doc['metadata'].get('filename') not in owners:
+                            doc['metadata'] = owner_view(doc['metadata'], owners[0])
                     documents.append(doc)
             
-            return documents
+            return documents[:k]
             
         except Exception as e:
             logger.error(f"Error querying Chroma: {e}")
             return []
     
+    def get_chunks(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+                   include: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, List]:
+        """
+        Fetch stored chunks by ID and/or metadata filter without embedding anything.
+
+        Args:
+            ids: Optional list of chunk IDs
+            where: Optional filter conditions
+            include: Fields to return (defaults to metadatas only)
+            limit: Optional maximum number of chunks
+
+        Returns:
+            Dict with 'ids' and the requested fields (empty lists on failure)
+        """
+        include = include or ["metadatas"]
+        empty = {"ids": [], **{field: [] for field in include}}
+        try:
+            if not self.collection:
+                logger.error("Chroma collection not available")
+                return empty
+            if ids is not None and not ids:
+                return empty
+
+            results = self.collection.get(ids=ids, where=where, include=include, limit=limit)
+            out = {"ids": results.get("ids", []) or []}
+            for field in include:
+                out[field] = results.get(field, []) or []
+            return out
+
+        except Exception as e:
+            logger.error(f"Error fetching chunks from Chroma: {e}")
+            return empty
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]) -> bool:
+        """
+        Replace chunk metadata in place. Documents are not sent, so nothing is re-embedded.
+
+        Args:
+            ids: Chunk IDs to update
+            metadatas: Full metadata dict for each ID
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not self.collection:
+                logger.error("Chroma collection not available")
+                return False
+            if not ids:
+                return True
+
+            self.collection.update(ids=ids, metadatas=metadatas)
+            logger.info(f"✓ Updated metadata for {len(ids)} chunks")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error updating chunk metadata in Chroma: {e}")
+            return False
+
+    @staticmethod
+    def build_where(filename: Optional[str] = None, department: Optional[str] = None,
+                    service: Optional[str] = None, status: Optional[str] = None) -> Optional[Dict]:
+        """Build a Chroma metadata filter from optional equality conditions."""
+        conditions = [
+            {key: value}
+            for key, value in (("filename", filename), ("department", department),
+                               ("service", service), ("status", status))
+            if value is not None
+        ]
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+    @staticmethod
+    def where_conditions(where: Optional[Dict]) -> Optional[Dict]:
+        """Equality conditions of a filter built by build_where (None for any other filter)."""
+        if not where:
+            return None
+        parts = where["$and"] if set(where) == {"$and"} else [where]
+        conditions = {}
+        for part in parts:
+            if not isinstance(part, dict) or len(part) != 1:
+                return None
+            key, value = next(iter(part.items()))
+            if key not in ("filename", "department", "service", "status") or isinstance(value, dict):
+                return None
+            conditions[key] = value
+        return conditions
+
+    def update_metadata(self, updates: Dict, where: Optional[Dict] = None,
+                        ids: Optional[List[str]] = None, batch_size: Optional[int] = None) -> Dict:
+        """
+        Set metadata fields on every matching chunk without re-embedding.
+
+        Matching IDs are resolved first, then metadata is read and written back in
+        batches; chunk text is never sent, so the embedding function is not called.
+
+        Args:
+            updates: Metadata fields to set (None values are ignored)
+            where: Filter conditions (see build_where)
+            ids: Explicit chunk IDs (alternative to where)
+            batch_size: Chunks per read/update call
+
+        Returns:
+            Dict with success, chunks updated and the filenames they belong to
+        """
+        updates = {key: value for key, value in (updates or {}).items() if value is not None}
+        result = {"success": False, "updated": 0, "filenames": []}
+        try:
+            if not self.collection:
+                logger.error("Chroma collection not available")
+                return result
+            if not updates or (where is None and ids is None):
+                result["success"] = True
+                return result
+
+            # Resolve IDs up front: updating a filtered field would shift offset-based pages
+            matched_ids = self.collection.get(ids=ids, where=where, include=[]).get("ids", []) or []
+            batch_size = batch_size or VECTOR_STORE_CONFIG.get("metadata_batch_size", 1000)
+            filenames = set()
+
+            for start in range(0, len(matched_ids), batch_size):
+                batch_ids = matched_ids[start:start + batch_size]
+                current = self.collection.get(ids=batch_ids, include=["metadatas"])
+                batch_ids = current.get("ids", []) or []
+                metadatas = []
+                for meta in current.get("metadatas", []) or []:
+                    merged = dict(meta or {})
+                    merged.update(updates)
+                    metadatas.append(merged)
+                    if merged.get("filename"):
+                        filenames.add(merged["filename"])
+                if batch_ids:
+                    self.collection.update(ids=batch_ids, metadatas=metadatas)
+                    result["updated"] += len(batch_ids)
+
+            result["success"] = True
+            result["filenames"] = sorted(filenames)
+            logger.info(f"✓ Updated metadata {sorted(updates)} on {result['updated']} chunks (filter: {where})")
+            return result
+
+        except Exception as e:
+            logger.error(f"Error bulk updating chunk metadata in Chroma: {e}")
+            return result
+
+    def update_metadata_by_filename(self, filename: str, updates: Dict) -> Dict:
+        """Set metadata fields on all chunks of a file."""
+        return self.update_metadata(updates, where=self.build_where(filename=filename))
+
+    def update_metadata_by_service(self, department: str, service: str, updates: Dict) -> Dict:
+        """Set metadata fields on all chunks of a department/service."""
+        return self.update_metadata(updates, where=self.build_where(department=department, service=service))
+
+    def set_status(self, status: str, filename: Optional[str] = None, department: Optional[str] = None,
+                   service: Optional[str] = None) -> Dict:
+        """Flip the status of all chunks matching a file and/or department/service."""
+        where = self.build_where(filename=filename, department=department, service=service)
+        if where is None:
+            logger.warning("Refusing to set status without a filter")
+            return {"success": False, "updated": 0, "filenames": []}
+        return self.update_metadata({"status": status}, where=where)
+
+    def delete_ids(self, ids: List[str]) -> bool:
+        """
+        Delete chunks by ID.
+
+        Args:
+            ids: Chunk IDs to delete
+
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            if not self.collection:
+                logger.error("Chroma collection not available")
+                return False
+            if not ids:
+                return True
+
+            self.collection.delete(ids=ids)
+            logger.info(f"✓ Deleted {len(ids)} chunks from Chroma")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error deleting chunks from Chroma: {e}")
+            return False
+
     def delete_by_filter(self, where: Dict) -> bool:
         """
         Delete documents matching a filter.
@@ -192,8 +566,8 @@ class ChromaVectorStore:
             filenames = set()
             if all_docs.get('metadatas'):
                 for metadata in all_docs['metadatas']:
-                    if 'filename' in metadata:
-                        filenames.add(metadata['filename'])
+                    # Shared chunks list every owning file in "owners"
+                    filenames.update(split_owners(metadata))
             
             return sorted(list(filenames))
             
@@ -250,30 +624,45 @@ class ChromaVectorStore:
             # Create a simple wrapper retriever for Chroma
             # This retrieves documents using Chroma's query functionality
             class ChromaRetriever:
-                def __init__(self, collection, embeddings, k=4):
+                def __init__(self, collection, embeddings, k=4, fetch_k=None, collapse=False):
                     self.collection = collection
                     self.embeddings = embeddings
                     self.k = k
+                    self.fetch_k = max(fetch_k or k, k)
+                    self.collapse = collapse
                 
                 def invoke(self, query_text):
                     """Retrieve similar documents using embeddings."""
                     # Get embeddings for query
-                    query_embedding = self.embeddings.embed_query(query_text)
+                    metrics.inc("embedding_calls_total", kind="query")
+                    metrics.inc("embedding_texts_total", kind="query")
+                    with metrics.timer("embedding_latency_ms", kind="query"):
+                        query_embedding = self.embeddings.embed_query(query_text)
                     
-                    # Create a Document-like object for Chroma query results
-                    results = self.collection.query(
-                        query_embeddings=[query_embedding],
-                        n_results=self.k
-                    )
+                    # Over-fetch when collapsing so near-duplicates don't use up the k slots
+                    with metrics.timer("chroma_query_latency_ms", op="retrieve"):
+                        results = self.collection.query(
+                            query_embeddings=[query_embedding],
+                            n_results=self.fetch_k if self.collapse else self.k
+                        )
                     
                     # Convert results to Document-like objects
                     documents = []
                     if results and results.get('ids') and len(results['ids']) > 0:
-                        for i, doc_id in enumerate(results['ids'][0]):
+                        ids = results['ids'][0]
+                        texts = results['documents'][0] if results.get('documents') else [''] * len(ids)
+                        metadatas = results['metadatas'][0] if results.get('metadatas') else [{}] * len(ids)
+                        if self.collapse:
+                            positions = collapse_near_duplicates(
+                                list(zip(ids, texts, metadatas)), get_minhasher(), limit=self.k
+                            )
+                        else:
+                            positions = range(min(len(ids), self.k))
+                        for i in positions:
                             # Create a simple Document wrapper
                             doc = type('Document', (), {
-                                'page_content': results['documents'][0][i] if results.get('documents') else '',
-                                'metadata': results['metadatas'][0][i] if results.get('metadatas') else {}
+                                'page_content': texts[i],
+                                'metadata': metadatas[i] or {}
                             })()
                             documents.append(doc)
                     
@@ -281,12 +670,18 @@ class ChromaVectorStore:
             
             # Use k from config, default to 4
             k = VECTOR_STORE_CONFIG.get("k", 4)
-            retriever = ChromaRetriever(self.collection, self.embeddings, k=k)
+            retriever = ChromaRetriever(
+                self.collection,
+                self.embeddings,
+                k=k,
+                fetch_k=VECTOR_STORE_CONFIG.get("fetch_k", k),
+                collapse=NEAR_DUP_CONFIG.get("collapse_on_query", False)
+            )
             return retriever
             
         except Exception as e:
             logger.error(f"Error creating retriever: {e}")
             return None
 
-# Global instance
-vector_store_manager = ChromaVectorStore()
+# Global instance (opens Chroma on first use or during the startup warm-up)
+vector_store_manager = LazyInstance(ChromaVectorStore, name="vector_store")
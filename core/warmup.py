@@ -0,0 +1,169 @@
+"""
+Startup warm-up.
+
+The heavy singletons (Chroma vector store, RAG engine, text splitter) are
+built on first use (see utils.lazy). At startup the API and the Streamlit app
+call startup_warmup.start(), which builds them and runs the startup checks
+concurrently on a small thread pool in the background, and optionally loads
+the chat and embedding models into Ollama memory. The process starts serving
+immediately; /health/ready reports not ready until the warm-up has finished.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+
+from config.settings import MODEL_CONFIG, WARMUP_CONFIG
+from utils.lazy import resolve
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class StartupWarmup:
+    """Runs the startup checks and builds the heavy singletons in parallel, once per process."""
+
+    def __init__(self, enabled: bool = None, preload_models: bool = None):
+        self.enabled = WARMUP_CONFIG.get("enabled", True) if enabled is None else enabled
+        self.preload_models = (
+            WARMUP_CONFIG.get("preload_models", True) if preload_models is None else preload_models
+        )
+        self.max_workers = WARMUP_CONFIG.get("max_workers", 4)
+        self.check_results: Optional[Dict[str, bool]] = None
+        self._tasks: Dict[str, Dict] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Tasks (each returns True on success)
+    # ------------------------------------------------------------------
+
+    def _run_startup_checks(self) -> bool:
+        """Ollama, MongoDB (indexes, seed services) and Chroma checks; builds the vector store."""
+        from core.initialization import ServiceInitializer
+
+        results, critical_passed = ServiceInitializer.run_all_checks(exit_on_failure=False)
+        self.check_results = results
+        return critical_passed
+
+    def _build_rag_engine(self) -> bool:
+        from core.rag_engine import rag_engine
+        return resolve(rag_engine).chain is not None
+
+    def _build_vector_operations(self) -> bool:
+        from core.vector_operations import vector_db_operations
+        resolve(vector_db_operations)
+        return True
+
+    def _load_models(self) -> bool:
+        """Load the chat and embedding models into Ollama memory so the first query skips the load."""
+        from core.vector_store import vector_store_manager
+
+        base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
+        timeout = WARMUP_CONFIG.get("model_load_timeout_seconds", 120)
+        # A generate request without a prompt only loads the model
+        response = requests.post(
+            f"{base_url}/api/generate",
+            json={"model": MODEL_CONFIG.get("chat_model", "llama3.1:latest")},
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        vector_store_manager.embeddings.embed_query("warm-up")
+        return True
+
+    def _task_list(self) -> Dict[str, Callable[[], bool]]:
+        tasks = {
+            "startup_checks": self._run_startup_checks,
+            "rag_engine": self._build_rag_engine,
+            "vector_operations": self._build_vector_operations,
+        }
+        if self.preload_models:
+            tasks["ollama_models"] = self._load_models
+        return tasks
+
+    def _run_task(self, name: str, task: Callable[[], bool]):
+        start = time.perf_counter()
+        error = None
+        try:
+            ok = bool(task())
+        except Exception as e:
+            ok = False
+            error = str(e)
+        duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        result = {"ok": ok, "duration_ms": duration_ms}
+        if error:
+            result["error"] = error
+        with self._lock:
+            self._tasks[name] = result
+        metrics.set_gauge("warmup_task_duration_ms", duration_ms, task=name)
+        if ok:
+            logger.info(f"✓ Warm-up {name} done in {duration_ms:.0f}ms")
+        else:
+            logger.warning(f"⚠ Warm-up {name} failed after {duration_ms:.0f}ms{f': {error}' if error else ''}")
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    def run(self):
+        """Run every warm-up task concurrently and wait for all of them."""
+        with self._lock:
+            self._started_at = time.time()
+        tasks = self._task_list()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="warmup") as pool:
+            for name, task in tasks.items():
+                pool.submit(self._run_task, name, task)
+        with self._lock:
+            self._finished_at = time.time()
+            duration = self._finished_at - self._started_at
+            failed = [name for name, result in self._tasks.items() if not result["ok"]]
+        metrics.set_gauge("startup_warmup_seconds", round(duration, 3))
+        self._done.set()
+        if failed:
+            logger.warning(f"⚠ Warm-up finished in {duration:.1f}s with failures: {', '.join(failed)}. "
+                           "App may have limited functionality.")
+        else:
+            logger.info(f"✓ Warm-up finished in {duration:.1f}s; all critical services initialized")
+
+    def start(self):
+        """Start the warm-up in a background thread (no-op if already started or disabled)."""
+        with self._lock:
+            if self._thread is not None or self._done.is_set():
+                return
+            if not self.enabled:
+                # Nothing to wait for: components are built on first use
+                self._done.set()
+                return
+            self._thread = threading.Thread(target=self.run, name="startup-warmup", daemon=True)
+        self._thread.start()
+        logger.info(f"Warm-up started ({', '.join(self._task_list())})")
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the warm-up has finished; False if timeout expired first."""
+        return self._done.wait(timeout)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def status(self) -> Dict:
+        with self._lock:
+            started_at, finished_at = self._started_at, self._finished_at
+            tasks = {name: dict(result) for name, result in self._tasks.items()}
+        end = finished_at or time.time()
+        return {
+            "enabled": self.enabled,
+            "done": self._done.is_set(),
+            "duration_ms": round((end - started_at) * 1000, 1) if started_at else None,
+            "tasks": tasks,
+            "checks": dict(self.check_results) if self.check_results is not None else None,
+        }
+
+
+# Global instance
+startup_warmup = StartupWarmup()
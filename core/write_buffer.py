@@ -0,0 +1,296 @@
+"""
+Write-behind buffer for audit logs and chat writes.
+
+When WRITE_BEHIND_CONFIG["enabled"] is set, log_action and the ChatService
+message/title writes are queued here and written by a background thread every
+flush_interval_ms with bulk_write, instead of one synchronous round trip each.
+
+- Bounded: at most max_pending writes are queued; a writer that finds the
+  queue full waits, then flushes in its own thread (back-pressure).
+- Ordered per chat: one flusher at a time writes the queue in FIFO order, and
+  a chat's messages get consecutive seqs from a single $inc.
+- Durable on shutdown: stop() (and an atexit hook) flush what is queued.
+- Retry-safe: log entries carry their _id and messages keep their allocated
+  seq, so a batch that failed part-way is retried without duplicates.
+- Bounded retries: while MongoDB is unreachable the whole queue is kept and
+  retried. A batch that fails for any other reason is written one op at a
+  time; an op that keeps failing is retried max_attempts times, then
+  appended to dead_letter_path and dropped, so it cannot hold up the rest.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure
+
+from config.settings import WRITE_BEHIND_CONFIG
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RETRY_BACKOFF_SECONDS = 1.0
+
+
+class WriteBehindBuffer:
+    """Bounded FIFO of pending log/chat writes, flushed in batches."""
+
+    def __init__(self, enabled: bool = None, flush_interval_ms: int = None, max_pending: int = None):
+        self.enabled = WRITE_BEHIND_CONFIG.get("enabled", False) if enabled is None else enabled
+        self.flush_interval = (flush_interval_ms or WRITE_BEHIND_CONFIG.get("flush_interval_ms", 200)) / 1000
+        self.max_pending = max_pending or WRITE_BEHIND_CONFIG.get("max_pending", 10000)
+        self.enqueue_timeout = WRITE_BEHIND_CONFIG.get("enqueue_timeout_seconds", 2.0)
+        self.max_attempts = WRITE_BEHIND_CONFIG.get("max_attempts", 3)
+        self.dead_letter_path = WRITE_BEHIND_CONFIG.get("dead_letter_path", "logs/write_behind_dead_letters.jsonl")
+
+        self._pending: List[Dict] = []
+        self._pending_chats: Dict[str, int] = {}  # chat_id -> queued writes
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._atexit_registered = False
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the background flusher (no-op when disabled or running)."""
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        if not self._atexit_registered:
+            atexit.register(self.stop)
+            self._atexit_registered = True
+        logger.info(f"✓ Write-behind buffer started (flush every {self.flush_interval * 1000:.0f}ms)")
+
+    def stop(self):
+        """Stop the flusher and write everything still queued."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        if self._pending:
+            self.flush()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait(self.flush_interval)
+            if not self._pending:
+                continue
+            if not self.flush():
+                self._stop.wait(RETRY_BACKOFF_SECONDS)
+
+    # ------------------------------------------------------------------
+    # Enqueue
+    # ------------------------------------------------------------------
+
+    def _enqueue(self, op: Dict) -> bool:
+        """Queue an operation. Returns False if the queue is full and MongoDB is failing."""
+        if not (self._thread and self._thread.is_alive()):
+            self.start()
+        deadline = time.monotonic() + self.enqueue_timeout
+        while True:
+            with self._cond:
+                if len(self._pending) < self.max_pending:
+                    self._pending.append(op)
+                    if op.get("chat_id"):
+                        self._pending_chats[op["chat_id"]] = self._pending_chats.get(op["chat_id"], 0) + 1
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+                    continue
+            # Still full: write the backlog from this thread, then retry
+            if not self.flush():
+                return False
+            deadline = time.monotonic() + self.enqueue_timeout
+
+    def add_log(self, entry: Dict) -> bool:
+        """Queue an audit log entry (same fields as logs documents)."""
+        return self._enqueue({"kind": "log", "entry": {**entry, "_id": ObjectId()}})
+
+    def add_message(self, chat_id: str, role: str, content: str) -> bool:
+        """Queue a chat message; its seq is allocated when the batch is written."""
+        return self._enqueue({
+            "kind": "message",
+            "chat_id": chat_id,
+            "message": {"chat_id": chat_id, "role": role, "content": content,
+                        "timestamp": datetime.now(timezone.utc)},
+        })
+
+    def set_title(self, chat_id: str, title: str) -> bool:
+        """Queue a chat title change."""
+        return self._enqueue({"kind": "title", "chat_id": chat_id, "title": title,
+                       "updated_at": datetime.now(timezone.utc)})
+
+    def has_pending_chat(self, chat_id: str) -> bool:
+        with self._cond:
+            return self._pending_chats.get(chat_id, 0) > 0
+
+    def flush_chat(self, chat_id: str):
+        """Flush if writes for chat_id are queued (read-your-writes before a Mongo read)."""
+        if self.has_pending_chat(chat_id):
+            self.flush()
+
+    # ------------------------------------------------------------------
+    # Flush
+    # ------------------------------------------------------------------
+
+    def flush(self) -> bool:
+        """
+        Write all queued operations. Returns False if writes had to be requeued
+        (MongoDB unreachable, or ops that failed but have attempts left).
+        """
+        with self._flush_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._cond.notify_all()
+            if not batch:
+                return True
+            try:
+                self._write(batch)
+                retry, dead = [], []
+            except ConnectionFailure as e:
+                self._requeue(batch)
+                logger.error(f"✗ Write-behind flush of {len(batch)} writes failed, MongoDB unreachable (will retry): {e}")
+                return False
+            except Exception as e:
+                logger.warning(f"⚠ Write-behind flush of {len(batch)} writes failed ({e}); writing them one by one")
+                retry, dead = self._write_each(batch)
+
+            if retry:
+                self._requeue(retry)
+            retrying = {id(op) for op in retry}
+            self._finished([op for op in batch if id(op) not in retrying])
+            self.flushed += len(batch) - len(retry) - len(dead)
+            return not retry
+
+    def _write_each(self, batch: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Write ops one at a time so a failing op does not block the others.
+        Returns (ops to retry, ops dead-lettered after max_attempts failures).
+        """
+        retry, dead = [], []
+        for i, op in enumerate(batch):
+            try:
+                self._write([op])
+            except ConnectionFailure as e:
+                logger.error(f"✗ Write-behind flush stopped, MongoDB unreachable (will retry): {e}")
+                retry.extend(batch[i:])
+                break
+            except Exception as e:
+                op["attempts"] = op.get("attempts", 0) + 1
+                if op["attempts"] < self.max_attempts:
+                    retry.append(op)
+                else:
+                    self._dead_letter(op, e)
+                    dead.append(op)
+        return retry, dead
+
+    def _requeue(self, ops: List[Dict]):
+        """Put ops back in front of the queue so per-chat order is kept on retry."""
+        with self._cond:
+            self._pending = ops + self._pending
+        self.failed_flushes += 1
+
+    def _finished(self, ops: List[Dict]):
+        """Ops written or dropped: they no longer count as pending for their chat."""
+        with self._cond:
+            for op in ops:
+                chat_id = op.get("chat_id")
+                if chat_id:
+                    count = self._pending_chats.get(chat_id, 0) - 1
+                    if count > 0:
+                        self._pending_chats[chat_id] = count
+                    else:
+                        self._pending_chats.pop(chat_id, None)
+
+    def _dead_letter(self, op: Dict, error: Exception):
+        """Append an op that failed max_attempts times to the dead-letter file and drop it."""
+        self.dead_lettered += 1
+        logger.error(f"✗ Write-behind {op['kind']} write failed {op['attempts']} times, dead-lettered: {error}")
+        record = {"failed_at": datetime.now(timezone.utc), "error": str(error), **op}
+        try:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+        except Exception as e:
+            logger.error(f"✗ Could not write dead letter to {self.dead_letter_path}: {e}")
+
+    @staticmethod
+    def _write(batch: List[Dict]):
+        from core.db_manager import (
+            chat_allocate_seqs,
+            chat_create,
+            chat_messages_upsert_bulk,
+            chat_update_titles_bulk,
+            log_actions_bulk,
+        )
+
+        # Messages: one $inc per chat reserves consecutive seqs in queue order
+        by_chat: Dict[str, List[Dict]] = {}
+        for op in batch:
+            if op["kind"] == "message":
+                by_chat.setdefault(op["chat_id"], []).append(op)
+        messages = []
+        for chat_id, ops in by_chat.items():
+            unassigned = [op for op in ops if "seq" not in op["message"]]
+            if unassigned:
+                last_timestamp = unassigned[-1]["message"]["timestamp"]
+                first = chat_allocate_seqs(chat_id, len(unassigned), last_timestamp)
+                from_user = any(op["message"]["role"] == "user" for op in unassigned)
+                if first is None and from_user and chat_create(chat_id, title="New Chat"):
+                    # Gone since the messages were queued (expired or deleted elsewhere):
+                    # recreated for the user's message, as ChatService._ensure_chat does
+                    logger.warning(f"⚠ Chat {chat_id} no longer existed; recreated for its queued messages")
+                    first = chat_allocate_seqs(chat_id, len(unassigned), last_timestamp)
+                if first is None:
+                    logger.warning(f"⚠ Dropping {len(unassigned)} queued messages for missing chat {chat_id}")
+                    for op in unassigned:
+                        op["dropped"] = True
+                    continue
+                for offset, op in enumerate(unassigned):
+                    op["message"]["seq"] = first + offset
+            messages.extend(op["message"] for op in ops if not op.get("dropped"))
+        chat_messages_upsert_bulk(messages)
+
+        # Titles: last write per chat wins
+        titles = {}
+        for op in batch:
+            if op["kind"] == "title":
+                titles[op["chat_id"]] = (op["title"], op["updated_at"])
+        chat_update_titles_bulk(titles)
+
+        log_actions_bulk([op["entry"] for op in batch if op["kind"] == "log"], raise_errors=True)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "max_pending": self.max_pending,
+                "flushed": self.flushed,
+                "failed_flushes": self.failed_flushes,
+                "dead_lettered": self.dead_lettered,
+            }
+
+
+# Global instance
+write_buffer = WriteBehindBuffer()
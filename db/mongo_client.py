@@ -1,7 +1,13 @@
 ﻿import os
+import threading
 from pymongo.mongo_client import MongoClient
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
 
+from config.settings import DATABASE_CONFIG
+from db.monitoring import event_listeners
+from utils.lazy import LazyInstance
+
 load_dotenv()
 
 # Use MONGODB_URI with local default, fallback to MONGO_URI if set
@@ -9,23 +15,70 @@ MONGO_URI = os.getenv("MONGODB_URI") or os.getenv("MONGO_URI") or "mongodb://loc
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "bsk_assistant")
 
 _mongo_client: MongoClient | None = None
+_async_mongo_client: AsyncMongoClient | None = None
+_client_lock = threading.Lock()
+
+def _client_options() -> dict:
+    """Connection pool, compression and monitoring settings shared by the sync and async clients."""
+    options = {
+        "serverSelectionTimeoutMS": DATABASE_CONFIG.get("server_selection_timeout_ms", 5000),
+        "maxPoolSize": DATABASE_CONFIG.get("max_pool_size", 100),
+        "minPoolSize": DATABASE_CONFIG.get("min_pool_size", 0),
+        "maxIdleTimeMS": DATABASE_CONFIG.get("max_idle_time_ms"),
+        "waitQueueTimeoutMS": DATABASE_CONFIG.get("wait_queue_timeout_ms"),
+        "event_listeners": event_listeners(),
+    }
+    if DATABASE_CONFIG.get("compressors"):
+        options["compressors"] = DATABASE_CONFIG["compressors"]
+    return options
 
 def get_mongo_client() -> MongoClient:
     """Get a shared MongoClient with sane defaults for local/remote MongoDB."""
     global _mongo_client
     if _mongo_client is None:
-        if not MONGO_URI:
-            raise ValueError("MONGODB_URI/MONGO_URI not found. Check your .env file.")
-        _mongo_client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        with _client_lock:
+            if _mongo_client is None:
+                if not MONGO_URI:
+                    raise ValueError("MONGODB_URI/MONGO_URI not found. Check your .env file.")
+                _mongo_client = MongoClient(MONGO_URI, **_client_options())
     return _mongo_client
 
+def get_async_mongo_client() -> AsyncMongoClient:
+    """
+    Get the shared asyncio client (pymongo's AsyncMongoClient) used by the API.
+    Created on first use, so it binds to the running event loop.
+    """
+    global _async_mongo_client
+    if _async_mongo_client is None:
+        with _client_lock:
+            if _async_mongo_client is None:
+                if not MONGO_URI:
+                    raise ValueError("MONGODB_URI/MONGO_URI not found. Check your .env file.")
+                _async_mongo_client = AsyncMongoClient(MONGO_URI, **_client_options())
+    return _async_mongo_client
+
+def get_async_db():
+    """Get the configured MongoDB database on the async client."""
+    return get_async_mongo_client()[MONGO_DB_NAME]
+
+async def close_async_mongo_client():
+    """Close the async client's pool (on API shutdown)."""
+    global _async_mongo_client
+    if _async_mongo_client is not None:
+        await _async_mongo_client.close()
+        _async_mongo_client = None
+
 def get_db():
     """Get the configured MongoDB database."""
     client = get_mongo_client()
     return client[MONGO_DB_NAME]
 
-db = get_db()
+def mongo_collection(name: str) -> LazyInstance:
+    """Module-level collection handle; the client is created on first use, not at import."""
+    return LazyInstance(lambda: get_db()[name], name=f"mongo:{name}")
+
+db = LazyInstance(get_db, name="mongo:db")
 
-services_collection = db["services"]
-documents_collection = db["documents"]
-logs_collection = db["logs"]
+services_collection = mongo_collection("services")
+documents_collection = mongo_collection("documents")
+logs_collection = mongo_collection("logs")
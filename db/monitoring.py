@@ -0,0 +1,150 @@
+"""
+pymongo monitoring listeners: per-command latency, pool checkout waits and a
+slow-query log. Registered on every client built by db.mongo_client and
+exposed through GET /api/v1/admin/metrics.
+
+Only command names, collections and filter field names are recorded, never
+filter values or documents.
+"""
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from pymongo import monitoring
+
+from config.settings import DATABASE_CONFIG
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# In-flight commands tracked for the slow-query log; cleared if it ever
+# grows past this (events for a dropped connection may never complete)
+MAX_IN_FLIGHT = 10000
+
+
+def _command_shape(command_name: str, command: Dict) -> Dict:
+    """Collection and filter field names of a command (no values)."""
+    collection = command.get(command_name)
+    shape = {"collection": collection if isinstance(collection, str) else None}
+    query = command.get("filter")
+    if query is None and command_name == "aggregate":
+        first = (command.get("pipeline") or [{}])[0]
+        query = first.get("$match")
+    if isinstance(query, dict):
+        shape["filter"] = sorted(query.keys())
+    return shape
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """Latency histogram per command, failure counts, slow-query log."""
+
+    def __init__(self, slow_ms: float = None, slow_log_size: int = 100):
+        self.slow_ms = slow_ms if slow_ms is not None else DATABASE_CONFIG.get("slow_query_ms", 100)
+        self.slow_queries = deque(maxlen=slow_log_size)
+        self._in_flight: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        shape = _command_shape(event.command_name, event.command)
+        with self._lock:
+            if len(self._in_flight) >= MAX_IN_FLIGHT:
+                self._in_flight.clear()
+            self._in_flight[event.request_id] = shape
+
+    def _finish(self, event, status: str):
+        with self._lock:
+            shape = self._in_flight.pop(event.request_id, None) or {}
+        elapsed_ms = event.duration_micros / 1000
+        metrics.observe("mongo_command_latency_ms", elapsed_ms, command=event.command_name)
+        if status == "failed":
+            metrics.inc("mongo_command_failures_total", command=event.command_name)
+        if elapsed_ms >= self.slow_ms:
+            entry = {
+                "at": datetime.now(timezone.utc).isoformat(),
+                "command": event.command_name,
+                "database": event.database_name,
+                "duration_ms": round(elapsed_ms, 3),
+                "status": status,
+                **shape,
+            }
+            self.slow_queries.append(entry)
+            metrics.inc("mongo_slow_commands_total", command=event.command_name)
+            logger.warning(
+                f"⚠ Slow MongoDB {event.command_name} on {shape.get('collection')}: "
+                f"{elapsed_ms:.1f}ms (filter fields: {shape.get('filter')})"
+            )
+
+    def succeeded(self, event):
+        self._finish(event, "succeeded")
+
+    def failed(self, event):
+        self._finish(event, "failed")
+
+    def recent_slow_queries(self) -> List[Dict]:
+        return list(self.slow_queries)
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Checkout wait times, checkout failures and connections in use."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        metrics.inc("mongo_pool_cleared_total")
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        metrics.add_gauge("mongo_pool_connections", 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        metrics.add_gauge("mongo_pool_connections", -1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        metrics.inc("mongo_pool_checkout_failures_total", reason=event.reason)
+
+    def connection_checked_out(self, event):
+        # duration: wait for a pooled connection (pymongo 4.7+)
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            metrics.observe("mongo_pool_checkout_wait_ms", duration * 1000)
+        metrics.add_gauge("mongo_pool_checked_out", 1)
+
+    def connection_checked_in(self, event):
+        metrics.add_gauge("mongo_pool_checked_out", -1)
+
+
+# Global instances
+command_listener = CommandMetricsListener()
+pool_listener = PoolMetricsListener()
+
+
+def event_listeners() -> list:
+    """Listeners for MongoClient(event_listeners=...), empty when monitoring is off."""
+    if not DATABASE_CONFIG.get("monitoring_enabled", True):
+        return []
+    return [command_listener, pool_listener]
+
+
+def mongo_metrics() -> Dict:
+    """Command latencies, pool stats and recent slow commands."""
+    snapshot = metrics.snapshot(prefix="mongo_")
+    return {
+        "monitoring_enabled": DATABASE_CONFIG.get("monitoring_enabled", True),
+        "slow_query_ms": command_listener.slow_ms,
+        **snapshot,
+        "slow_queries": command_listener.recent_slow_queries(),
+    }
@@ -1,17 +1,19 @@
 """
 Embedding models configuration using Ollama Nomic for local deployment
 """
-from langchain_community.embeddings import OllamaEmbeddings
 from config.settings import MODEL_CONFIG, EMBEDDING_MODEL
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def get_embeddings():
-    """Get embedding model instance using Ollama Nomic."""
+def get_embeddings(model: str = None):
+    """Get embedding model instance using Ollama Nomic (model defaults to EMBEDDING_MODEL)."""
     try:
+        # Imported here so importing this module stays cheap (see utils.lazy)
+        from langchain_community.embeddings import OllamaEmbeddings
+
         # --- Ollama Nomic embeddings pipeline (local, for Pinecone, RAG, etc.) ---
-        embedding_model = EMBEDDING_MODEL
+        embedding_model = model or EMBEDDING_MODEL
         ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
         
         embeddings = OllamaEmbeddings(
@@ -1,7 +1,6 @@
 """
 Language model configurations - Using Ollama for local deployment
 """
-from langchain_community.chat_models.ollama import ChatOllama
 from config.settings import MODEL_CONFIG
 from utils.logger import get_logger
 
@@ -10,6 +9,9 @@ logger = get_logger(__name__)
 def get_chat_model():
     """Get main chat model instance using Ollama Llama 3.1."""
     try:
+        # Imported here so importing this module stays cheap (see utils.lazy)
+        from langchain_community.chat_models.ollama import ChatOllama
+
         # --- Ollama Llama 3.1 integration ---
         chat_model = MODEL_CONFIG.get("chat_model", "llama3.1:latest")
         ollama_base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
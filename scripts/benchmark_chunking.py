@@ -0,0 +1,179 @@
+"""
+Chunking Benchmark
+Compares character and token chunking on a folder of PDFs: index size,
+ingest (embedding) time and retrieval hit rate on a labelled query set.
+
+Each mode is indexed into its own throwaway Chroma directory, so the live
+collection is never touched.
+
+Query file (JSONL), one object per line:
+    {"query": "Documents required for Lakshmir Bhandar?", "filename": "lakshmir_bhandar.pdf"}
+
+Usage:
+    python scripts/benchmark_chunking.py --pdf-dir document --queries queries.jsonl
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+from typing import Dict, List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+import chromadb
+from langchain.docstore.document import Document
+from langchain_community.document_loaders import PyMuPDFLoader
+from config.settings import CHUNKING_CONFIG, VECTOR_STORE_CONFIG
+from core.chunking import clean_pdf_text, merge_page_texts, get_text_splitter, get_token_counter
+from models.embeddings import get_embeddings
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+EMBED_BATCH_SIZE = 32
+
+
+def load_pdfs(pdf_dir: str) -> List[Document]:
+    """Load and clean every PDF in a folder as one merged document each."""
+    documents = []
+    for name in sorted(os.listdir(pdf_dir)):
+        if not name.lower().endswith(".pdf"):
+            continue
+        pages = PyMuPDFLoader(os.path.join(pdf_dir, name)).load()
+        text = merge_page_texts([clean_pdf_text(page.page_content) for page in pages])
+        if text:
+            documents.append(Document(page_content=text, metadata={"source": name, "filename": name}))
+    return documents
+
+
+def load_queries(path: str) -> List[Dict]:
+    """Load labelled queries from a JSONL file."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of all files under a directory."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def benchmark_mode(mode: str, documents: List[Document], queries: List[Dict], embeddings, k: int) -> Dict:
+    """Chunk, embed and query one chunking mode in a temporary Chroma store."""
+    splitter = get_text_splitter(mode)
+    count_tokens = get_token_counter()
+    max_tokens = CHUNKING_CONFIG.get("max_embed_tokens", 512)
+
+    start = time.perf_counter()
+    chunks = splitter.split_documents([Document(page_content=d.page_content, metadata=dict(d.metadata))
+                                       for d in documents])
+    split_seconds = time.perf_counter() - start
+
+    persist_dir = tempfile.mkdtemp(prefix=f"chunk_bench_{mode}_")
+    try:
+        client = chromadb.PersistentClient(path=persist_dir)
+        collection = client.create_collection(name=f"bench_{mode}", metadata={"hnsw:space": "cosine"})
+
+        start = time.perf_counter()
+        for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[i:i + EMBED_BATCH_SIZE]
+            texts = [chunk.page_content for chunk in batch]
+            collection.add(
+                ids=[f"{mode}_{i + j}" for j in range(len(batch))],
+                documents=texts,
+                embeddings=embeddings.embed_documents(texts),
+                metadatas=[{"filename": chunk.metadata.get("filename", "")} for chunk in batch]
+            )
+        ingest_seconds = time.perf_counter() - start
+
+        hits = 0
+        reciprocal_rank = 0.0
+        for item in queries:
+            results = collection.query(
+                query_embeddings=[embeddings.embed_query(item["query"])],
+                n_results=min(k, len(chunks)),
+                include=["metadatas"]
+            )
+            filenames = [meta.get("filename") for meta in (results.get("metadatas") or [[]])[0]]
+            if item["filename"] in filenames:
+                hits += 1
+                reciprocal_rank += 1.0 / (filenames.index(item["filename"]) + 1)
+
+        index_bytes = directory_size(persist_dir)
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+    token_counts = [count_tokens(chunk.page_content) for chunk in chunks] if count_tokens else []
+    return {
+        "mode": mode,
+        "chunks": len(chunks),
+        "avg_chars": sum(len(c.page_content) for c in chunks) / len(chunks) if chunks else 0,
+        "avg_tokens": sum(token_counts) / len(token_counts) if token_counts else None,
+        "max_tokens": max(token_counts) if token_counts else None,
+        "over_limit": sum(1 for t in token_counts if t > max_tokens) if token_counts else None,
+        "index_mb": index_bytes / (1024 * 1024),
+        "split_s": split_seconds,
+        "ingest_s": ingest_seconds,
+        "hit_rate": hits / len(queries) if queries else None,
+        "mrr": reciprocal_rank / len(queries) if queries else None,
+    }
+
+
+def print_report(results: List[Dict], k: int):
+    """Print a side-by-side comparison table."""
+    def fmt(value, spec):
+        return "n/a" if value is None else format(value, spec)
+
+    rows = [
+        ("Chunks", "chunks", "d"),
+        ("Avg chars/chunk", "avg_chars", ".0f"),
+        ("Avg tokens/chunk", "avg_tokens", ".0f"),
+        ("Max tokens/chunk", "max_tokens", "d"),
+        (f"Chunks > {CHUNKING_CONFIG.get('max_embed_tokens', 512)} tokens", "over_limit", "d"),
+        ("Index size (MB)", "index_mb", ".2f"),
+        ("Split time (s)", "split_s", ".2f"),
+        ("Ingest time (s)", "ingest_s", ".2f"),
+        (f"Hit rate @{k}", "hit_rate", ".1%"),
+        (f"MRR @{k}", "mrr", ".3f"),
+    ]
+    print("=" * 60)
+    print(f"{'Metric':<28}" + "".join(f"{r['mode']:>16}" for r in results))
+    print("-" * 60)
+    for label, key, spec in rows:
+        print(f"{label:<28}" + "".join(f"{fmt(r[key], spec):>16}" for r in results))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare character and token chunking")
+    parser.add_argument("--pdf-dir", default="document", help="Folder of PDFs to index")
+    parser.add_argument("--queries", required=True, help="JSONL file of {query, filename} pairs")
+    parser.add_argument("--k", type=int, default=VECTOR_STORE_CONFIG.get("k", 6), help="Results per query")
+    parser.add_argument("--modes", nargs="+", default=["char", "token"], help="Chunking modes to compare")
+
+    args = parser.parse_args()
+
+    documents = load_pdfs(args.pdf_dir)
+    if not documents:
+        logger.error(f"No readable PDFs found in {args.pdf_dir}")
+        sys.exit(1)
+    queries = load_queries(args.queries)
+    logger.info(f"Benchmarking {len(documents)} documents, {len(queries)} queries")
+
+    embeddings = get_embeddings()
+    results = [benchmark_mode(mode, documents, queries, embeddings, args.k) for mode in args.modes]
+    print_report(results, args.k)
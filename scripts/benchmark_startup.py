@@ -0,0 +1,168 @@
+"""
+Startup Benchmark
+Measures cold-start time of the API and the Streamlit app, each in a fresh
+process per run:
+
+- import:    time to import api.main / the Streamlit pages (no server)
+- api:       uvicorn start -> /api/v1/health/live answers (serving), and
+             -> /api/v1/health/ready answers 200 (warm-up done, dependencies up)
+- streamlit: `streamlit run` start -> /_stcore/health answers (serving), and
+             a headless first run of app.py (streamlit.testing AppTest) -> rendered
+
+Ollama, MongoDB and Chroma should be set up as for normal use; otherwise
+"ready" is never reached and is reported as a timeout.
+
+Usage:
+    python scripts/benchmark_startup.py --runs 5
+    python scripts/benchmark_startup.py --targets api --port 8100
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+from typing import Dict, List, Optional
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POLL_INTERVAL = 0.05
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start)"
+)
+STREAMLIT_RENDER_SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "from streamlit.testing.v1 import AppTest; "
+    "at = AppTest.from_file('app.py', default_timeout={timeout}); at.run(); "
+    "print(time.perf_counter() - start if not at.exception else -1)"
+)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _wait_for(url: str, started: float, timeout: float, process: subprocess.Popen) -> Optional[float]:
+    """Seconds from started until url answers 200 (None on timeout or if the process exits)."""
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return time.perf_counter() - started
+        except requests.RequestException:
+            pass
+        time.sleep(POLL_INTERVAL)
+    return None
+
+
+def _stop(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def measure_import(module: str) -> Optional[float]:
+    """Seconds to import module in a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"import {module} failed")
+        return None
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure_api(port: int, timeout: float) -> Dict[str, Optional[float]]:
+    """Seconds until the API is live and until it is ready."""
+    base = f"http://127.0.0.1:{port}/api/v1"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        live = _wait_for(f"{base}/health/live", started, timeout, process)
+        ready = _wait_for(f"{base}/health/ready", started, timeout, process) if live is not None else None
+        warmup = None
+        if ready is not None:
+            warmup_ms = requests.get(f"{base}/health/ready", timeout=5).json().get("warmup", {}).get("duration_ms")
+            warmup = warmup_ms / 1000 if warmup_ms is not None else None
+        return {"api_live": live, "api_ready": ready, "api_warmup": warmup}
+    finally:
+        _stop(process)
+
+
+def measure_streamlit(port: int, timeout: float) -> Dict[str, Optional[float]]:
+    """Seconds until the Streamlit server answers, and for a headless first run of app.py."""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", "app.py", "--server.headless", "true",
+         "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=ROOT, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        serving = _wait_for(f"http://127.0.0.1:{port}/_stcore/health", started, timeout, process)
+    finally:
+        _stop(process)
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", STREAMLIT_RENDER_SNIPPET.format(timeout=timeout)],
+        cwd=ROOT, env=_env(), capture_output=True, text=True
+    )
+    rendered = None
+    if result.returncode == 0 and float(result.stdout.strip().splitlines()[-1]) >= 0:
+        rendered = time.perf_counter() - started
+    return {"streamlit_serving": serving, "streamlit_first_render": rendered}
+
+
+def print_report(samples: Dict[str, List[Optional[float]]]):
+    """Median/min/max seconds per measurement; timeouts are counted, not averaged."""
+    print("=" * 72)
+    print(f"{'Measurement':<26}{'median s':>10}{'min s':>10}{'max s':>10}{'failed':>10}")
+    print("-" * 72)
+    for name, values in samples.items():
+        ok = [v for v in values if v is not None]
+        failed = len(values) - len(ok)
+        if ok:
+            print(f"{name:<26}{statistics.median(ok):>10.2f}{min(ok):>10.2f}{max(ok):>10.2f}{failed:>10}")
+        else:
+            print(f"{name:<26}{'-':>10}{'-':>10}{'-':>10}{failed:>10}")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure API and Streamlit time-to-ready")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts per target")
+    parser.add_argument("--targets", nargs="+", default=["import", "api", "streamlit"],
+                        choices=["import", "api", "streamlit"], help="What to measure")
+    parser.add_argument("--port", type=int, default=8100, help="API port (Streamlit uses port + 1)")
+    parser.add_argument("--timeout", type=float, default=180, help="Seconds to wait for each milestone")
+
+    args = parser.parse_args()
+
+    samples: Dict[str, List[Optional[float]]] = {}
+    for run in range(1, args.runs + 1):
+        print(f"Run {run}/{args.runs}...")
+        measured: Dict[str, Optional[float]] = {}
+        if "import" in args.targets:
+            measured["import_api"] = measure_import("api.main")
+            measured["import_streamlit_pages"] = measure_import("ui.pages.chatbot")
+        if "api" in args.targets:
+            measured.update(measure_api(args.port, args.timeout))
+        if "streamlit" in args.targets:
+            measured.update(measure_streamlit(args.port + 1, args.timeout))
+        for name, value in measured.items():
+            samples.setdefault(name, []).append(value)
+
+    print_report(samples)
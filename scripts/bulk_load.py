@@ -0,0 +1,260 @@
+"""
+Bulk Initial Load
+Loads a manifest of PDFs (thousands at a time, e.g. when onboarding a new
+district) into Chroma and MongoDB.
+
+Manifest: CSV with a header row, or JSONL, with these fields per file:
+    path, department, service, document_type
+Relative paths are resolved against the manifest's folder.
+
+PDFs are parsed, embedded and upserted in parallel. Document, service and log
+records are written to MongoDB in bulk every --flush-every files, together with
+a per-file checkpoint (bulk_load_items), so rerunning the same command after a
+crash continues where it stopped.
+
+Usage:
+    python scripts/bulk_load.py manifests/district_a.csv --workers 4
+    python scripts/bulk_load.py manifests/district_a.csv --restart   # ignore checkpoints
+"""
+import os
+import sys
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Set
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+# Load environment variables
+load_dotenv()
+
+from core.db_manager import (
+    add_documents_bulk,
+    upsert_services_bulk,
+    log_actions_bulk,
+    get_all_filenames,
+    bulk_load_done_paths,
+    bulk_load_checkpoint,
+    bulk_load_summary,
+    bulk_load_reset,
+)
+from core.vector_store import vector_store_manager
+from core.vector_operations import vector_db_operations
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+FIELD_ALIASES = {
+    "file": "path",
+    "file_path": "path",
+    "doc_type": "document_type",
+    "document type": "document_type",
+    "type": "document_type",
+}
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """Read manifest entries from a CSV or JSONL file."""
+    base_dir = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    entries = []
+    for row in rows:
+        item = {}
+        for key, value in row.items():
+            key = (key or "").strip().lower()
+            item[FIELD_ALIASES.get(key, key)] = (value or "").strip() if isinstance(value, str) else value
+        if not item.get("path"):
+            continue
+        if not os.path.isabs(item["path"]):
+            item["path"] = os.path.normpath(os.path.join(base_dir, item["path"]))
+        item["filename"] = item.get("filename") or os.path.basename(item["path"])
+        entries.append(item)
+    return entries
+
+
+def load_file(item: Dict, in_chroma: Set[str]) -> Dict:
+    """Parse, embed and upsert one PDF (no MongoDB document writes)."""
+    filename = item["filename"]
+    if not os.path.isfile(item["path"]):
+        return {"status": "error", "message": "file not found"}
+
+    if filename in in_chroma:
+        # Indexed by a run that crashed before its Mongo flush: diff against
+        # what is stored (unchanged chunks are not re-embedded) to get chunk_ids
+        result = vector_db_operations.replace_pdf_path_in_vectorstore(item["path"], filename)
+    else:
+        result = vector_db_operations.add_pdf_path_to_vectorstore(
+            item["path"],
+            filename,
+            item.get("department", ""),
+            item.get("service", ""),
+            item.get("document_type", "")
+        )
+    if not result.get("success"):
+        return {"status": "error", "message": result.get("message", "indexing failed")}
+    return {"status": "loaded", **result}
+
+
+class BulkLoader:
+    """Runs a manifest through the vector store and writes MongoDB records in bulk."""
+
+    def __init__(self, load_id: str, workers: int = 4, flush_every: int = 50):
+        self.load_id = load_id
+        self.workers = max(1, workers)
+        self.flush_every = max(1, flush_every)
+        self.counts = {"loaded": 0, "skipped": 0, "error": 0}
+        self.pages = 0
+        self.chunks = 0
+        self.embedded = 0
+        self._documents, self._services, self._logs, self._checkpoints = [], [], [], []
+
+    def run(self, entries: List[Dict]) -> bool:
+        if not vector_store_manager.is_available():
+            logger.error("Chroma vector store is not available")
+            return False
+
+        done = bulk_load_done_paths(self.load_id)
+        existing = get_all_filenames()
+        in_chroma = set(vector_db_operations.list_documents()) - existing
+
+        pending, seen = [], set()
+        for item in entries:
+            if item["path"] in done:
+                self.counts["skipped"] += 1
+            elif item["filename"] in existing or item["filename"] in seen:
+                # Same filename already stored (or twice in this manifest)
+                self._checkpoints.append(self._checkpoint(item, "skipped", message="filename already exists"))
+                self.counts["skipped"] += 1
+            else:
+                seen.add(item["filename"])
+                pending.append(item)
+        if done:
+            logger.info(f"Resuming load '{self.load_id}': {len(done)} files already done")
+        logger.info(f"Loading {len(pending)} of {len(entries)} manifest entries with {self.workers} workers")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-load") as executor:
+            futures = {executor.submit(load_file, item, in_chroma): item for item in pending}
+            with tqdm(total=len(futures), desc="Loading", unit="file") as progress:
+                for future in as_completed(futures):
+                    item = futures[future]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = {"status": "error", "message": str(e)}
+                    self._record(item, outcome)
+
+                    if len(self._checkpoints) >= self.flush_every:
+                        self.flush()
+                    elapsed = time.perf_counter() - start
+                    progress.set_postfix(
+                        pages_s=f"{self.pages / elapsed:.1f}" if elapsed else "0",
+                        chunks_s=f"{self.chunks / elapsed:.1f}" if elapsed else "0",
+                        errors=self.counts["error"]
+                    )
+                    progress.update(1)
+        self.flush()
+        elapsed = time.perf_counter() - start
+
+        # Parallel workers can race on chunks shared between documents
+        fixed = vector_db_operations.reconcile_owners() if self.counts["loaded"] else 0
+        if fixed:
+            logger.info(f"Reconciled owners on {fixed} shared chunks")
+        vector_store_manager.persist()
+
+        self._report(elapsed)
+        return self.counts["error"] == 0
+
+    def _checkpoint(self, item: Dict, status: str, **fields) -> Dict:
+        return {"path": item["path"], "filename": item["filename"], "status": status, **fields}
+
+    def _record(self, item: Dict, outcome: Dict):
+        status = outcome["status"]
+        self.counts[status] += 1
+        if status == "error":
+            logger.error(f"✗ {item['filename']}: {outcome.get('message')}")
+            self._checkpoints.append(self._checkpoint(item, "error", message=outcome.get("message")))
+            return
+
+        chunk_ids = outcome.get("chroma_ids") or []
+        self.pages += outcome.get("pages", 0)
+        self.chunks += len(chunk_ids)
+        self.embedded += outcome.get("chunks_added", 0)
+
+        department = item.get("department", "")
+        service = item.get("service", "")
+        document_type = item.get("document_type", "")
+        record = {
+            "filename": item["filename"],
+            "department": department,
+            "service": service,
+            "document_type": document_type,
+            "chunk_ids": chunk_ids,
+        }
+        for key in ("file_hash", "duplicate_of", "dedup_stats"):
+            if outcome.get(key):
+                record[key] = outcome[key]
+        self._documents.append(record)
+        self._services.append((department, service))
+        self._logs.append({
+            "department": department,
+            "service": service,
+            "document_name": item["filename"],
+            "document_type": document_type,
+            "action": "upload"
+        })
+        self._checkpoints.append(self._checkpoint(
+            item, "loaded", pages=outcome.get("pages", 0), chunks=len(chunk_ids)
+        ))
+
+    def flush(self):
+        """Write buffered MongoDB records, checkpoints last."""
+        add_documents_bulk(self._documents)
+        upsert_services_bulk(self._services, "Active")
+        log_actions_bulk(self._logs)
+        bulk_load_checkpoint(self.load_id, self._checkpoints)
+        self._documents, self._services, self._logs, self._checkpoints = [], [], [], []
+
+    def _report(self, elapsed: float):
+        rate = (lambda n: n / elapsed if elapsed else 0.0)
+        logger.info("=" * 60)
+        logger.info(f"Bulk Load '{self.load_id}' Complete ({elapsed:.1f}s):")
+        logger.info(f"  Loaded: {self.counts['loaded']}")
+        logger.info(f"  Skipped: {self.counts['skipped']}")
+        logger.info(f"  Errors: {self.counts['error']}")
+        logger.info(f"  Pages: {self.pages} ({rate(self.pages):.1f} pages/s)")
+        logger.info(f"  Chunks: {self.chunks} ({rate(self.chunks):.1f} chunks/s, {self.embedded} embedded)")
+        logger.info(f"  Checkpoints: {bulk_load_summary(self.load_id)}")
+        logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-load PDFs listed in a CSV/JSONL manifest")
+    parser.add_argument("manifest", help="CSV or JSONL with path, department, service, document_type")
+    parser.add_argument("--load-id", help="Checkpoint key (defaults to the manifest file name)")
+    parser.add_argument("--workers", type=int, default=4, help="Files parsed and embedded in parallel")
+    parser.add_argument("--flush-every", type=int, default=50, help="Files per bulk MongoDB write")
+    parser.add_argument("--restart", action="store_true", help="Discard checkpoints of a previous run")
+
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest)
+    if not entries:
+        logger.error(f"No entries found in {args.manifest}")
+        sys.exit(1)
+
+    load_id = args.load_id or os.path.splitext(os.path.basename(args.manifest))[0]
+    if args.restart:
+        bulk_load_reset(load_id)
+
+    loader = BulkLoader(load_id, workers=args.workers, flush_every=args.flush_every)
+    success = loader.run(entries)
+    sys.exit(0 if success else 1)
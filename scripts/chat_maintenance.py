@@ -0,0 +1,50 @@
+"""
+Chat Maintenance
+Keeps chat_history small: removes stale empty chats and archives chats that
+have been inactive for CHAT_ARCHIVE_AFTER_DAYS (see RETENTION_CONFIG).
+
+Run from cron, or set CHAT_MAINTENANCE_ENABLED=true to schedule it inside the API.
+
+Usage:
+    python scripts/chat_maintenance.py
+    python scripts/chat_maintenance.py --days 30 --target jsonl
+    python scripts/chat_maintenance.py --dry-run
+"""
+import sys
+import json
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from core.db_manager import initialize_collections
+from services.chat_retention import chat_retention
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Expire empty chats and archive inactive ones")
+    parser.add_argument("--days", type=int, default=None, help="Archive chats inactive for this many days")
+    parser.add_argument("--target", choices=["mongo", "jsonl"], default=None, help="Archive destination")
+    parser.add_argument("--dry-run", action="store_true", help="Only count chats that would be archived")
+
+    args = parser.parse_args()
+
+    # Also (re)creates the empty-chat TTL index with the configured expiry
+    initialize_collections()
+
+    if args.dry_run:
+        result = chat_retention.archive_inactive(days=args.days, target=args.target, dry_run=True)
+        print(f"Chats that would be archived: {result['archived']}")
+        sys.exit(0 if result["success"] else 1)
+
+    if args.days is not None or args.target:
+        result = {"archive": chat_retention.archive_inactive(days=args.days, target=args.target)}
+    else:
+        result = chat_retention.run_maintenance()
+    print(json.dumps(result, indent=2, default=str))
+    sys.exit(0 if result["archive"]["success"] else 1)
@@ -0,0 +1,80 @@
+"""
+Move Chat Messages to Their Own Collection
+Copies the messages embedded in chat_history documents into chat_messages
+(one document per message, unique on chat_id + seq), sets message_count and
+removes the embedded array. Chats are also migrated one at a time when they
+next receive a message; this script moves the rest in one pass.
+
+Messages are renumbered 1..n in their stored order, which also repairs
+duplicate seq values written by the old read-then-push append. The copy is
+an idempotent upsert, so an interrupted run can simply be started again.
+
+Usage:
+    python scripts/migrate_chat_messages.py
+    python scripts/migrate_chat_messages.py --dry-run
+"""
+import sys
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+# Load environment variables
+load_dotenv()
+
+from core.db_manager import chat_history_collection, chat_move_messages, initialize_collections
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def migrate_chat(chat: dict) -> int:
+    """Move one chat's embedded messages. Returns the number of messages moved."""
+    return chat_move_messages(chat)
+
+
+def migrate_chat_messages(dry_run: bool = False) -> bool:
+    """Move every chat that still has an embedded messages array."""
+    try:
+        initialize_collections()
+        query = {"messages": {"$exists": True}}
+        total = chat_history_collection.count_documents(query)
+        if not total:
+            logger.info("No chats with embedded messages; nothing to migrate")
+            return True
+        logger.info(f"Found {total} chats with embedded messages")
+        if dry_run:
+            return True
+
+        moved = 0
+        errors = 0
+        with tqdm(total=total, desc="Migrating chats", unit="chat") as progress:
+            for chat in chat_history_collection.find(query, {"chat_id": 1, "messages": 1}):
+                try:
+                    moved += migrate_chat(chat)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"✗ Chat {chat.get('chat_id')}: {e}")
+                progress.update(1)
+
+        logger.info("=" * 60)
+        logger.info("Chat Message Migration Complete:")
+        logger.info(f"  Chats: {total}")
+        logger.info(f"  Messages moved: {moved}")
+        logger.info(f"  Errors: {errors}")
+        logger.info("=" * 60)
+        return errors == 0
+
+    except Exception as e:
+        logger.error(f"Chat message migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move embedded chat messages into the chat_messages collection")
+    parser.add_argument("--dry-run", action="store_true", help="Only count chats that need migrating")
+
+    args = parser.parse_args()
+
+    success = migrate_chat_messages(dry_run=args.dry_run)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,162 @@
+"""
+Collection Migration Tool
+Re-embeds the knowledge base into a shadow Chroma collection (new embedding
+model and/or chunking) while the current collection keeps serving queries,
+then switches over atomically.
+
+Typical run:
+    python scripts/migrate_collection.py start --model nomic-embed-text:latest
+    python scripts/migrate_collection.py build            # resumable, rate-limited
+    python scripts/migrate_collection.py compare --queries queries.txt
+    python scripts/migrate_collection.py switch
+    python scripts/migrate_collection.py gc --yes
+
+Re-chunking (--rechunk) splits the stored page text with the current
+CHUNK_MODE/CHUNK_SIZE settings, so set those in the environment of the
+start/build/switch commands.
+"""
+import sys
+import json
+from dotenv import load_dotenv
+from tqdm import tqdm
+
+# Load environment variables
+load_dotenv()
+
+from config.settings import MIGRATION_CONFIG
+from core.db_manager import migration_get, migration_get_active
+from core.vector_store import vector_store_manager
+from core.collection_migration import collection_migrator
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _load_queries(path: str):
+    """One query per line (plain text), or JSONL objects with a "query" field."""
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            queries.append(json.loads(line)["query"] if line.startswith("{") else line)
+    return queries
+
+
+def _target(args) -> str:
+    if args.target:
+        return args.target
+    active = migration_get_active()
+    if not active:
+        logger.error("No migration in progress (start one or pass --target)")
+        sys.exit(1)
+    return active["target"]
+
+
+def cmd_start(args):
+    migration = collection_migrator.start(args.model, rechunk=args.rechunk, target=args.target)
+    print(f"Shadow collection: {migration['target']}")
+
+
+def cmd_build(args):
+    target = _target(args)
+    with tqdm(desc=f"Building {target}", unit="doc") as progress:
+        def report(done, total):
+            progress.total = total
+            progress.n = done
+            progress.refresh()
+        counts = collection_migrator.build(target, progress=report)
+    print(json.dumps(counts, indent=2))
+    return counts["errors"] == 0
+
+
+def cmd_status(args):
+    migration = migration_get(args.target) if args.target else migration_get_active()
+    print(f"Active collection: {vector_store_manager.collection_name} ({vector_store_manager.embedding_model})")
+    if not migration:
+        print("No migration in progress.")
+        return True
+    if not args.verbose:
+        migration.pop("comparison", None)
+    print(json.dumps(migration, indent=2, default=str))
+    return True
+
+
+def cmd_compare(args):
+    report = collection_migrator.compare(_target(args), _load_queries(args.queries), k=args.k)
+    if not args.verbose:
+        report.pop("per_query", None)
+    print(json.dumps(report, indent=2))
+    return True
+
+
+def cmd_switch(args):
+    result = collection_migrator.switch(_target(args), force=args.force)
+    print(result["message"])
+    return result["success"]
+
+
+def cmd_abort(args):
+    return collection_migrator.abort(_target(args))
+
+
+def cmd_gc(args):
+    names = collection_migrator.garbage_collect(dry_run=not args.yes, drop_previous=args.drop_previous)
+    if not names:
+        print("Nothing to collect.")
+    for name in names:
+        print(f"{'Dropped' if args.yes else 'Would drop'}: {name}")
+    if not args.drop_previous:
+        existing = set(vector_store_manager.list_collections())
+        for name, until in collection_migrator.retained_previous().items():
+            if name in existing and name != vector_store_manager.collection_name:
+                print(f"Keeping rollback target {name} until {until:%Y-%m-%d %H:%M} UTC (--drop-previous to drop it)")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Zero-downtime Chroma collection migration")
+    parser.add_argument("--target", help="Shadow collection name (defaults to the running migration)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    start = subparsers.add_parser("start", help="Create a shadow collection")
+    start.add_argument("--model", required=True, help="Embedding model for the new collection")
+    start.add_argument("--rechunk", action="store_true", help="Re-split stored text with current chunk settings")
+    start.set_defaults(func=cmd_start)
+
+    build = subparsers.add_parser(
+        "build",
+        help=f"Embed all documents into the shadow ({MIGRATION_CONFIG.get('embed_rate_per_sec')} chunks/s, MIGRATION_EMBED_RATE)"
+    )
+    build.set_defaults(func=cmd_build)
+
+    status = subparsers.add_parser("status", help="Show active collection and migration state")
+    status.add_argument("--verbose", action="store_true")
+    status.set_defaults(func=cmd_status)
+
+    compare = subparsers.add_parser("compare", help="Compare retrieval overlap on sample queries")
+    compare.add_argument("--queries", required=True, help="Text file (one query per line) or JSONL with 'query'")
+    compare.add_argument("--k", type=int, default=None, help="Results per query")
+    compare.add_argument("--verbose", action="store_true", help="Show per-query overlap")
+    compare.set_defaults(func=cmd_compare)
+
+    switch = subparsers.add_parser("switch", help="Atomically make the shadow collection active")
+    switch.add_argument("--force", action="store_true", help="Switch without a passing comparison")
+    switch.set_defaults(func=cmd_switch)
+
+    abort = subparsers.add_parser("abort", help="Cancel the migration and drop the shadow collection")
+    abort.set_defaults(func=cmd_abort)
+
+    gc = subparsers.add_parser("gc", help="Drop collections no longer in use")
+    gc.add_argument("--yes", action="store_true", help="Actually drop (default is a dry run)")
+    gc.add_argument("--drop-previous", action="store_true",
+                    help="Also drop collections replaced by a switch within the rollback retention period")
+    gc.set_defaults(func=cmd_gc)
+
+    args = parser.parse_args()
+
+    success = args.func(args)
+    sys.exit(0 if success is not False else 1)
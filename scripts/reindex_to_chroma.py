@@ -1,132 +1,173 @@
 """
 Reindex Documents from MongoDB to Chroma
-Populates the Chroma vector store from existing MongoDB documents
+Rebuilds the Chroma vector store from the page text saved at ingestion
+(document_texts), so the original PDFs are not needed.
+
+Documents are indexed in parallel. Completed documents are appended to a
+checkpoint file, and documents whose recorded chunks are already in Chroma
+are skipped, so an interrupted run can simply be started again.
 """
 import os
 import sys
-from typing import List, Dict
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Set
 from dotenv import load_dotenv
-from db.mongo_client import get_db
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.docstore.document import Document
-from datetime import datetime
+from tqdm import tqdm
 
 # Load environment variables
 load_dotenv()
 
 # Import after loading env
+from core.db_manager import documents_collection, load_document_text
 from core.vector_store import vector_store_manager
+from core.vector_operations import vector_db_operations
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-def reindex_chroma(skip_existing: bool = True):
+DEFAULT_CHECKPOINT = "logs/reindex_checkpoint.jsonl"
+
+_checkpoint_lock = threading.Lock()
+
+
+def _load_checkpoint(path: str) -> Set[str]:
+    """Filenames completed by a previous run."""
+    done = set()
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                if entry.get("status") in ("reindexed", "skipped"):
+                    done.add(entry["filename"])
+    return done
+
+
+def _write_checkpoint(path: str, filename: str, status: str):
+    """Append a completed document to the checkpoint file."""
+    if not path:
+        return
+    with _checkpoint_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"filename": filename, "status": status}) + "\n")
+
+
+def _is_indexed(doc: Dict) -> bool:
+    """True when every chunk recorded for the document is present in Chroma."""
+    chunk_ids = doc.get("chunk_ids") or []
+    if not chunk_ids:
+        return False
+    found = vector_store_manager.get_chunks(ids=chunk_ids)
+    return len(found["ids"]) == len(set(chunk_ids))
+
+
+def _reindex_document(doc: Dict, skip_existing: bool) -> Dict:
+    """Rebuild one document's chunks from its stored text."""
+    filename = doc.get("filename") or doc.get("pdf_name", "unknown")
+
+    if skip_existing and _is_indexed(doc):
+        return {"filename": filename, "status": "skipped"}
+
+    file_hash = doc.get("file_hash") or ""
+    pages = load_document_text(file_hash)
+    if not pages and doc.get("text_content"):
+        # Records written by older versions kept the whole text inline
+        pages = [doc["text_content"]]
+    if not pages:
+        return {"filename": filename, "status": "error", "message": "no stored text (re-upload the PDF)"}
+
+    result = vector_db_operations.add_text_pages_to_vectorstore(
+        filename,
+        pages,
+        file_hash,
+        doc.get("department", ""),
+        doc.get("service", ""),
+        doc.get("document_type", "")
+    )
+    if not result.get("success"):
+        return {"filename": filename, "status": "error", "message": result.get("message", "indexing failed")}
+
+    # Chunk IDs change when chunking settings changed since ingestion
+    chunk_ids = result.get("chroma_ids", [])
+    if chunk_ids != (doc.get("chunk_ids") or []):
+        documents_collection.update_one({"_id": doc["_id"]}, {"$set": {"chunk_ids": chunk_ids}})
+
+    return {"filename": filename, "status": "reindexed", "chunks": len(chunk_ids)}
+
+
+def reindex_chroma(skip_existing: bool = True, workers: int = 4, checkpoint: str = DEFAULT_CHECKPOINT,
+                   resume: bool = False):
     """
     Reindex all documents from MongoDB into Chroma.
     
     Args:
-        skip_existing: If True, skip documents already in Chroma
+        skip_existing: If True, skip documents whose chunks are already in Chroma
+        workers: Number of documents indexed in parallel
+        checkpoint: File recording completed documents
+        resume: If True, skip documents completed in a previous run's checkpoint
     """
     try:
-        # Connect to MongoDB
-        mongo_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        db_name = os.getenv("MONGO_DB_NAME", "bsk_assistant")
-        
-        logger.info(f"Connecting to MongoDB: {mongo_uri}")
-        db = get_db()
-        documents_collection = db["documents"]
-        
-        # Get all documents from MongoDB
-        active_docs = list(documents_collection.find({}))
+        if not vector_store_manager.is_available():
+            logger.error("Chroma vector store is not available")
+            return False
+
+        # Get all documents from MongoDB
+        active_docs = list(documents_collection.find({}, {"dedup_stats": 0}))
         
         if not active_docs:
             logger.warning("No active documents found in MongoDB")
             return True
         
         logger.info(f"Found {len(active_docs)} active documents in MongoDB")
+
+        if checkpoint:
+            os.makedirs(os.path.dirname(checkpoint) or ".", exist_ok=True)
+            if not resume and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+        completed = _load_checkpoint(checkpoint) if resume else set()
+        pending = [d for d in active_docs if (d.get("filename") or d.get("pdf_name", "unknown")) not in completed]
+        if completed:
+            logger.info(f"Resuming: {len(active_docs) - len(pending)} documents already done")
         
-        # Get list of documents already in Chroma
-        existing_files = set(vector_store_manager.get_all_filenames()) if skip_existing else set()
-        
-        # Initialize text splitter
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=int(os.getenv("CHUNK_SIZE", 1000)),
-            chunk_overlap=int(os.getenv("CHUNK_OVERLAP", 350))
-        )
-        
-        # Process each document
-        reindexed_count = 0
-        skipped_count = 0
-        error_count = 0
+        counts = {"reindexed": 0, "skipped": len(active_docs) - len(pending), "error": 0}
         
-        for doc in active_docs:
-            filename = doc.get("filename") or doc.get("pdf_name", "unknown")
-            
-            # Skip if already exists
-            if skip_existing and filename in existing_files:
-                logger.info(f"⊘ Skipping (already in Chroma): {filename}")
-                skipped_count += 1
-                continue
-            
-            try:
-                # For now, we assume the full text is stored or available
-                # In a real scenario, you might need to fetch from original file
-                text_content = doc.get("text_content", "")
-                
-                if not text_content:
-                    logger.warning(f"⚠ No text content for: {filename}")
-                    error_count += 1
-                    continue
-                
-                # Create document
-                doc_obj = Document(
-                    page_content=text_content,
-                    metadata={
-                        "filename": filename,
-                        "department": doc.get("department", ""),
-                        "service": doc.get("service", ""),
-                        "document_type": doc.get("document_type", ""),
-                        "status": "Active",
-                        "date_time": doc.get("created_at", datetime.now()).isoformat()
-                    }
-                )
-                
-                # Split into chunks
-                chunks = text_splitter.split_documents([doc_obj])
-                
-                if not chunks:
-                    logger.warning(f"⚠ No chunks created for: {filename}")
-                    error_count += 1
-                    continue
-                
-                # Create chunk IDs
-                chunk_ids = [f"{filename}_{i+1}" for i in range(len(chunks))]
-                
-                # Add to Chroma
-                success = vector_store_manager.add_documents(chunks, ids=chunk_ids)
-                
-                if success:
-                    logger.info(f"✓ Reindexed: {filename} ({len(chunks)} chunks)")
-                    reindexed_count += 1
-                else:
-                    logger.error(f"✗ Failed to add chunks for: {filename}")
-                    error_count += 1
-                    
-            except Exception as e:
-                logger.error(f"✗ Error processing {filename}: {e}")
-                error_count += 1
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(_reindex_document, doc, skip_existing): doc for doc in pending}
+            with tqdm(total=len(futures), desc="Reindexing", unit="doc") as progress:
+                for future in as_completed(futures):
+                    doc = futures[future]
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        outcome = {"filename": doc.get("filename", "unknown"), "status": "error", "message": str(e)}
+
+                    counts[outcome["status"]] += 1
+                    if outcome["status"] == "error":
+                        logger.error(f"✗ {outcome['filename']}: {outcome.get('message')}")
+                    else:
+                        _write_checkpoint(checkpoint, outcome["filename"], outcome["status"])
+                    progress.set_postfix(counts)
+                    progress.update(1)
+
+        fixed = vector_db_operations.reconcile_owners()
+        if fixed:
+            logger.info(f"Reconciled owners on {fixed} shared chunks")
         
         # Persist Chroma
         vector_store_manager.persist()
         
         logger.info("=" * 60)
         logger.info("Reindexing Complete:")
-        logger.info(f"  Reindexed: {reindexed_count}")
-        logger.info(f"  Skipped: {skipped_count}")
-        logger.info(f"  Errors: {error_count}")
+        logger.info(f"  Reindexed: {counts['reindexed']}")
+        logger.info(f"  Skipped: {counts['skipped']}")
+        logger.info(f"  Errors: {counts['error']}")
         logger.info("=" * 60)
         
-        return True
+        return counts["error"] == 0
         
     except Exception as e:
         logger.error(f"Reindexing failed: {e}")
@@ -137,8 +178,16 @@ if __name__ == "__main__":
     
     parser = argparse.ArgumentParser(description="Reindex documents from MongoDB to Chroma")
     parser.add_argument("--replace", action="store_true", help="Replace existing documents (don't skip)")
+    parser.add_argument("--workers", type=int, default=4, help="Documents indexed in parallel")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Checkpoint file for resuming")
+    parser.add_argument("--resume", action="store_true", help="Skip documents completed by the previous run")
     
     args = parser.parse_args()
     
-    success = reindex_chroma(skip_existing=not args.replace)
+    success = reindex_chroma(
+        skip_existing=not args.replace,
+        workers=args.workers,
+        checkpoint=args.checkpoint,
+        resume=args.resume
+    )
     sys.exit(0 if success else 1)
@@ -0,0 +1,56 @@
+"""
+Watch-Folder Ingestion Daemon
+Adds new PDFs and updates changed ones as they appear in the watch directory.
+
+Layout:
+    <directory>/<Department>/<Service>/[<Document Type>/]<file>.pdf
+
+Usage:
+    python scripts/watch_documents.py                      # WATCH_DIRECTORY or ./documents
+    python scripts/watch_documents.py --directory /srv/bsk-docs --workers 4
+    python scripts/watch_documents.py --once               # ingest what is there and exit
+"""
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from config.settings import WATCH_CONFIG
+from services.folder_watcher import FolderWatcher
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingest PDFs dropped into a watch folder")
+    parser.add_argument("--directory", default=WATCH_CONFIG.get("directory"), help="Folder to watch")
+    parser.add_argument("--debounce", type=float, default=WATCH_CONFIG.get("debounce_seconds"),
+                        help="Seconds a file must be quiet before ingesting")
+    parser.add_argument("--batch-size", type=int, default=WATCH_CONFIG.get("batch_size"), help="Files per batch")
+    parser.add_argument("--workers", type=int, default=WATCH_CONFIG.get("workers"), help="Files ingested in parallel")
+    parser.add_argument("--once", action="store_true", help="Ingest existing files and exit")
+
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.directory, args.debounce, args.batch_size, args.workers)
+
+    if args.once:
+        watcher.debounce_seconds = 0
+        watcher.run_once()
+        sys.exit(0)
+
+    if not watcher.start():
+        sys.exit(1)
+
+    try:
+        while watcher.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping folder watcher...")
+    finally:
+        watcher.stop()
@@ -0,0 +1,179 @@
+"""
+In-process cache of recently active chat sessions.
+
+Holds each chat's record (title, message_count, timestamps) and the tail of
+its history, so a chat turn needs no MongoDB reads once the chat is warm.
+The cache is write-through: ChatService writes to MongoDB first and then
+updates the cached entry (with WRITE_BEHIND_ENABLED the write is queued in
+core.write_buffer instead, and the cache is updated right away). Entries are bounded by LRU size and evicted after
+an idle TTL.
+
+Other processes write to the same chats, so the cache is not trusted blindly:
+a cached tail is checked against the stored message_count before it is used
+(validate), and an append that finds the chat gone evicts it.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+
+from config.settings import CHAT_CACHE_CONFIG, MEMORY_CONFIG
+
+
+class ChatSessionCache:
+    """Thread-safe LRU + idle-TTL cache of chat records and history tails."""
+
+    def __init__(self, max_sessions: int = None, idle_ttl_seconds: float = None, tail_size: int = None):
+        self.max_sessions = max_sessions or CHAT_CACHE_CONFIG.get("max_sessions", 1024)
+        self.idle_ttl_seconds = idle_ttl_seconds or CHAT_CACHE_CONFIG.get("idle_ttl_seconds", 1800)
+        self.tail_size = tail_size or MEMORY_CONFIG.get("window_size", 6) * 2
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Live entry for chat_id (moved to most recent), or None. Caller holds the lock."""
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry["last_access"] > self.idle_ttl_seconds:
+            del self._entries[chat_id]
+            return None
+        entry["last_access"] = now
+        self._entries.move_to_end(chat_id)
+        return entry
+
+    def _store(self, chat_id: str, chat: Dict[str, Any], tail: Optional[List[Dict]] = None):
+        """Insert or replace an entry and enforce the size bound. Caller holds the lock."""
+        self._entries[chat_id] = {
+            "chat": dict(chat),
+            "tail": deque(tail, maxlen=self.tail_size) if tail is not None else None,
+            "last_access": time.monotonic(),
+        }
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_sessions:
+            self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get_chat(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Cached chat record (copy), or None on a miss."""
+        with self._lock:
+            entry = self._entry(chat_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(entry["chat"])
+
+    def get_tail(self, chat_id: str, limit: int) -> Optional[List[Dict]]:
+        """Last `limit` cached messages, or None when the cache cannot answer."""
+        with self._lock:
+            entry = self._entry(chat_id)
+            if entry is None or entry["tail"] is None or limit > self.tail_size:
+                self.misses += 1
+                return None
+            self.hits += 1
+            tail = list(entry["tail"])
+            return [dict(m) for m in tail[-limit:]] if limit > 0 else []
+
+    # ------------------------------------------------------------------
+    # Write-through updates
+    # ------------------------------------------------------------------
+
+    def put_chat(self, chat: Dict[str, Any], tail: Optional[List[Dict]] = None):
+        """Cache a chat record read from (or just written to) MongoDB."""
+        with self._lock:
+            entry = self._entry(chat["chat_id"])
+            if entry is not None and tail is None:
+                entry["chat"] = dict(chat)
+                return
+            self._store(chat["chat_id"], chat, tail)
+
+    def put_tail(self, chat_id: str, messages: List[Dict]):
+        """Cache the history tail of an already cached chat (last tail_size messages)."""
+        with self._lock:
+            entry = self._entry(chat_id)
+            if entry is not None:
+                entry["tail"] = deque(messages, maxlen=self.tail_size)
+
+    def record_message(self, chat: Dict[str, Any], message: Dict[str, Any]):
+        """
+        Apply an appended message. `chat` is the record returned by the append
+        (its message_count is the new message's seq). If another writer added
+        messages the cache did not see, the stale tail is dropped.
+        """
+        chat_id = chat["chat_id"]
+        seq = chat.get("message_count")
+        with self._lock:
+            entry = self._entry(chat_id)
+            if entry is None:
+                self._store(chat_id, chat)
+                return
+            previous = entry["chat"].get("message_count")
+            entry["chat"] = dict(chat)
+            if entry["tail"] is None:
+                return
+            if previous is None or seq != previous + 1:
+                entry["tail"] = None
+                return
+            entry["tail"].append({"seq": seq, "role": message.get("role"), "content": message.get("content", "")})
+
+    def validate(self, chat_id: str, stored_count: Optional[int]) -> bool:
+        """
+        Check a cached entry against the chat's message_count in MongoDB (None
+        if the chat is gone). Returns True if the cached tail is current. A
+        chat that no longer exists is evicted; one that another process wrote
+        to keeps its record, updated to the stored count, but loses its tail.
+        """
+        with self._lock:
+            entry = self._entries.get(chat_id)
+            if entry is None:
+                return False
+            if stored_count is None:
+                del self._entries[chat_id]
+                return False
+            if entry["chat"].get("message_count") == stored_count:
+                return True
+            entry["chat"]["message_count"] = stored_count
+            entry["tail"] = None
+            return False
+
+    def set_title(self, chat_id: str, title: str):
+        with self._lock:
+            entry = self._entry(chat_id)
+            if entry is not None:
+                entry["chat"]["title"] = title
+
+    def evict(self, chat_id: str):
+        with self._lock:
+            self._entries.pop(chat_id, None)
+
+    def evict_empty(self):
+        """Drop cached chats that have no messages (after bulk deletion of empty chats)."""
+        with self._lock:
+            for chat_id in [cid for cid, e in self._entries.items() if not e["chat"].get("message_count")]:
+                del self._entries[chat_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "sessions": len(self._entries),
+                "max_sessions": self.max_sessions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Global instance
+chat_session_cache = ChatSessionCache()
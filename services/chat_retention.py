@@ -0,0 +1,164 @@
+"""
+Chat retention: keeps chat_history small.
+
+- Chats that never received a message expire through a TTL index on
+  last_active_at (created in core.db_manager.initialize_collections);
+  opening a chat refreshes it.
+- Chats inactive for RETENTION_CONFIG["archive_after_days"] are moved in
+  batches to a compressed archive: the chat_archive collection ("mongo") or
+  gzipped JSONL files ("jsonl"), then deleted from the hot collections.
+- A background maintenance thread runs this every interval_hours.
+"""
+import os
+import gzip
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from config.settings import RETENTION_CONFIG
+from core.db_manager import (
+    chat_find_inactive,
+    chat_count_inactive,
+    chat_archive_insert,
+    chat_archive_delete,
+    chat_delete_many,
+    chat_delete_empty,
+)
+from services.chat_cache import chat_session_cache
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def _json_default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class ChatRetention:
+    """Archives inactive chats and runs periodic maintenance."""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_run: Optional[Dict] = None
+
+    def archive_inactive(self, days: int = None, target: str = None, dry_run: bool = False) -> Dict:
+        """
+        Move chats not updated for `days` days to the archive.
+
+        Returns:
+            Dict with success, archived count, target and (for jsonl) file path
+        """
+        days = days if days is not None else RETENTION_CONFIG.get("archive_after_days", 90)
+        target = target or RETENTION_CONFIG.get("archive_target", "mongo")
+        batch_size = RETENTION_CONFIG.get("batch_size", 500)
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        if target not in ("mongo", "jsonl"):
+            return {"success": False, "message": f"Unknown archive target: {target}", "archived": 0}
+
+        archived = 0
+        path = None
+        try:
+            while True:
+                if dry_run:
+                    archived = chat_count_inactive(cutoff)
+                    break
+                chats = chat_find_inactive(cutoff, limit=batch_size)
+                if not chats:
+                    break
+
+                if target == "jsonl":
+                    path = path or self._archive_path()
+                    self._write_jsonl(path, chats)
+                else:
+                    chat_archive_insert(chats)
+
+                # Delete only after the archive write succeeded, and only chats
+                # that are still inactive (a message may have arrived meanwhile)
+                chat_ids = [c["chat_id"] for c in chats]
+                deleted = chat_delete_many(chat_ids, updated_before=cutoff)
+                survivors = set(chat_ids) - set(deleted)
+                if survivors and target == "mongo":
+                    # Still in chat_history; drop the copies just archived
+                    chat_archive_delete(list(survivors))
+                for chat_id in deleted:
+                    chat_session_cache.evict(chat_id)
+                archived += len(deleted)
+
+            if archived and not dry_run:
+                logger.info(f"✓ Archived {archived} chats inactive for {days}+ days ({target})")
+            return {"success": True, "archived": archived, "target": target, "path": path, "dry_run": dry_run}
+
+        except Exception as e:
+            logger.error(f"Error archiving chats: {e}")
+            return {"success": False, "message": str(e), "archived": archived, "target": target, "path": path}
+
+    def _archive_path(self) -> str:
+        directory = RETENTION_CONFIG.get("archive_dir", "./archive/chats")
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        return os.path.join(directory, f"chats-{stamp}.jsonl.gz")
+
+    @staticmethod
+    def _write_jsonl(path: str, chats: List[Dict]):
+        """Append chats to a gzipped JSONL file and flush it to disk."""
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for chat in chats:
+                f.write(json.dumps(chat, ensure_ascii=False, default=_json_default) + "\n")
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+
+    def run_maintenance(self) -> Dict:
+        """One maintenance pass: purge stale empty chats, archive inactive ones."""
+        ttl_hours = RETENTION_CONFIG.get("empty_chat_ttl_hours", 24)
+        result = {"started_at": datetime.now(timezone.utc).isoformat()}
+        try:
+            # The TTL index normally removes these; this also covers chats
+            # without a last_active_at date (ignored by TTL)
+            result["empty_deleted"] = chat_delete_empty(
+                older_than=datetime.now(timezone.utc) - timedelta(hours=ttl_hours)
+            )
+            chat_session_cache.evict_empty()
+        except Exception as e:
+            logger.error(f"Error deleting empty chats: {e}")
+            result["empty_deleted"] = 0
+        result["archive"] = self.archive_inactive()
+        result["finished_at"] = datetime.now(timezone.utc).isoformat()
+        self.last_run = result
+        return result
+
+    # ------------------------------------------------------------------
+    # Scheduler
+    # ------------------------------------------------------------------
+
+    def start(self, interval_hours: float = None):
+        """Run maintenance now and then every interval_hours in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        interval = (interval_hours or RETENTION_CONFIG.get("interval_hours", 6)) * 3600
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_maintenance()
+                except Exception as e:
+                    logger.error(f"Chat maintenance failed: {e}")
+                self._stop.wait(interval)
+
+        self._thread = threading.Thread(target=loop, name="chat-maintenance", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Chat maintenance scheduled every {interval / 3600:g}h")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+
+# Global instance
+chat_retention = ChatRetention()
@@ -1,9 +1,12 @@
 """
 Enhanced Chat service for managing chat operations with UUID-based chat IDs.
-Storage: MongoDB (chat_history collection).
+Storage: MongoDB (chat_history for chat records, chat_messages for messages),
+with a write-through in-memory cache of active sessions (services/chat_cache.py).
+Async variants (a-prefixed) serve the async API routes through core.async_db_manager.
 """
+import asyncio
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 
 from core.db_manager import (
@@ -12,13 +15,37 @@ from core.db_manager import (
     chat_update_title,
     chat_append_message,
     chat_get_messages,
+    chat_get_messages_page,
+    chat_get_recent_messages,
     chat_delete,
     chat_get_all,
+    chat_list_summaries,
+    chat_delete_empty,
+    chat_touch,
+    chat_get_message_count,
 )
+from core import async_db_manager
+from config.settings import MEMORY_CONFIG, RETENTION_CONFIG
+from core.write_buffer import write_buffer
+from services.chat_cache import chat_session_cache
 from utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Refresh last_active_at of an open empty chat at most this often (well under the empty-chat TTL)
+EMPTY_CHAT_TOUCH_SECONDS = min(3600, RETENTION_CONFIG.get("empty_chat_ttl_hours", 24) * 3600 / 4)
+
+
+def _needs_touch(chat: Dict[str, Any]) -> bool:
+    """Whether an empty chat's last_active_at is old enough to refresh."""
+    if chat.get("message_count"):
+        return False
+    try:
+        last_active = datetime.fromisoformat(chat["last_active_at"])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return (datetime.now(timezone.utc) - last_active).total_seconds() > EMPTY_CHAT_TOUCH_SECONDS
+
 
 class ChatService:
     """Service for managing chat operations with UUID-based IDs (MongoDB backend)."""
@@ -34,6 +61,15 @@ class ChatService:
             if not chat_create(new_chat_id, title="New Chat"):
                 logger.error("Failed to create chat in MongoDB")
                 return str(uuid.uuid4())
+            now = datetime.now(timezone.utc).isoformat()
+            chat_session_cache.put_chat({
+                "chat_id": new_chat_id,
+                "created_at": now,
+                "updated_at": now,
+                "last_active_at": now,
+                "title": "New Chat",
+                "message_count": 0,
+            }, tail=[])
             logger.info(f"Created new chat with UUID: {new_chat_id}")
             return new_chat_id
         except Exception as e:
@@ -41,21 +77,39 @@ class ChatService:
             return str(uuid.uuid4())
 
     def get_chat_by_id(self, chat_id: str) -> Optional[Dict[str, Any]]:
-        """Get a specific chat by its ID."""
+        """Get a specific chat by its ID (record only, no messages)."""
         try:
-            return chat_get_by_id(chat_id)
+            chat = chat_session_cache.get_chat(chat_id)
+            if chat is None:
+                write_buffer.flush_chat(chat_id)
+                chat = chat_get_by_id(chat_id)
+                if chat:
+                    chat_session_cache.put_chat(chat)
+            if chat and _needs_touch(chat) and chat_touch(chat_id):
+                self._touched(chat)
+            return chat
         except Exception as e:
             logger.error(f"Error getting chat {chat_id}: {e}")
             return None
 
+    @staticmethod
+    def _touched(chat: Dict[str, Any]):
+        """An open empty chat was kept alive: remember when, so it is not refreshed on every read."""
+        chat["last_active_at"] = datetime.now(timezone.utc).isoformat()
+        chat_session_cache.put_chat(chat)
+
     def update_chat_title(self, chat_id: str, first_message: str) -> bool:
         """Update chat title based on first user message."""
         try:
             title = first_message.strip()
             if len(title) > 30:
                 title = title[:27] + "..."
-            ok = chat_update_title(chat_id, title)
+            if write_buffer.enabled:
+                ok = write_buffer.set_title(chat_id, title)
+            else:
+                ok = chat_update_title(chat_id, title)
             if ok:
+                chat_session_cache.set_title(chat_id, title)
                 logger.info(f"Updated chat {chat_id} title: {title}")
             return ok
         except Exception as e:
@@ -65,26 +119,120 @@ class ChatService:
     def save_message_to_chat(self, chat_id: str, role: str, content: str) -> bool:
         """Save a message to the specified chat."""
         try:
-            ok = chat_append_message(chat_id, role, content)
-            if ok:
-                logger.info(f"Saved message to chat {chat_id}")
-            return ok
+            if not self._ensure_chat(chat_id, role):
+                logger.warning(f"Chat {chat_id} no longer exists; message not saved")
+                return False
+            if write_buffer.enabled:
+                return self._queue_message(chat_id, role, content)
+            chat = chat_append_message(chat_id, role, content)
+            if not chat:
+                chat = self._append_to_missing_chat(chat_id, role, content)
+            if not chat:
+                return False
+            chat_session_cache.record_message(chat, {"role": role, "content": content})
+            logger.info(f"Saved message to chat {chat_id}")
+            return True
         except Exception as e:
             logger.error(f"Error saving message to chat {chat_id}: {e}")
             return False
 
+    def _ensure_chat(self, chat_id: str, role: str) -> bool:
+        """
+        Check that a chat exists before writing to it. Reading it also keeps
+        an open empty chat from expiring (see get_chat_by_id). A chat that
+        expired (or was deleted by another process) is recreated under the
+        same id when the user writes to it; replies to a chat that is gone
+        are dropped.
+        """
+        if self.get_chat_by_id(chat_id):
+            return True
+        if role != "user" or not chat_create(chat_id, title="New Chat"):
+            return False
+        logger.warning(f"Chat {chat_id} no longer existed; recreated")
+        return self.get_chat_by_id(chat_id) is not None
+
+    def _append_to_missing_chat(self, chat_id: str, role: str, content: str) -> Optional[Dict[str, Any]]:
+        """
+        The append found no chat although _ensure_chat did (from the cache):
+        it was deleted or expired in MongoDB meanwhile. Drop the stale cache
+        entry, recreate the chat as _ensure_chat does, and append once more.
+        """
+        chat_session_cache.evict(chat_id)
+        if not self._ensure_chat(chat_id, role):
+            return None
+        return chat_append_message(chat_id, role, content)
+
+    def _queue_message(self, chat_id: str, role: str, content: str) -> bool:
+        """
+        Write-behind path: queue the message and update the cached chat as if
+        the write had happened (seq = cached message_count + 1).
+        """
+        chat = self.get_chat_by_id(chat_id)
+        if not chat or not write_buffer.add_message(chat_id, role, content):
+            return False
+        chat["message_count"] = (chat.get("message_count") or 0) + 1
+        chat["updated_at"] = datetime.now(timezone.utc).isoformat()
+        chat_session_cache.record_message(chat, {"role": role, "content": content})
+        logger.info(f"Queued message for chat {chat_id}")
+        return True
+
     def get_chat_messages(self, chat_id: str) -> List[Dict[str, Any]]:
         """Get all messages from a specific chat."""
         try:
+            write_buffer.flush_chat(chat_id)
             return chat_get_messages(chat_id)
         except Exception as e:
             logger.error(f"Error getting messages for chat {chat_id}: {e}")
             return []
 
+    def get_recent_messages(self, chat_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Get only the last messages of a chat (role, content, seq), oldest first.
+        Defaults to the memory window: MEMORY_CONFIG["window_size"] turns.
+        """
+        if limit is None:
+            limit = MEMORY_CONFIG.get("window_size", 6) * 2
+        try:
+            messages = chat_session_cache.get_tail(chat_id, limit)
+            if messages is not None and self._tail_is_current(chat_id):
+                return messages
+            write_buffer.flush_chat(chat_id)
+            if limit > chat_session_cache.tail_size:
+                return chat_get_recent_messages(chat_id, limit)
+            messages = chat_get_recent_messages(chat_id, chat_session_cache.tail_size)
+            chat_session_cache.put_tail(chat_id, messages)
+            return messages[-limit:] if limit > 0 else []
+        except Exception as e:
+            logger.error(f"Error getting recent messages for chat {chat_id}: {e}")
+            return []
+
+    @staticmethod
+    def _tail_is_current(chat_id: str) -> bool:
+        """
+        Whether the cached tail still matches MongoDB: another process may have
+        appended to the chat or deleted it. While this process has queued
+        write-behind messages for the chat the cache is ahead of MongoDB, so
+        it is used as is.
+        """
+        if write_buffer.has_pending_chat(chat_id):
+            return True
+        return chat_session_cache.validate(chat_id, chat_get_message_count(chat_id))
+
+    def get_chat_messages_page(self, chat_id: str, after_seq: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Get one page of messages after the given seq cursor."""
+        try:
+            write_buffer.flush_chat(chat_id)
+            return chat_get_messages_page(chat_id, after_seq=after_seq, limit=limit)
+        except Exception as e:
+            logger.error(f"Error getting messages for chat {chat_id}: {e}")
+            return {"messages": [], "next_cursor": None}
+
     def delete_chat(self, chat_id: str) -> bool:
         """Delete a specific chat from history."""
         try:
+            write_buffer.flush_chat(chat_id)
             ok = chat_delete(chat_id)
+            chat_session_cache.evict(chat_id)
             if ok:
                 logger.info(f"Deleted chat {chat_id}")
             return ok
@@ -92,6 +240,63 @@ class ChatService:
             logger.error(f"Error deleting chat {chat_id}: {e}")
             return False
 
+    # ------------------------------------------------------------------
+    # Async variants (API routes)
+    # ------------------------------------------------------------------
+
+    async def _aflush_chat(self, chat_id: str):
+        """Write queued writes of this chat before reading it (off the event loop)."""
+        if write_buffer.has_pending_chat(chat_id):
+            await asyncio.to_thread(write_buffer.flush_chat, chat_id)
+
+    async def aget_chat_by_id(self, chat_id: str) -> Optional[Dict[str, Any]]:
+        """Async get_chat_by_id (cache first, then MongoDB)."""
+        try:
+            chat = chat_session_cache.get_chat(chat_id)
+            if chat is None:
+                await self._aflush_chat(chat_id)
+                chat = await async_db_manager.chat_get_by_id(chat_id)
+                if chat:
+                    chat_session_cache.put_chat(chat)
+            if chat and _needs_touch(chat) and await async_db_manager.chat_touch(chat_id):
+                self._touched(chat)
+            return chat
+        except Exception as e:
+            logger.error(f"Error getting chat {chat_id}: {e}")
+            return None
+
+    async def aget_chat_messages_page(self, chat_id: str, after_seq: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Async get_chat_messages_page."""
+        try:
+            await self._aflush_chat(chat_id)
+            return await async_db_manager.chat_get_messages_page(chat_id, after_seq=after_seq, limit=limit)
+        except Exception as e:
+            logger.error(f"Error getting messages for chat {chat_id}: {e}")
+            return {"messages": [], "next_cursor": None}
+
+    async def adelete_chat(self, chat_id: str) -> bool:
+        """Async delete_chat."""
+        try:
+            await self._aflush_chat(chat_id)
+            ok = await async_db_manager.chat_delete(chat_id)
+            chat_session_cache.evict(chat_id)
+            if ok:
+                logger.info(f"Deleted chat {chat_id}")
+            return ok
+        except Exception as e:
+            logger.error(f"Error deleting chat {chat_id}: {e}")
+            return False
+
+    async def alist_chat_summaries(self, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Async list_chat_summaries (ValueError on a malformed cursor)."""
+        try:
+            return await async_db_manager.chat_list_summaries(limit=limit, cursor=cursor)
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error listing chats: {e}")
+            return {"chats": [], "next_cursor": None}
+
     def get_all_chats(self) -> Dict[str, Any]:
         """Get all chats, sorted by last updated. Returns dict keyed by chat_id for compatibility."""
         try:
@@ -101,34 +306,44 @@ class ChatService:
             logger.error(f"Error getting all chats: {e}")
             return {}
 
+    def list_chat_summaries(self, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get one page of chat summaries (chat_id, title, updated_at, message_count),
+        most recently updated first. Pass next_cursor to get the following page.
+        """
+        try:
+            return chat_list_summaries(limit=limit, cursor=cursor)
+        except ValueError:
+            # Malformed cursor: let the caller report it
+            raise
+        except Exception as e:
+            logger.error(f"Error listing chats: {e}")
+            return {"chats": [], "next_cursor": None}
+
     def get_chat_summary(self, chat_id: str) -> Dict[str, Any]:
         """Get summary information about a chat."""
         try:
-            chat = chat_get_by_id(chat_id)
+            chat = self.get_chat_by_id(chat_id)
             if not chat:
                 return {}
-            messages = chat.get("messages", [])
+            message_count = chat.get("message_count") or 0
             return {
                 "id": chat_id,
                 "title": chat.get("title", "Untitled Chat"),
                 "created_at": chat.get("created_at"),
                 "updated_at": chat.get("updated_at"),
-                "message_count": chat.get("message_count", len(messages)),
-                "has_messages": len(messages) > 0,
+                "message_count": message_count,
+                "has_messages": message_count > 0,
             }
         except Exception as e:
             logger.error(f"Error getting chat summary for {chat_id}: {e}")
             return {}
 
     def cleanup_empty_chats(self) -> int:
-        """Remove chats that have no messages."""
-        try:
-            docs = chat_get_all(sort_by_updated=False)
-            removed = 0
-            for d in docs:
-                if (d.get("message_count") or 0) == 0:
-                    if chat_delete(d["chat_id"]):
-                        removed += 1
+        """Remove chats that have no messages (one delete_many)."""
+        try:
+            removed = chat_delete_empty()
+            chat_session_cache.evict_empty()
             if removed:
                 logger.info(f"Cleaned up {removed} empty chats")
             return removed
@@ -0,0 +1,175 @@
+"""
+Document ingestion service: one place for the vector store + MongoDB steps
+of adding or updating a PDF from disk (used by the folder watcher and bulk loads).
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from core.vector_operations import vector_db_operations
+from core.vector_store import vector_store_manager
+from core.db_manager import (
+    add_document,
+    find_document,
+    update_document_content,
+    upsert_service,
+    log_action,
+)
+from utils.hashing import file_sha256
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DocumentService:
+    """Service for ingesting PDFs from local disk (Chroma + MongoDB)."""
+
+    def ingest_file(self, file_path: str, filename: Optional[str] = None, department: str = "",
+                    service: str = "", document_type: str = "") -> Dict:
+        """
+        Add a PDF, or update it in place when a document with the same filename
+        exists. Files whose content hash matches the stored version are skipped.
+
+        Returns:
+            Dict with success, status ('added', 'updated', 'unchanged', 'conflict'
+            or 'failed'), message and chunk counts
+        """
+        filename = filename or os.path.basename(file_path)
+        try:
+            existing = find_document(filename)
+            if existing:
+                return self._update_existing(file_path, filename, existing, department, service)
+
+            result = vector_db_operations.add_pdf_path_to_vectorstore(
+                file_path, filename, department, service, document_type
+            )
+            if not result.get("success"):
+                return {"success": False, "status": "failed", "filename": filename,
+                        "message": result.get("message", "Upload failed")}
+
+            add_document(
+                filename,
+                department,
+                service,
+                document_type,
+                file_hash=result.get("file_hash"),
+                chunk_ids=result.get("chroma_ids"),
+                duplicate_of=result.get("duplicate_of"),
+                dedup_stats=result.get("dedup_stats"),
+            )
+            if department and service:
+                upsert_service(department, service, "Active")
+            log_action(department or "Unassigned", service or "Unassigned", filename, document_type or "Unknown", "upload")
+            return {
+                "success": True,
+                "status": "added",
+                "filename": filename,
+                "message": result.get("message", ""),
+                "chunks_added": result.get("chunks_added", 0),
+                "chunks_linked": result.get("chunks_linked", 0),
+                "chunk_ids": result.get("chroma_ids", []),
+            }
+
+        except Exception as e:
+            logger.error(f"Error ingesting {file_path}: {e}")
+            return {"success": False, "status": "failed", "filename": filename, "message": str(e)}
+
+    def _update_existing(self, file_path: str, filename: str, existing: Dict, department: str, service: str) -> Dict:
+        """Replace a stored document with a changed file of the same name."""
+        if (department and existing.get("department") and department != existing["department"]) or \
+                (service and existing.get("service") and service != existing["service"]):
+            return {
+                "success": False,
+                "status": "conflict",
+                "filename": filename,
+                "message": f"'{filename}' already belongs to {existing.get('department')} / {existing.get('service')}"
+            }
+
+        if existing.get("file_hash") and existing["file_hash"] == file_sha256(file_path):
+            return {"success": True, "status": "unchanged", "filename": filename, "message": "Content unchanged"}
+
+        result = vector_db_operations.replace_pdf_path_in_vectorstore(file_path, filename)
+        if not result.get("success"):
+            return {"success": False, "status": "failed", "filename": filename,
+                    "message": result.get("message", "Update failed")}
+
+        update_document_content(
+            filename, result.get("file_hash"), result.get("chroma_ids", []), result.get("dedup_stats")
+        )
+        log_action(
+            existing.get("department") or "Unassigned",
+            existing.get("service") or "Unassigned",
+            filename,
+            existing.get("document_type") or "Unknown",
+            "update",
+        )
+        return {
+            "success": True,
+            "status": "updated",
+            "filename": filename,
+            "message": result.get("message", ""),
+            "chunks_added": result.get("chunks_added", 0),
+            "chunks_linked": result.get("chunks_linked", 0),
+            "chunks_removed": result.get("chunks_removed", 0),
+            "chunk_ids": result.get("chroma_ids", []),
+        }
+
+    def ingest_batch(self, items: List[Dict], workers: int = 2,
+                     on_result: Optional[Callable[[Dict, Dict], None]] = None) -> List[Dict]:
+        """
+        Ingest several files in parallel.
+
+        Owner updates on shared chunks are serialized in-process; afterwards
+        the owners of every chunk the batch wrote are reconciled with the
+        MongoDB records as well, in case another process ingested concurrently.
+
+        Args:
+            items: Dicts with file_path and optional filename, department, service, document_type
+            workers: Number of files processed at once
+            on_result: Optional callback(item, result) called as each file finishes
+
+        Returns:
+            List of per-file results (in completion order)
+        """
+        results = []
+        if not items:
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest") as executor:
+            futures = {
+                executor.submit(
+                    self.ingest_file,
+                    item["file_path"],
+                    item.get("filename"),
+                    item.get("department", ""),
+                    item.get("service", ""),
+                    item.get("document_type", ""),
+                ): item
+                for item in items
+            }
+            for future in as_completed(futures):
+                item = futures[future]
+                result = future.result()
+                results.append(result)
+                if on_result:
+                    on_result(item, result)
+
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        logger.info(f"✓ Ingested batch of {len(items)} files: {counts}")
+
+        touched = [cid for result in results for cid in result.get("chunk_ids", [])]
+        if touched:
+            try:
+                fixed = vector_db_operations.reconcile_owners(touched)
+                if fixed:
+                    vector_store_manager.persist()
+                    logger.info(f"Reconciled owners on {fixed} shared chunks")
+            except Exception as e:
+                logger.warning(f"⚠ Could not reconcile chunk owners after batch: {e}")
+        return results
+
+
+# Global instance
+document_service = DocumentService()
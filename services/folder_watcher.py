@@ -0,0 +1,278 @@
+"""
+Watch-folder ingestion: PDFs dropped into the watch directory are added to
+(or updated in) the knowledge base automatically.
+
+Layout: <directory>/<Department>/<Service>/[<Document Type>/]<file>.pdf
+
+Documents are identified by file name, so a name must be unique across the
+whole tree: files sharing a name with another file in a different folder are
+not ingested (and a warning names both) until only one of them is left.
+"""
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from config.settings import WATCH_CONFIG
+from services.document_service import document_service
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+POLL_INTERVAL_SECONDS = 1.0
+
+
+class _PdfEventHandler(FileSystemEventHandler):
+    """Forwards PDF create/modify/move events to the watcher."""
+
+    def __init__(self, watcher: "FolderWatcher"):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.mark_changed(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.mark_changed(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.watcher.forget(event.src_path)
+            self.watcher.mark_changed(event.dest_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.watcher.forget(event.src_path)
+
+
+class FolderWatcher:
+    """
+    Debounced folder watcher.
+
+    A file is ingested only once it has had no events for debounce_seconds
+    and its size has stopped changing, so half-copied files are never read.
+    Ready files are ingested in batches of batch_size using `workers` threads.
+    Files whose (size, mtime) were already ingested are not re-hashed; files
+    whose content hash matches the stored document are skipped by the
+    document service.
+    """
+
+    def __init__(self, directory: str = None, debounce_seconds: float = None,
+                 batch_size: int = None, workers: int = None):
+        self.directory = os.path.abspath(directory or WATCH_CONFIG.get("directory", "./documents"))
+        self.debounce_seconds = debounce_seconds if debounce_seconds is not None else WATCH_CONFIG.get("debounce_seconds", 5)
+        self.batch_size = batch_size or WATCH_CONFIG.get("batch_size", 8)
+        self.workers = workers or WATCH_CONFIG.get("workers", 2)
+
+        self._pending: Dict[str, Tuple[float, int]] = {}  # path -> (last event time, last seen size)
+        self._ingested: Dict[str, Tuple[int, float]] = {}  # path -> (size, mtime) at last ingest
+        self._paths_by_name: Dict[str, Set[str]] = {}  # file name -> paths in the tree with that name
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._observer: Optional[Observer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self, scan_on_start: bool = None) -> bool:
+        """Start watching in the background. Returns False if the directory is missing."""
+        if self._thread and self._thread.is_alive():
+            return True
+        if not os.path.isdir(self.directory):
+            logger.error(f"✗ Watch directory does not exist: {self.directory}")
+            return False
+
+        if scan_on_start if scan_on_start is not None else WATCH_CONFIG.get("scan_on_start", True):
+            self.scan()
+        else:
+            self._index_names()
+
+        self._stop.clear()
+        self._observer = Observer()
+        self._observer.schedule(_PdfEventHandler(self), self.directory, recursive=True)
+        self._observer.start()
+
+        self._thread = threading.Thread(target=self._run, name="folder-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Watching {self.directory} for PDFs (debounce {self.debounce_seconds}s)")
+        return True
+
+    def stop(self):
+        """Stop watching; the batch in progress finishes first."""
+        self._stop.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        logger.info("✓ Folder watcher stopped")
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def pending_count(self) -> int:
+        """Files seen but not yet ingested (waiting for debounce/size stability)."""
+        with self._lock:
+            return len(self._pending)
+
+    def run_once(self):
+        """Ingest every PDF currently in the directory, then return."""
+        self.scan()
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+            time.sleep(POLL_INTERVAL_SECONDS)
+            self._process_ready()
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def mark_changed(self, path: str):
+        """Queue a file for ingestion (restarts its debounce window)."""
+        if not path.lower().endswith(".pdf"):
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            self._paths_by_name.setdefault(os.path.basename(path), set()).add(path)
+            previous = self._pending.get(path)
+            self._pending[path] = (time.monotonic(), previous[1] if previous else -1)
+
+    def forget(self, path: str):
+        """A file was deleted or moved away: re-queue files that shared its name."""
+        if not path.lower().endswith(".pdf"):
+            return
+        path = os.path.abspath(path)
+        with self._lock:
+            self._pending.pop(path, None)
+            self._ingested.pop(path, None)
+            paths = self._paths_by_name.get(os.path.basename(path), set())
+            paths.discard(path)
+            others = list(paths)
+        if len(others) == 1:
+            self.mark_changed(others[0])
+
+    def scan(self):
+        """Queue every PDF already in the directory (catches changes made while stopped)."""
+        paths = self._index_names()
+        for path in paths:
+            self.mark_changed(path)
+        logger.info(f"Queued {len(paths)} existing PDFs from {self.directory}")
+
+    def _index_names(self) -> List[str]:
+        """Record the name of every PDF in the tree (for duplicate-name checks); returns their paths."""
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.lower().endswith(".pdf"):
+                    paths.append(os.path.abspath(os.path.join(root, name)))
+        with self._lock:
+            for path in paths:
+                self._paths_by_name.setdefault(os.path.basename(path), set()).add(path)
+        return paths
+
+    def _same_name_paths(self, path: str) -> List[str]:
+        """Other files in the tree that still exist and have the same name as path."""
+        name = os.path.basename(path)
+        with self._lock:
+            live = {p for p in self._paths_by_name.get(name, set()) if p == path or os.path.exists(p)}
+            self._paths_by_name[name] = live
+            return sorted(live - {path})
+
+    def _run(self):
+        while not self._stop.wait(POLL_INTERVAL_SECONDS):
+            try:
+                self._process_ready()
+            except Exception as e:
+                logger.error(f"Error in folder watcher: {e}")
+
+    def _take_ready(self) -> List[str]:
+        """Pop files whose debounce window has passed and whose size is stable."""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (last_event, last_size) in list(self._pending.items()):
+                if now - last_event < self.debounce_seconds:
+                    continue
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    # Deleted or moved away before it settled
+                    del self._pending[path]
+                    continue
+                if size != last_size:
+                    # Still being written: wait another window
+                    self._pending[path] = (now, size)
+                    continue
+                del self._pending[path]
+                ready.append(path)
+        return ready
+
+    def _process_ready(self):
+        ready = self._take_ready()
+        items = []
+        for path in ready:
+            item = self._build_item(path)
+            if item:
+                items.append(item)
+
+        for i in range(0, len(items), self.batch_size):
+            if self._stop.is_set():
+                # Re-queue what is left so the next start picks it up
+                for item in items[i:]:
+                    self.mark_changed(item["file_path"])
+                return
+            batch = items[i:i + self.batch_size]
+            document_service.ingest_batch(batch, workers=self.workers, on_result=self._on_result)
+
+    def _build_item(self, path: str) -> Optional[Dict]:
+        """Derive department/service/document type from the file's location."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if self._ingested.get(path) == (stat.st_size, stat.st_mtime):
+            return None
+
+        parts = os.path.relpath(path, self.directory).split(os.sep)
+        if len(parts) < 3:
+            logger.warning(f"⚠ Skipping {path}: expected <Department>/<Service>/[<Document Type>/]<file>.pdf")
+            return None
+
+        duplicates = self._same_name_paths(path)
+        if duplicates:
+            others = ", ".join(os.path.relpath(p, self.directory) for p in duplicates)
+            logger.warning(f"⚠ Skipping {path}: '{parts[-1]}' is also used by {others}; "
+                           "file names must be unique across the watch directory")
+            return None
+
+        return {
+            "file_path": path,
+            "filename": parts[-1],
+            "department": parts[0],
+            "service": parts[1],
+            "document_type": parts[2] if len(parts) > 3 else "",
+            "_stat": (stat.st_size, stat.st_mtime),
+        }
+
+    def _on_result(self, item: Dict, result: Dict):
+        status = result.get("status")
+        if result.get("success"):
+            self._ingested[item["file_path"]] = item["_stat"]
+            if status != "unchanged":
+                logger.info(f"✓ {status.capitalize()} {item['filename']} ({item['department']} / {item['service']})")
+        else:
+            logger.warning(f"⚠ Could not ingest {item['file_path']}: {result.get('message')}")
+
+
+# Global instance
+folder_watcher = FolderWatcher()
@@ -0,0 +1,197 @@
+"""
+Background dependency prober.
+
+Checks Ollama (reachable, chat/embedding models installed, models loaded in
+memory, latency), MongoDB (ping) and Chroma (collection count) every
+HEALTH_CONFIG["interval_seconds"] in a daemon thread and caches the results.
+The liveness/readiness endpoints answer from that cache without touching
+any dependency, so a load balancer can poll them as often as it likes.
+Readiness also waits for the startup warm-up (core.warmup) to finish.
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import requests
+
+from config.settings import HEALTH_CONFIG, MODEL_CONFIG
+from utils.logger import get_logger
+from utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+def _model_present(model: str, names) -> bool:
+    return any(model in name for name in names)
+
+
+class HealthProber:
+    """Periodically probes dependencies; readiness is read from the cached results."""
+
+    def __init__(self, interval_seconds: float = None, timeout_seconds: float = None):
+        self.interval = interval_seconds or HEALTH_CONFIG.get("interval_seconds", 15)
+        self.timeout = timeout_seconds or HEALTH_CONFIG.get("timeout_seconds", 3)
+        self.stale_after = self.interval * HEALTH_CONFIG.get("stale_after_intervals", 3)
+        self._results: Dict[str, Dict] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Probes (each returns {"ok", "latency_ms", ...})
+    # ------------------------------------------------------------------
+
+    def probe_ollama(self) -> Dict:
+        base_url = MODEL_CONFIG.get("ollama_base_url", "http://localhost:11434")
+        start = time.perf_counter()
+        try:
+            response = requests.get(f"{base_url}/api/tags", timeout=self.timeout)
+            latency_ms = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                return {"ok": False, "latency_ms": latency_ms, "error": f"HTTP {response.status_code}"}
+            installed = [m.get("name", "") for m in response.json().get("models", [])]
+        except Exception as e:
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+
+        chat_model = MODEL_CONFIG.get("chat_model", "")
+        embedding_model = MODEL_CONFIG.get("embedding_model", "")
+        result = {
+            "latency_ms": latency_ms,
+            "chat_model": chat_model,
+            "chat_model_installed": _model_present(chat_model, installed),
+            "embedding_model": embedding_model,
+            "embedding_model_installed": _model_present(embedding_model, installed),
+        }
+        # Models currently loaded in memory (a cold model adds load time to the first request)
+        try:
+            response = requests.get(f"{base_url}/api/ps", timeout=self.timeout)
+            if response.status_code == 200:
+                result["loaded_models"] = [m.get("name", "") for m in response.json().get("models", [])]
+        except Exception:
+            pass
+        result["ok"] = result["chat_model_installed"] and result["embedding_model_installed"]
+        if not result["ok"]:
+            result["error"] = "required model not installed"
+        return result
+
+    def probe_mongodb(self) -> Dict:
+        from db.mongo_client import get_mongo_client
+        start = time.perf_counter()
+        try:
+            get_mongo_client().admin.command("ping")
+            return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000}
+        except Exception as e:
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+
+    def probe_chroma(self) -> Dict:
+        from core.vector_store import vector_store_manager
+        from core.warmup import startup_warmup
+        from utils.lazy import is_initialized
+
+        if not is_initialized(vector_store_manager) and not startup_warmup.is_done():
+            # The warm-up is opening it; don't block the other probes on that
+            return {"ok": False, "latency_ms": 0.0, "error": "initializing"}
+        start = time.perf_counter()
+        try:
+            if not vector_store_manager.is_available():
+                return {"ok": False, "latency_ms": 0.0, "error": "vector store not initialized"}
+            count = vector_store_manager.collection.count()
+            return {"ok": True, "latency_ms": (time.perf_counter() - start) * 1000, "chunks": count}
+        except Exception as e:
+            return {"ok": False, "latency_ms": (time.perf_counter() - start) * 1000, "error": str(e)}
+
+    def probe_all(self) -> Dict[str, Dict]:
+        """Run every probe now and cache the results."""
+        results = {}
+        for name, probe in (("ollama", self.probe_ollama),
+                            ("mongodb", self.probe_mongodb),
+                            ("chroma", self.probe_chroma)):
+            try:
+                result = probe()
+            except Exception as e:
+                result = {"ok": False, "latency_ms": 0.0, "error": str(e)}
+            result["latency_ms"] = round(result.get("latency_ms", 0.0), 2)
+            results[name] = result
+            metrics.set_gauge("dependency_up", 1 if result["ok"] else 0, dependency=name)
+            metrics.set_gauge("dependency_probe_latency_ms", result["latency_ms"], dependency=name)
+
+        with self._lock:
+            previous = self._results
+            self._results = results
+            self._checked_at = time.time()
+        for name, result in results.items():
+            was_ok = previous.get(name, {}).get("ok")
+            if result["ok"] and was_ok is False:
+                logger.info(f"✓ {name} is healthy again")
+            elif not result["ok"] and was_ok is not False:
+                logger.warning(f"⚠ {name} health check failed: {result.get('error')}")
+        return results
+
+    # ------------------------------------------------------------------
+    # Cached status
+    # ------------------------------------------------------------------
+
+    def status(self) -> Dict:
+        """
+        Cached readiness: ready only once the startup warm-up has finished and
+        every dependency passed a recent probe.
+        """
+        from core.warmup import startup_warmup
+
+        warmup = startup_warmup.status()
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+            checked_at = self._checked_at
+        if checked_at is None:
+            return {"ready": False, "status": "starting", "checked_at": None, "checks": {}, "warmup": warmup}
+        stale = time.time() - checked_at > self.stale_after
+        healthy = not stale and bool(results) and all(r["ok"] for r in results.values())
+        if not warmup["done"]:
+            state = "starting"
+        elif healthy:
+            state = "healthy"
+        elif stale:
+            state = "stale"
+        else:
+            state = "degraded"
+        return {
+            "ready": healthy and warmup["done"],
+            "status": state,
+            "checked_at": datetime.fromtimestamp(checked_at, timezone.utc).isoformat(),
+            "checks": results,
+            "warmup": warmup,
+        }
+
+    # ------------------------------------------------------------------
+    # Scheduler
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Probe now and then every interval in a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.probe_all()
+                except Exception as e:
+                    logger.error(f"Health probe failed: {e}")
+                self._stop.wait(self.interval)
+
+        self._thread = threading.Thread(target=loop, name="health-prober", daemon=True)
+        self._thread.start()
+        logger.info(f"✓ Health prober running every {self.interval:g}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout * 3)
+            self._thread = None
+
+
+# Global instance
+health_prober = HealthProber()
@@ -0,0 +1,136 @@
+"""Chat session cache coherence: cached tails are checked against MongoDB, gone chats are evicted."""
+from datetime import datetime, timezone
+
+import pytest
+
+import services.chat_service as chat_service_module
+from core.write_buffer import WriteBehindBuffer
+from services.chat_cache import ChatSessionCache
+from services.chat_service import ChatService
+
+
+class FakeChats:
+    """In-memory stand-in for the chat_* functions of core.db_manager."""
+
+    def __init__(self):
+        self.chats = {}
+        self.messages = {}
+        self.tail_reads = 0
+
+    def create(self, chat_id, title="New Chat"):
+        if chat_id in self.chats:
+            return False
+        now = datetime.now(timezone.utc).isoformat()
+        self.chats[chat_id] = {"chat_id": chat_id, "title": title, "message_count": 0,
+                               "created_at": now, "updated_at": now, "last_active_at": now}
+        self.messages[chat_id] = []
+        return True
+
+    def get_by_id(self, chat_id):
+        chat = self.chats.get(chat_id)
+        return dict(chat) if chat else None
+
+    def append(self, chat_id, role, content):
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            return None
+        chat["message_count"] += 1
+        self.messages[chat_id].append({"seq": chat["message_count"], "role": role, "content": content})
+        return dict(chat)
+
+    def message_count(self, chat_id):
+        chat = self.chats.get(chat_id)
+        return chat["message_count"] if chat else None
+
+    def recent(self, chat_id, limit):
+        self.tail_reads += 1
+        return [dict(m) for m in self.messages.get(chat_id, [])[-limit:]] if limit > 0 else []
+
+    def delete(self, chat_id):
+        self.messages.pop(chat_id, None)
+        return self.chats.pop(chat_id, None) is not None
+
+
+@pytest.fixture
+def chats(monkeypatch):
+    fake = FakeChats()
+    for name, func in (("chat_create", fake.create), ("chat_get_by_id", fake.get_by_id),
+                       ("chat_append_message", fake.append), ("chat_get_message_count", fake.message_count),
+                       ("chat_get_recent_messages", fake.recent), ("chat_delete", fake.delete),
+                       ("chat_touch", lambda chat_id: chat_id in fake.chats)):
+        monkeypatch.setattr(chat_service_module, name, func)
+    monkeypatch.setattr(chat_service_module, "chat_session_cache", ChatSessionCache(tail_size=4))
+    monkeypatch.setattr(chat_service_module, "write_buffer", WriteBehindBuffer(enabled=False))
+    return fake
+
+
+def contents(messages):
+    return [m["content"] for m in messages]
+
+
+def test_warm_tail_is_served_from_the_cache(chats):
+    service = ChatService()
+    chat_id = service.create_new_chat()
+    assert service.save_message_to_chat(chat_id, "user", "q1")
+    assert service.save_message_to_chat(chat_id, "assistant", "a1")
+
+    assert contents(service.get_recent_messages(chat_id, limit=4)) == ["q1", "a1"]
+    assert chats.tail_reads == 0
+
+
+def test_message_appended_by_another_process_is_not_missed(chats):
+    service = ChatService()
+    chat_id = service.create_new_chat()
+    service.save_message_to_chat(chat_id, "user", "q1")
+    chats.append(chat_id, "assistant", "a1 from another worker")
+
+    assert contents(service.get_recent_messages(chat_id, limit=4)) == ["q1", "a1 from another worker"]
+    assert chats.tail_reads == 1
+    # This process's next message lands after it, and the cache follows
+    service.save_message_to_chat(chat_id, "user", "q2")
+    assert [m["seq"] for m in service.get_recent_messages(chat_id, limit=4)] == [1, 2, 3]
+    assert chats.tail_reads == 1
+
+
+def test_chat_deleted_elsewhere_is_evicted(chats):
+    service = ChatService()
+    chat_id = service.create_new_chat()
+    service.save_message_to_chat(chat_id, "user", "q1")
+    chats.delete(chat_id)
+
+    assert service.get_recent_messages(chat_id, limit=4) == []
+    assert chat_service_module.chat_session_cache.get_chat(chat_id) is None
+    # A reply to a chat that is gone is dropped; the user's next message recreates it
+    assert service.save_message_to_chat(chat_id, "assistant", "a1") is False
+    assert service.save_message_to_chat(chat_id, "user", "q2") is True
+    assert chats.messages[chat_id] == [{"seq": 1, "role": "user", "content": "q2"}]
+
+
+def test_append_to_chat_deleted_since_it_was_cached_recreates_it(chats):
+    service = ChatService()
+    chat_id = service.create_new_chat()
+    service.save_message_to_chat(chat_id, "user", "q1")
+    chats.delete(chat_id)
+
+    # The cached record still says the chat exists; the append finds it gone
+    assert service.save_message_to_chat(chat_id, "user", "q2") is True
+    assert chats.messages[chat_id] == [{"seq": 1, "role": "user", "content": "q2"}]
+    assert chat_service_module.chat_session_cache.get_chat(chat_id)["message_count"] == 1
+    assert contents(service.get_recent_messages(chat_id, limit=4)) == ["q2"]
+
+
+def test_validate_and_record_message_drop_a_stale_tail():
+    cache = ChatSessionCache(tail_size=4)
+    cache.put_chat({"chat_id": "c", "message_count": 1}, tail=[{"seq": 1, "role": "user", "content": "q1"}])
+    assert cache.validate("c", 1) is True
+
+    # An append whose seq skips one means another writer added a message we did not see
+    cache.record_message({"chat_id": "c", "message_count": 3}, {"role": "user", "content": "q3"})
+    assert cache.get_tail("c", 2) is None
+    assert cache.get_chat("c")["message_count"] == 3
+
+    cache.put_tail("c", [{"seq": 3, "role": "user", "content": "q3"}])
+    assert cache.validate("c", 4) is False
+    assert cache.get_tail("c", 1) is None and cache.get_chat("c")["message_count"] == 4
+    assert cache.validate("c", None) is False
+    assert cache.get_chat("c") is None
@@ -0,0 +1,209 @@
+"""Owner bookkeeping of chunks shared between documents (per-owner classification)."""
+import threading
+
+import pytest
+
+from utils.hashing import (
+    join_owner_meta,
+    matching_owners,
+    owner_view,
+    split_owner_meta,
+    split_owners,
+    with_owners,
+)
+
+HR = {"department": "HR", "service": "Leave", "document_type": "FAQ", "status": "Active"}
+IT = {"department": "IT", "service": "Mail", "document_type": "Policy", "status": "Active"}
+
+
+def chunk(owner_meta, owners=None):
+    """Chunk metadata owned by owners (default: the owner_meta keys, first one primary)."""
+    owners = owners or list(owner_meta)
+    return with_owners({"filename": owners[0]}, owners, owner_meta)
+
+
+# ----------------------------------------------------------------------
+# utils.hashing helpers
+# ----------------------------------------------------------------------
+
+def test_top_level_fields_follow_the_primary_owner():
+    meta = chunk({"A.pdf": HR, "B.pdf": IT})
+    assert meta["filename"] == meta["source"] == "A.pdf"
+    assert meta["department"] == "HR" and meta["owner_count"] == 2
+    assert split_owners(meta) == ["A.pdf", "B.pdf"]
+
+    # The primary leaving re-points the chunk at the next owner, with its fields
+    entries = split_owner_meta(meta)
+    released = with_owners(meta, ["B.pdf"], entries)
+    assert released["filename"] == "B.pdf" and released["department"] == "IT"
+    assert released["document_type"] == "Policy" and released["owner_count"] == 1
+    assert set(split_owner_meta(released)) == {"B.pdf"}
+
+
+def test_matching_owners_uses_each_owners_classification():
+    meta = chunk({"A.pdf": HR, "B.pdf": IT})
+    assert matching_owners(meta, {"department": "IT"}) == ["B.pdf"]
+    assert matching_owners(meta, {"status": "Active"}) == ["A.pdf", "B.pdf"]
+    assert matching_owners(meta, {"filename": "B.pdf", "department": "HR"}) == []
+
+
+def test_owner_view_shows_the_chunk_as_one_owner_classifies_it():
+    meta = chunk({"A.pdf": HR, "B.pdf": IT})
+    view = owner_view(meta, "B.pdf")
+    assert (view["filename"], view["source"], view["department"]) == ("B.pdf", "B.pdf", "IT")
+    assert meta["department"] == "HR"
+
+
+def test_chunks_without_owner_meta_fall_back_to_the_primary():
+    legacy = {"filename": "A.pdf", "owners": "A.pdf|B.pdf", "owner_count": 2, **HR}
+    assert split_owner_meta(legacy) == {"A.pdf": HR}
+    # Owners without an entry are matched on the top-level fields
+    assert matching_owners(legacy, {"department": "HR"}) == ["A.pdf", "B.pdf"]
+    broken = {**legacy, "owner_meta": "{not json"}
+    assert split_owner_meta(broken) == {"A.pdf": HR}
+
+
+def test_owner_meta_serialization_is_stable():
+    assert join_owner_meta({"b": {"x": 1}, "a": {}}) == '{"a":{},"b":{"x":1}}'
+
+
+# ----------------------------------------------------------------------
+# VectorDBOperations against an in-memory Chroma collection
+# ----------------------------------------------------------------------
+
+def _match(meta, where):
+    for key, value in (where or {}).items():
+        if key == "$or":
+            if not any(_match(meta, part) for part in value):
+                return False
+        elif key == "$and":
+            if not all(_match(meta, part) for part in value):
+                return False
+        elif isinstance(value, dict):
+            (op, operand), = value.items()
+            actual = meta.get(key)
+            if op == "$in" and actual not in operand:
+                return False
+            if op == "$gt" and not (actual is not None and actual > operand):
+                return False
+        elif meta.get(key) != value:
+            return False
+    return True
+
+
+class FakeVectorStore:
+    """The parts of ChromaVectorStore the owner bookkeeping uses, over a dict of chunk metadata."""
+
+    def __init__(self, real_store_class):
+        self.chunks = {}
+        self.build_where = real_store_class.build_where
+        self.where_conditions = real_store_class.where_conditions
+
+    def is_available(self):
+        return True
+
+    def persist(self):
+        pass
+
+    def get_chunks(self, ids=None, where=None, include=None, limit=None):
+        found = [(cid, meta) for cid, meta in self.chunks.items()
+                 if (ids is None or cid in ids) and _match(meta, where)][:limit]
+        return {"ids": [cid for cid, _ in found], "metadatas": [dict(meta) for _, meta in found],
+                "documents": ["text"] * len(found)}
+
+    def update_metadatas(self, ids, metadatas):
+        for cid, meta in zip(ids, metadatas):
+            self.chunks[cid] = dict(meta)
+        return True
+
+    def delete_ids(self, ids):
+        for cid in ids:
+            self.chunks.pop(cid, None)
+        return True
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """A VectorDBOperations wired to a fake store and fake MongoDB document records."""
+    pytest.importorskip("langchain")
+    import core.vector_operations as vector_operations
+    from core.vector_store import ChromaVectorStore
+
+    fake = FakeVectorStore(ChromaVectorStore)
+    documents = {}
+
+    def find_documents_chunk_ids(filename=None, department=None, service=None):
+        query = {"filename": filename, "department": department, "service": service}
+        return [{"filename": doc["filename"], "chunk_ids": doc["chunk_ids"]} for doc in documents.values()
+                if all(doc.get(key) == value for key, value in query.items() if value is not None)]
+
+    def get_document_chunk_ids(chunk_ids=None):
+        return [{"filename": doc["filename"], "chunk_ids": doc["chunk_ids"]} for doc in documents.values()
+                if chunk_ids is None or set(chunk_ids) & set(doc["chunk_ids"])]
+
+    monkeypatch.setattr(vector_operations, "vector_store_manager", fake)
+    monkeypatch.setattr(vector_operations, "find_document", documents.get)
+    monkeypatch.setattr(vector_operations, "find_documents_chunk_ids", find_documents_chunk_ids)
+    monkeypatch.setattr(vector_operations, "get_document_chunk_ids", get_document_chunk_ids)
+    monkeypatch.setattr(vector_operations.collection_migrator, "notify_changed", lambda filenames: None)
+
+    ops = vector_operations.VectorDBOperations.__new__(vector_operations.VectorDBOperations)
+    ops._owners_lock = threading.RLock()
+
+    # A.pdf (HR) owns c1 and c2; B.pdf (IT) owns c3 and links the identical c1
+    fake.chunks = {"c1": chunk({"A.pdf": HR}), "c2": chunk({"A.pdf": HR}), "c3": chunk({"B.pdf": IT})}
+    documents["A.pdf"] = {"filename": "A.pdf", "department": "HR", "service": "Leave", "chunk_ids": ["c1", "c2"]}
+    documents["B.pdf"] = {"filename": "B.pdf", "department": "IT", "service": "Mail", "chunk_ids": ["c3", "c1"]}
+    ops._add_owner(["c1"], "B.pdf", IT)
+    return ops, fake, documents
+
+
+def test_linking_owner_keeps_the_primarys_classification(store):
+    _, fake, _ = store
+    c1 = fake.chunks["c1"]
+    assert split_owners(c1) == ["A.pdf", "B.pdf"]
+    assert c1["department"] == "HR"
+    assert split_owner_meta(c1)["B.pdf"] == IT
+
+
+def test_update_metadata_changes_only_the_matched_owners_classification(store):
+    ops, fake, _ = store
+    result = ops.update_metadata({"department": "IT"}, {"status": "Inactive"})
+    assert result["success"] and result["filenames"] == ["B.pdf"]
+    assert (result["chunks_updated"], result["chunks_shared"]) == (2, 1)
+
+    c1 = fake.chunks["c1"]
+    assert c1["status"] == "Active"
+    assert split_owner_meta(c1)["A.pdf"]["status"] == "Active"
+    assert split_owner_meta(c1)["B.pdf"]["status"] == "Inactive"
+    assert fake.chunks["c3"]["status"] == "Inactive"
+
+    # Status only lives in Chroma: B's chunks are found through its own entry on c1
+    result = ops.update_metadata({"status": "Inactive"}, {"description": "superseded"})
+    assert result["filenames"] == ["B.pdf"]
+    assert split_owner_meta(fake.chunks["c1"])["B.pdf"]["description"] == "superseded"
+    assert "description" not in fake.chunks["c2"]
+
+
+def test_deleting_the_primary_hands_the_chunk_to_the_next_owner(store):
+    ops, fake, documents = store
+    ops.update_metadata({"department": "IT"}, {"status": "Inactive"})
+
+    counts = ops._release_owner("A.pdf", documents.pop("A.pdf")["chunk_ids"])
+    assert counts == {"deleted": 1, "released": 1}
+    assert "c2" not in fake.chunks
+    c1 = fake.chunks["c1"]
+    assert (c1["filename"], c1["department"], c1["status"]) == ("B.pdf", "IT", "Inactive")
+    assert set(split_owner_meta(c1)) == {"B.pdf"}
+
+
+def test_reconcile_owners_fills_in_missing_owner_classification(store):
+    ops, fake, documents = store
+    fake.chunks["c4"] = {"filename": "A.pdf", "source": "A.pdf", "owners": "A.pdf|B.pdf", "owner_count": 2, **HR}
+    documents["A.pdf"]["chunk_ids"].append("c4")
+    documents["B.pdf"]["chunk_ids"].append("c4")
+
+    assert ops.reconcile_owners(["c4"]) == 1
+    entries = split_owner_meta(fake.chunks["c4"])
+    assert entries["A.pdf"]["department"] == "HR" and entries["B.pdf"]["department"] == "IT"
+    assert ops.reconcile_owners(["c4"]) == 0
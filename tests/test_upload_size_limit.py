@@ -0,0 +1,96 @@
+"""UploadSizeLimitMiddleware: 413 for oversized upload bodies, only on the upload routes."""
+import asyncio
+import json
+
+from api.middleware import UploadSizeLimitMiddleware
+
+LIMIT = 100
+ROUTES = [("POST", r"/api/v1/documents/upload"), ("PUT", r"/api/v1/documents/.+")]
+
+
+def body_reading_app(on_disconnect="raise"):
+    """
+    An app that reads the whole body, like form parsing does. On a client
+    disconnect it raises (as Starlette's ClientDisconnect) or answers 400.
+    """
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                if on_disconnect == "raise":
+                    raise RuntimeError("client disconnected")
+                await send({"type": "http.response.start", "status": 400, "headers": []})
+                await send({"type": "http.response.body", "body": b"bad form"})
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": str(len(body)).encode()})
+
+    app.calls = calls
+    return app
+
+
+def call(app, path="/api/v1/documents/upload", method="POST", chunks=(b"x" * 10,), content_length=None):
+    headers = [(b"content-type", b"multipart/form-data; boundary=b")]
+    if content_length is not None:
+        headers.append((b"content-length", str(content_length).encode()))
+    else:
+        headers.append((b"transfer-encoding", b"chunked"))
+    scope = {"type": "http", "method": method, "path": path, "headers": headers}
+    incoming = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+                for i, chunk in enumerate(chunks)]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0) if incoming else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = UploadSizeLimitMiddleware(app, routes=ROUTES, max_body_bytes=LIMIT)
+    asyncio.run(middleware(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, body
+
+
+def test_declared_length_over_limit_is_rejected_before_the_app():
+    app = body_reading_app()
+    status, body = call(app, chunks=(b"x" * 150,), content_length=150)
+    assert status == 413
+    assert "too large" in json.loads(body)["detail"]
+    assert app.calls == []
+
+
+def test_chunked_body_over_limit_gets_413_when_the_app_raises():
+    status, _ = call(body_reading_app("raise"), chunks=(b"x" * 60, b"x" * 60, b"x" * 60))
+    assert status == 413
+
+
+def test_chunked_body_over_limit_gets_413_not_the_apps_400():
+    status, body = call(body_reading_app("respond"), chunks=(b"x" * 60, b"x" * 60))
+    assert status == 413
+    assert b"bad form" not in body
+
+
+def test_body_within_limit_reaches_the_app():
+    status, body = call(body_reading_app(), chunks=(b"x" * 40, b"x" * 40))
+    assert (status, body) == (200, b"80")
+
+
+def test_replace_route_is_limited():
+    status, _ = call(body_reading_app(), path="/api/v1/documents/report.pdf", method="PUT",
+                     chunks=(b"x" * 150,), content_length=150)
+    assert status == 413
+
+
+def test_other_routes_are_not_limited():
+    for path, method in (("/api/v1/chat", "POST"), ("/api/v1/documents/upload", "GET")):
+        status, body = call(body_reading_app(), path=path, method=method, chunks=(b"x" * 150,))
+        assert (status, body) == (200, b"150")
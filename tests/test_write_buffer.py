@@ -0,0 +1,98 @@
+"""WriteBehindBuffer failure handling: requeue while MongoDB is down, bounded retries, dead letters."""
+import json
+
+import pytest
+from pymongo.errors import AutoReconnect, ConnectionFailure
+
+from core.write_buffer import WriteBehindBuffer
+
+
+class FakeMongo:
+    """Stands in for WriteBehindBuffer._write: fails on poisoned ops or while down."""
+
+    def __init__(self):
+        self.written = []
+        self.down = False
+        self.poisoned = set()
+
+    def __call__(self, batch):
+        if self.down:
+            raise AutoReconnect("connection refused")
+        if any(op.get("chat_id") in self.poisoned for op in batch):
+            raise ValueError("document failed validation")
+        self.written.extend(batch)
+
+
+@pytest.fixture
+def buffer(tmp_path, monkeypatch):
+    buf = WriteBehindBuffer(enabled=False, max_pending=100)
+    buf.max_attempts = 3
+    buf.dead_letter_path = str(tmp_path / "dead" / "letters.jsonl")
+    mongo = FakeMongo()
+    monkeypatch.setattr(buf, "_write", mongo)
+    return buf, mongo
+
+
+def test_unreachable_mongo_keeps_the_whole_queue_in_order(buffer):
+    buf, mongo = buffer
+    for role in ("user", "assistant"):
+        buf.add_message("c1", role, "hi")
+    mongo.down = True
+    for _ in range(5):
+        assert buf.flush() is False
+    assert [op["message"]["role"] for op in buf._pending] == ["user", "assistant"]
+    assert all("attempts" not in op for op in buf._pending)
+    assert buf.has_pending_chat("c1") and buf.dead_lettered == 0
+
+    mongo.down = False
+    assert buf.flush() is True
+    assert [op["message"]["role"] for op in mongo.written] == ["user", "assistant"]
+    assert not buf.has_pending_chat("c1") and buf.flushed == 2
+
+
+def test_failing_op_does_not_block_the_others_and_is_dead_lettered(buffer):
+    buf, mongo = buffer
+    mongo.poisoned.add("bad")
+    buf.add_message("good", "user", "one")
+    buf.add_message("bad", "user", "poison")
+    buf.add_log({"action": "upload"})
+
+    assert buf.flush() is False
+    assert [op.get("chat_id") for op in mongo.written] == ["good", None]
+    assert [op["chat_id"] for op in buf._pending] == ["bad"]
+    assert buf.has_pending_chat("bad") and not buf.has_pending_chat("good")
+
+    assert buf.flush() is False
+    assert buf.flush() is True
+    assert buf._pending == [] and not buf.has_pending_chat("bad")
+    assert buf.dead_lettered == 1 and buf.flushed == 2
+
+    with open(buf.dead_letter_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 1
+    assert records[0]["chat_id"] == "bad" and records[0]["attempts"] == 3
+    assert records[0]["message"]["content"] == "poison"
+    assert "validation" in records[0]["error"]
+
+
+def test_mongo_lost_while_writing_one_by_one_requeues_the_rest(buffer, monkeypatch):
+    buf, mongo = buffer
+    for chat_id in ("a", "b", "c"):
+        buf.add_message(chat_id, "user", "hi")
+    calls = []
+
+    def write(batch):
+        calls.append(batch)
+        if len(batch) > 1:
+            raise ValueError("bulk write error")
+        if batch[0]["chat_id"] == "b":
+            raise ConnectionFailure("primary stepped down")
+        mongo.written.extend(batch)
+
+    monkeypatch.setattr(buf, "_write", write)
+    assert buf.flush() is False
+    assert [op["chat_id"] for op in mongo.written] == ["a"]
+    assert [op["chat_id"] for op in buf._pending] == ["b", "c"]
+    # Connection errors do not use up an op's attempts
+    assert all("attempts" not in op for op in buf._pending)
+    assert buf.dead_lettered == 0
@@ -96,14 +96,13 @@ def _handle_new_chat():
 def _render_chat_history():
     """Render clean chat history list."""
     try:
-        all_chats = chat_service.get_all_chats()
+        # Only the most recent chats, summary fields only
+        display_limit = 20
+        chat_summaries = chat_service.list_chat_summaries(limit=display_limit)["chats"]
         
-        if all_chats:
-            # Limit display to recent chats for performance
-            display_limit = 20
-            chat_items = list(all_chats.items())[:display_limit]
-            
-            for chat_id, chat_info in chat_items:
+        if chat_summaries:
+            for chat_info in chat_summaries:
+                chat_id = chat_info["chat_id"]
                 chat_title = chat_info.get("title", "Untitled Chat")
                 
                 # Truncate title if too long
@@ -157,14 +156,15 @@ def _load_chat(chat_id, chat_info):
     """Load a specific chat with enhanced memory management."""
     try:
         # Set new chat as current
+        # Load chat messages for display (stored separately from the chat list)
+        chat_messages = chat_service.get_chat_messages(chat_id)
+
         st.session_state.current_chat_id = chat_id
-        st.session_state.current_chat_messages = chat_info.get("messages", [])
+        st.session_state.current_chat_messages = chat_messages
         st.session_state.is_new_chat = False
         st.session_state.pending_new_chat = False
         st.session_state.show_delete_confirmation = None
         
-        # Load chat messages for display
-        chat_messages = chat_service.get_chat_messages(chat_id)
         st.session_state.memory_loaded_for_chat = chat_id if chat_messages is not None else None
 
         st.rerun()
@@ -5,6 +5,7 @@ import streamlit as st
 from datetime import datetime
 from core.vector_operations import vector_db_operations
 from core.vector_store import vector_store_manager
+from core.db_manager import update_documents_metadata
 from utils.logger import get_logger
 import pandas as pd
 
@@ -406,7 +407,7 @@ def display_dashboard_table(pdfs_data):
 
 def update_pdf_metadata(filename, department, service, doc_type, description, status, date_time):
     """
-    Update metadata for all chunks of a PDF in Chroma.
+    Update metadata for all chunks of a PDF in Chroma (metadata only, nothing is re-embedded).
 
     Args:
         filename: Original filename of the PDF
@@ -422,55 +423,34 @@ def update_pdf_metadata(filename, department, service, doc_type, description, st
             st.error("Vector store is not available.")
             return False
 
-        collection = vector_store_manager.collection
-
-        # Fetch all chunks matching filename
-        try:
-            results = collection.get(where={"filename": filename}, include=["ids", "metadatas", "documents"])
-        except Exception as e:
-            logger.error(f"Error querying Chroma collection: {e}")
-            st.error("Failed to query Chroma for document chunks.")
-            return False
-
-        chunk_ids = results.get("ids", []) or []
-        if not chunk_ids:
-            st.warning(f"No chunks found for {filename}")
-            return False
-
-        # Prepare updated metadata (preserve existing values)
-        metadatas = results.get("metadatas", []) or []
-        updated_metadatas = []
-        for meta in metadatas:
-            existing = meta or {}
-            merged = existing.copy()
-            merged.update({
+        result = vector_db_operations.update_metadata(
+            {"filename": filename},
+            {
                 "department": department,
                 "service": service,
                 "document_type": doc_type,
                 "description": description,
                 "status": status,
-                "add_modify": "Modify",
                 "date_time": date_time
-            })
-            updated_metadatas.append(merged)
+            }
+        )
+        if not result.get("success"):
+            st.error(result.get("message", "Failed to update document metadata."))
+            return False
+        if filename not in result.get("filenames", []):
+            st.warning(f"No chunks found for {filename}")
+            return False
+        if result.get("chunks_shared"):
+            st.info(result["message"])
 
-        # Try metadata-only update first
+        # Keep the MongoDB document record in sync
         try:
-            collection.update(ids=chunk_ids, metadatas=updated_metadatas)
-            logger.info(f"Updated metadata for {len(chunk_ids)} chunks of {filename}")
-            return True
-        except Exception as update_err:
-            logger.warning(f"Metadata-only update failed, trying upsert: {update_err}")
-
-        # Fallback: upsert with documents if available
-        documents = results.get("documents", []) or []
-        if documents and len(documents) == len(chunk_ids):
-            collection.upsert(ids=chunk_ids, documents=documents, metadatas=updated_metadatas)
-            logger.info(f"Upserted metadata for {len(chunk_ids)} chunks of {filename}")
-            return True
+            update_documents_metadata([filename], department=department, service=service, document_type=doc_type)
+        except Exception as e:
+            logger.warning(f"Chroma updated but MongoDB record not synced for {filename}: {e}")
 
-        st.error("Failed to update document metadata.")
-        return False
+        logger.info(f"Updated metadata for {result['chunks_updated']} chunks of {filename}")
+        return True
 
     except Exception as e:
         logger.error(f"Error updating metadata for {filename}: {e}")
@@ -5,7 +5,7 @@ Vector Database Operations Page - v2 Redesign
 
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 
 from core.vector_operations import vector_db_operations
@@ -16,21 +16,24 @@ from config.departments_services import DEPARTMENTS_SERVICES, DOCUMENT_TYPES
 from core.db_manager import (
     add_document,
     delete_document,
+    update_document_content,
     get_documents_by_department_service,
     get_all_documents,
-    get_all_services,
-    get_services_by_department,
-    get_document_count_for_service,
+    get_service_document_counts,
     add_service,
     upsert_service,
     update_service_status,
     log_action,
-    get_all_logs,
+    query_logs,
+    get_log_filter_options,
     get_logs_by_department_service
 )
+from core.catalog_cache import services_catalog
 
 logger = get_logger(__name__)
 
+LOG_PAGE_SIZE = 100
+
 
 def _safe_key(name: str) -> str:
     """Create Streamlit-safe key from arbitrary name."""
@@ -58,7 +61,7 @@ def _show_manage_documents_tab():
         st.session_state.upload_success_message = None
     
     # Get all services
-    all_services = get_all_services()
+    all_services = services_catalog.get_all()
     departments = sorted(list(set([s["department"] for s in all_services])))
     
     if not departments:
@@ -101,7 +104,7 @@ def _show_manage_documents_tab():
     # STEP 2: Service Selection
     st.markdown("### 📌 Step 2: Select or Add Service")
     
-    dept_services = get_services_by_department(selected_dept)
+    dept_services = services_catalog.get_by_department(selected_dept)
     service_names = sorted([s["service"] for s in dept_services])
     
     col_svc_sel, col_svc_add = st.columns([3, 1])
@@ -194,7 +197,24 @@ def _show_manage_documents_tab():
                         if st.button("❌ No", key=f"no_{_safe_key(doc.get('filename', ''))}_{i}"):
                             st.session_state.pop(f"confirm_del_{_safe_key(doc.get('filename', ''))}_{i}", None)
                             st.rerun()
-                
+
+                # Replace with a new version (only changed chunks are re-embedded)
+                with st.expander("🔄 Replace with new version"):
+                    new_version = st.file_uploader(
+                        "Select updated PDF",
+                        type=["pdf"],
+                        key=f"replace_{_safe_key(doc.get('filename', ''))}_{i}"
+                    )
+                    if new_version and st.button("🔄 Update Document", key=f"btn_replace_{_safe_key(doc.get('filename', ''))}_{i}"):
+                        with st.spinner(f"Updating {doc.get('filename')}..."):
+                            result = vector_db_operations.replace_pdf_in_vectorstore(new_version, doc.get('filename'))
+                        if result.get("success"):
+                            update_document_content(doc.get('filename'), result.get("file_hash"), result.get("chroma_ids", []), result.get("dedup_stats"))
+                            log_action(selected_dept, selected_service, doc.get('filename'), doc.get('document_type', 'Unknown'), "update")
+                            st.success(result.get("message", "Document updated"))
+                        else:
+                            st.error(result.get("message", "Update failed"))
+
                 st.divider()
         else:
             st.info("No documents in this service yet.")
@@ -295,7 +315,16 @@ def _show_manage_documents_tab():
                                 
                                 # STEP 2: Add document metadata to MongoDB
                                 st.write("  📍 Step 2/4: Saving document metadata...")
-                                add_document(uploaded_file.name, selected_dept, selected_service, doc_type)
+                                add_document(
+                                    uploaded_file.name,
+                                    selected_dept,
+                                    selected_service,
+                                    doc_type,
+                                    file_hash=result.get("file_hash"),
+                                    chunk_ids=result.get("chroma_ids"),
+                                    duplicate_of=result.get("duplicate_of"),
+                                    dedup_stats=result.get("dedup_stats")
+                                )
                                 logger.info(f"✅ Document metadata saved to MongoDB: {uploaded_file.name}")
                                 
                                 # STEP 3: Update service status to Active (only once, but safe to repeat)
@@ -308,6 +337,15 @@ def _show_manage_documents_tab():
                                 log_action(selected_dept, selected_service, uploaded_file.name, doc_type, "upload")
                                 logger.info(f"✅ Upload action logged: {uploaded_file.name}")
                                 
+                                if result.get("duplicate_of"):
+                                    st.info(f"  ♻️ Identical to {result['duplicate_of']} - linked to its existing chunks")
+                                dedup_stats = result.get("dedup_stats") or {}
+                                if dedup_stats.get("shared_exact") or dedup_stats.get("near_duplicates"):
+                                    st.caption(
+                                        f"  ♻️ {dedup_stats.get('shared_exact', 0)} shared chunks, "
+                                        f"{dedup_stats.get('near_duplicates', 0)} near duplicates "
+                                        f"({dedup_stats.get('near_duplicate_rate', 0):.0%})"
+                                    )
                                 st.success(f"  ✅ {uploaded_file.name} uploaded with {chunks_added} chunks")
                                 
                                 upload_results.append({
@@ -368,7 +406,8 @@ def _show_dashboard_tab():
     """Dashboard with filters: department, service, status."""
     st.subheader("📊 Dashboard")
     
-    all_services = get_all_services()
+    # Services with their document counts (one aggregation)
+    all_services = get_service_document_counts()
     
     if not all_services:
         st.error("No services found.")
@@ -378,14 +417,14 @@ def _show_dashboard_tab():
     col_dept, col_svc, col_status = st.columns(3)
     
     with col_dept:
-        all_depts = sorted(list(set([s["department"] for s in all_services])))
+        all_depts = sorted(list(set([s["department"] for s in all_services if s.get("department")])))
         dept_filter = st.selectbox("🏢 Department", options=["All"] + all_depts, key="dash_dept_filter")
     
     with col_svc:
         if dept_filter == "All":
-            all_svc_names = sorted(list(set([s["service"] for s in all_services])))
+            all_svc_names = sorted(list(set([s["service"] for s in all_services if s.get("service")])))
         else:
-            all_svc_names = sorted([s["service"] for s in all_services if s["department"] == dept_filter])
+            all_svc_names = sorted([s["service"] for s in all_services if s["department"] == dept_filter and s.get("service")])
         
         svc_search = st.text_input("🔍 Search Service", key="dash_svc_search", placeholder="Type to filter...")
         filtered_svc_names = [s for s in all_svc_names if svc_search.lower() in s.lower()] if svc_search else all_svc_names
@@ -411,9 +450,6 @@ def _show_dashboard_tab():
         if status_filter != "All" and status != status_filter:
             continue
         
-        # Get document count
-        doc_count = get_document_count_for_service(dept, service)
-        
         # Format last_updated
         if isinstance(last_updated, datetime):
             last_updated_str = last_updated.strftime("%Y-%m-%d %H:%M:%S")
@@ -423,47 +459,7 @@ def _show_dashboard_tab():
         rows.append({
             "Department": dept,
             "Service": service,
-            "Document Count": doc_count,
-            "Status": status,
-            "Last Updated": last_updated_str
-        })
-    
-    if rows:
-        df = pd.DataFrame(rows)
-        st.dataframe(df, use_container_width=True, hide_index=True)
-    else:
-        st.info("No services match your filters.")
-
-    
-    st.markdown("---")
-    
-    # Build dashboard data
-    rows = []
-    for svc in all_services:
-        dept = svc.get("department")
-        service = svc.get("service")
-        status = svc.get("status", "Inactive")
-        last_updated = svc.get("last_updated")
-        
-        # Apply filters
-        if dept_filter != "All" and dept != dept_filter:
-            continue
-        if svc_search and service not in filtered_svc_names:
-            continue
-        
-        # Get document count
-        doc_count = get_document_count_for_service(dept, service)
-        
-        # Format last_updated
-        if isinstance(last_updated, datetime):
-            last_updated_str = last_updated.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            last_updated_str = str(last_updated) if last_updated else "—"
-        
-        rows.append({
-            "Department": dept,
-            "Service": service,
-            "Document Count": doc_count,
+            "Document Count": svc.get("document_count", 0),
             "Status": status,
             "Last Updated": last_updated_str
         })
@@ -480,60 +476,78 @@ def _show_dashboard_tab():
 # ============================================================
 
 def _show_log_history_tab():
-    """Log history with dept/service filters."""
+    """Log history with dept/service/action/date filters, paged in MongoDB."""
     st.subheader("📝 Log History")
     
-    all_logs = get_all_logs()
-    
-    if not all_logs:
+    # Filter options come from distinct values, not from loading every log
+    options = get_log_filter_options()
+    if not options["actions"]:
         st.info("No activity logs yet.")
         return
     
     # Filters
-    col_dept, col_svc, col_action = st.columns(3)
+    col_dept, col_svc, col_action, col_dates = st.columns(4)
     
-    all_depts = sorted(list(set([l["department"] for l in all_logs])))
     with col_dept:
-        dept_filter = st.selectbox("Department", options=["All"] + all_depts, key="log_dept_filter")
-    
-    if dept_filter == "All":
-        all_svc_names = sorted(list(set([l["service"] for l in all_logs])))
-    else:
-        all_svc_names = sorted(list(set([l["service"] for l in all_logs if l["department"] == dept_filter])))
+        dept_filter = st.selectbox("Department", options=["All"] + options["departments"], key="log_dept_filter")
     
     with col_svc:
         svc_search = st.text_input("Search Service", key="log_svc_search")
-        filtered_svc_names = [s for s in all_svc_names if svc_search.lower() in s.lower()] if svc_search else all_svc_names
     
-    all_actions = sorted(list(set([l["action"] for l in all_logs])))
     with col_action:
-        action_filter = st.selectbox("Action", options=["All"] + all_actions, key="log_action_filter")
+        action_filter = st.selectbox("Action", options=["All"] + options["actions"], key="log_action_filter")
+    
+    with col_dates:
+        date_range = st.date_input("Date range", value=(), key="log_date_range")
+    
+    start = end = None
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        start = datetime.combine(date_range[0], datetime.min.time())
+        end = datetime.combine(date_range[1] + timedelta(days=1), datetime.min.time())
+    
+    filters = {
+        "department": None if dept_filter == "All" else dept_filter,
+        "service_search": svc_search or None,
+        "action": None if action_filter == "All" else action_filter,
+        "start": start,
+        "end": end,
+    }
+    
+    # Page through results with cursors; reset when the filters change
+    filter_key = repr(sorted(filters.items()))
+    if st.session_state.get("log_filter_key") != filter_key:
+        st.session_state.log_filter_key = filter_key
+        st.session_state.log_cursors = [None]
+    cursors = st.session_state.log_cursors
     
     st.markdown("---")
     
-    # Filter logs
-    filtered_logs = []
-    for log in all_logs:
-        if dept_filter != "All" and log["department"] != dept_filter:
-            continue
-        if svc_search and log["service"] not in filtered_svc_names:
-            continue
-        if action_filter != "All" and log["action"] != action_filter:
-            continue
-        filtered_logs.append(log)
+    page = query_logs(limit=LOG_PAGE_SIZE, cursor=cursors[-1], **filters)
     
-    if filtered_logs:
-        df = pd.DataFrame(filtered_logs)
+    if page["logs"]:
+        df = pd.DataFrame(page["logs"])
         
         # Format timestamp
         if "timestamp" in df.columns:
             df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.strftime("%Y-%m-%d %H:%M:%S")
         
         st.dataframe(
-            df[["timestamp", "department", "service", "document_name", "document_type", "action"]],
+            df.reindex(columns=["timestamp", "department", "service", "document_name", "document_type", "action"]),
             use_container_width=True,
             hide_index=True
         )
+        
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(cursors) > 1 and st.button("← Newer", key="log_newer"):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {len(cursors)} · {LOG_PAGE_SIZE} entries per page")
+        with col_next:
+            if page["next_cursor"] and st.button("Older →", key="log_older"):
+                cursors.append(page["next_cursor"])
+                st.rerun()
     else:
         st.info("No logs match your filters.")
 
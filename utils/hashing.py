@@ -0,0 +1,119 @@
+"""
+Content hashing utilities used for document and chunk deduplication
+"""
+import hashlib
+import json
+import re
+
+FILE_HASH_BLOCK_SIZE = 1024 * 1024
+CHUNK_ID_PREFIX = "chunk_"
+OWNER_SEPARATOR = "|"
+# Metadata fields each owner of a shared chunk classifies it with
+OWNER_FIELDS = ("department", "service", "document_type", "description", "status")
+
+
+def file_sha256(file_path: str, block_size: int = FILE_HASH_BLOCK_SIZE) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Collapse whitespace so formatting-only differences hash identically."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def chunk_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of normalized chunk text."""
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+def chunk_id_for_hash(content_hash: str) -> str:
+    """Chroma ID for a content-addressed chunk."""
+    return f"{CHUNK_ID_PREFIX}{content_hash}"
+
+
+def split_owners(metadata: dict) -> list:
+    """Return the list of filenames that own a chunk (falls back to 'filename')."""
+    metadata = metadata or {}
+    owners = metadata.get("owners")
+    if owners:
+        return [o for o in owners.split(OWNER_SEPARATOR) if o]
+    filename = metadata.get("filename")
+    return [filename] if filename else []
+
+
+def join_owners(owners: list) -> str:
+    """Serialize an owner list for Chroma metadata (scalar values only)."""
+    return OWNER_SEPARATOR.join(owners)
+
+
+def owner_fields(metadata: dict) -> dict:
+    """The classification fields present in a chunk's (top-level) metadata."""
+    metadata = metadata or {}
+    return {key: metadata[key] for key in OWNER_FIELDS if key in metadata}
+
+
+def split_owner_meta(metadata: dict) -> dict:
+    """
+    Return each owner's classification of a chunk ({filename: {field: value}}).
+    Chunks stored before per-owner metadata was kept only know their primary's.
+    """
+    metadata = metadata or {}
+    raw = metadata.get("owner_meta")
+    if raw:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            pass
+    filename = metadata.get("filename")
+    return {filename: owner_fields(metadata)} if filename else {}
+
+
+def join_owner_meta(owner_meta: dict) -> str:
+    """Serialize per-owner classification for Chroma metadata (scalar values only)."""
+    return json.dumps(owner_meta, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def with_owners(metadata: dict, owners: list, owner_meta: dict) -> dict:
+    """
+    Chunk metadata rewritten for an owner list and per-owner classification.
+
+    The primary (the current 'filename' if it is still an owner, else the
+    first owner) gives the chunk its filename/source and top-level fields,
+    which plain Chroma filters match on.
+    """
+    merged = dict(metadata or {})
+    primary = merged.get("filename") if merged.get("filename") in owners else owners[0]
+    owners = [primary] + [owner for owner in owners if owner != primary]
+    merged.update(owner_meta.get(primary, {}))
+    merged["filename"] = primary
+    merged["source"] = primary
+    merged["owners"] = join_owners(owners)
+    merged["owner_count"] = len(owners)
+    merged["owner_meta"] = join_owner_meta({owner: owner_meta[owner] for owner in owners if owner in owner_meta})
+    return merged
+
+
+def matching_owners(metadata: dict, conditions: dict) -> list:
+    """Owners whose classification of a chunk (and filename) equals every condition."""
+    owner_meta = split_owner_meta(metadata)
+    fallback = owner_fields(metadata)
+    matched = []
+    for owner in split_owners(metadata):
+        fields = {**owner_meta.get(owner, fallback), "filename": owner}
+        if all(fields.get(key) == value for key, value in conditions.items()):
+            matched.append(owner)
+    return matched
+
+
+def owner_view(metadata: dict, owner: str) -> dict:
+    """A chunk's metadata as seen from one of its owners (its filename and classification)."""
+    view = dict(metadata or {})
+    view.update(split_owner_meta(metadata).get(owner, {}))
+    view["filename"] = owner
+    view["source"] = owner
+    return view
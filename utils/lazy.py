@@ -0,0 +1,64 @@
+"""
+Lazily constructed module-level singletons.
+
+`rag_engine = LazyInstance(RAGEngine)` keeps the familiar import
+(`from core.rag_engine import rag_engine`) but defers RAGEngine() until the
+first attribute access, so importing a module no longer opens Chroma or
+builds model clients. Construction is serialized by a lock: concurrent first
+callers wait for one instance instead of building several. If the factory
+raises, nothing is cached and the next access tries again.
+
+The startup warm-up (core.warmup) calls resolve() on the heavy instances in
+parallel, so the first request normally finds them already built.
+"""
+import threading
+import time
+from typing import Any, Callable
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LazyInstance:
+    """Proxy that builds its target with factory() on first use and forwards attribute access to it."""
+
+    def __init__(self, factory: Callable[[], Any], name: str = None):
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_name", name or getattr(factory, "__name__", "instance"))
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+        object.__setattr__(self, "_lazy_instance", None)
+
+    def _lazy_resolve(self) -> Any:
+        instance = self._lazy_instance
+        if instance is not None:
+            return instance
+        with self._lazy_lock:
+            if self._lazy_instance is None:
+                start = time.perf_counter()
+                instance = self._lazy_factory()
+                object.__setattr__(self, "_lazy_instance", instance)
+                logger.debug(f"Initialized {self._lazy_name} in {(time.perf_counter() - start) * 1000:.0f}ms")
+            return self._lazy_instance
+
+    def __getattr__(self, name: str):
+        # Only called for names not found on the proxy itself
+        return getattr(self._lazy_resolve(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._lazy_resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if self._lazy_instance is None:
+            return f"<LazyInstance {self._lazy_name} (not initialized)>"
+        return repr(self._lazy_instance)
+
+
+def resolve(obj: Any) -> Any:
+    """The real object behind a LazyInstance (built now if needed); other objects are returned as is."""
+    return obj._lazy_resolve() if isinstance(obj, LazyInstance) else obj
+
+
+def is_initialized(obj: Any) -> bool:
+    """Whether a LazyInstance has been built (always True for other objects)."""
+    return not isinstance(obj, LazyInstance) or obj._lazy_instance is not None
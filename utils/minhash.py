@@ -0,0 +1,198 @@
+"""
+MinHash / LSH utilities for near-duplicate chunk detection
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import mmh3
+import numpy as np
+
+from config.settings import NEAR_DUP_CONFIG
+
+# Mersenne prime used for the (a * x + b) mod p permutation family
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+SIGNATURE_METADATA_KEY = "minhash"
+BAND_METADATA_PREFIX = "lsh_"
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles with banded LSH keys.
+
+    With b bands of r rows, two chunks become LSH candidates with
+    probability 1 - (1 - s^r)^b for Jaccard similarity s; candidates are
+    then confirmed against the signature-estimated similarity threshold.
+    """
+
+    def __init__(self, num_perm: int = None, bands: int = None, shingle_size: int = None,
+                 threshold: float = None, seed: int = 1):
+        # Unset parameters come from NEAR_DUP_CONFIG, so signatures match the stored ones
+        num_perm = num_perm or NEAR_DUP_CONFIG.get("num_perm", 64)
+        bands = bands or NEAR_DUP_CONFIG.get("bands", 16)
+        shingle_size = shingle_size or NEAR_DUP_CONFIG.get("shingle_size", 4)
+        threshold = threshold if threshold is not None else NEAR_DUP_CONFIG.get("threshold", 0.8)
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> set:
+        """Lower-cased word k-grams of the text (whole text if shorter than k)."""
+        words = re.findall(r"\w+", (text or "").lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)} if words else set()
+        k = self.shingle_size
+        return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint64 array of length num_perm)."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (mmh3.hash(s, signed=False) for s in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=1)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """One hex key per LSH band."""
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            keys.append(format(mmh3.hash(rows.tobytes(), signed=False), "08x"))
+        return keys
+
+    @staticmethod
+    def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(sig_a == sig_b))
+
+    def metadata(self, signature: np.ndarray) -> Dict[str, str]:
+        """Chroma metadata fields (scalars only) for a signature and its band keys."""
+        meta = {SIGNATURE_METADATA_KEY: encode_signature(signature)}
+        for band, key in enumerate(self.band_keys(signature)):
+            meta[f"{BAND_METADATA_PREFIX}{band}"] = key
+        return meta
+
+    def band_filter(self, band_keys: Iterable[List[str]]) -> Optional[Dict]:
+        """Chroma 'where' filter matching any chunk that shares a band with any of the given keys."""
+        per_band = [set() for _ in range(self.bands)]
+        for keys in band_keys:
+            for band, key in enumerate(keys):
+                per_band[band].add(key)
+        clauses = [
+            {f"{BAND_METADATA_PREFIX}{band}": {"$in": sorted(values)}}
+            for band, values in enumerate(per_band) if values
+        ]
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+class LSHIndex:
+    """In-memory LSH index mapping band keys to item IDs."""
+
+    def __init__(self, hasher: MinHasher):
+        self.hasher = hasher
+        self._buckets: Dict[Tuple[int, str], List[str]] = {}
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def add(self, item_id: str, signature: np.ndarray, band_keys: Optional[List[str]] = None):
+        band_keys = band_keys or self.hasher.band_keys(signature)
+        self._signatures[item_id] = signature
+        for band, key in enumerate(band_keys):
+            self._buckets.setdefault((band, key), []).append(item_id)
+
+    def best_match(self, signature: np.ndarray, band_keys: Optional[List[str]] = None) -> Tuple[Optional[str], float]:
+        """Most similar indexed item at or above the threshold, as (item_id, similarity)."""
+        band_keys = band_keys or self.hasher.band_keys(signature)
+        best_id, best_score = None, 0.0
+        seen = set()
+        for band, key in enumerate(band_keys):
+            for item_id in self._buckets.get((band, key), []):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                score = self.hasher.similarity(signature, self._signatures[item_id])
+                if score >= self.hasher.threshold and score > best_score:
+                    best_id, best_score = item_id, score
+        return best_id, best_score
+
+
+def encode_signature(signature: np.ndarray) -> str:
+    """Compact string form of a signature for Chroma metadata."""
+    return signature.astype(">u4").tobytes().hex()
+
+
+def decode_signature(value: str) -> Optional[np.ndarray]:
+    """Inverse of encode_signature (None if the value is missing or malformed)."""
+    try:
+        return np.frombuffer(bytes.fromhex(value), dtype=">u4").astype(np.uint64)
+    except (TypeError, ValueError):
+        return None
+
+
+def signature_from_metadata(metadata: Dict) -> Optional[np.ndarray]:
+    """Stored signature of a chunk, if it was indexed with one."""
+    value = (metadata or {}).get(SIGNATURE_METADATA_KEY)
+    return decode_signature(value) if value else None
+
+
+def band_keys_from_metadata(metadata: Dict, bands: int) -> Optional[List[str]]:
+    """Stored LSH band keys of a chunk, if complete."""
+    metadata = metadata or {}
+    keys = [metadata.get(f"{BAND_METADATA_PREFIX}{band}") for band in range(bands)]
+    return keys if all(keys) else None
+
+
+def collapse_near_duplicates(entries: List[Tuple[str, str, Dict]], hasher: "MinHasher",
+                             limit: Optional[int] = None) -> List[int]:
+    """
+    Pick ranked results that are not near-duplicates of a higher-ranked one.
+
+    Args:
+        entries: Ranked (id, text, metadata) tuples
+        hasher: MinHasher used for signatures missing from metadata
+        limit: Stop after this many kept results
+
+    Returns:
+        Indices of the kept entries, in rank order
+    """
+    index = LSHIndex(hasher)
+    kept, seen_clusters = [], set()
+    for position, (item_id, text, metadata) in enumerate(entries):
+        cluster = (metadata or {}).get("near_dup_of") or item_id
+        if cluster in seen_clusters:
+            continue
+        signature = signature_from_metadata(metadata)
+        if signature is None or len(signature) != hasher.num_perm:
+            signature = hasher.signature(text)
+        match, _ = index.best_match(signature)
+        if match is not None:
+            continue
+        index.add(item_id, signature)
+        seen_clusters.update({cluster, item_id})
+        kept.append(position)
+        if limit and len(kept) >= limit:
+            break
+    return kept
+
+
+_minhasher: Optional[MinHasher] = None
+
+
+def get_minhasher() -> MinHasher:
+    """Shared MinHasher configured from NEAR_DUP_CONFIG."""
+    global _minhasher
+    if _minhasher is None:
+        _minhasher = MinHasher()
+    return _minhasher